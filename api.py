@@ -0,0 +1,252 @@
+"""TripMate for Campus planning API.
+
+A small JSON-over-HTTP service on top of the same planning logic as the
+Streamlit app (utils/plan_helper), for other campus systems:
+
+    GET  /health      worker and queue status
+    GET  /metrics     per-stage timing histograms (Prometheus text format;
+                      empty unless TRIPMATE_METRICS=1 or --metrics)
+    POST /plan        trip form fields as JSON -> plan as JSON (with the
+                      structured report under "report")
+                      (?itinerary=0 skips itinerary generation)
+    POST /plan/pdf    trip form fields as JSON -> itinerary + budget PDF
+    GET  /plans       saved plans, newest first (?to=&from=&month=
+                      &min_students=&max_students=&limit=, ?before=<next>
+                      for the next page)
+    GET  /plans/<id>  one saved plan as JSON (/plans/<id>/pdf as a PDF)
+
+Every plan is saved to the plan store (utils/store_helper), and a trip
+close to a saved one reuses its itinerary (?reuse=0 generates a new one).
+
+Identical concurrent requests (same normalized inputs) are coalesced: one
+plan is computed and every waiting request gets it. Plans run on a bounded
+worker pool; when the pool and its queue are full the API answers 429 with
+a Retry-After header instead of queueing more upstream model calls. The
+same answer comes back when the shared model rate limit can't admit the
+call in time, or the client (X-Client-Id header, else its address) has
+used up its quota.
+
+    python api.py --port 8000 [--metrics]
+    curl -X POST localhost:8000/plan -d '{"from_location": "Kochi", "to_location": "Munnar"}'
+"""
+import argparse
+import json
+import math
+import os
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from utils.concurrency_helper import BoundedExecutor, Overloaded, SingleFlight
+from utils.limiter_helper import LimiterError, get_limiter, inference_session
+from utils.metrics_helper import enable_metrics, get_registry, profiled, span
+from utils.plan_helper import build_trip_plan, parse_trip_request, plan_key
+from utils.store_helper import MAX_SEARCH_LIMIT, get_plan_store
+
+API_WORKERS = int(os.getenv("TRIPMATE_API_WORKERS", 4))
+API_QUEUE = int(os.getenv("TRIPMATE_API_QUEUE", 16))
+API_REQUEST_TIMEOUT = float(os.getenv("TRIPMATE_API_REQUEST_TIMEOUT", 120))
+MAX_BODY_BYTES = 64 * 1024
+
+
+class PlanService:
+    def __init__(self, workers=API_WORKERS, queue=API_QUEUE):
+        self.executor = BoundedExecutor(workers, queue, name="plan")
+        self.flights = SingleFlight()
+
+    def plan(self, inputs, itinerary=True, client=None, timeout=API_REQUEST_TIMEOUT, reuse=True):
+        # Raises Overloaded when a new plan can't be admitted, LimiterError
+        # when the model rate limit or the client's quota turns it away, and
+        # concurrent.futures.TimeoutError when it takes longer than timeout
+        # (the plan still finishes and lands in the itinerary cache).
+        # Coalesced requests are charged to the client that started the plan.
+        key = (plan_key(inputs), itinerary, reuse)
+        future, _ = self.flights.submit(
+            key, lambda: self.executor.submit(self._build, inputs, itinerary, client, reuse)
+        )
+        return future.result(timeout=timeout)
+
+    @staticmethod
+    def _build(inputs, itinerary, client, reuse):
+        with inference_session(client), profiled("api_plan"), span("plan", itinerary=itinerary):
+            return build_trip_plan(inputs, itinerary, store=get_plan_store(), reuse=reuse)
+
+    def status(self):
+        return {
+            "status": "ok",
+            "workers": self.executor.max_workers,
+            "queue_limit": self.executor.max_queue,
+            "pending": self.executor.pending,
+            "in_flight": len(self.flights),
+            "model_queue": get_limiter().status(),
+        }
+
+
+class PlanRequestHandler(BaseHTTPRequestHandler):
+    service = None  # set by make_server()
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/")
+        if path == "/plans":
+            self._send_saved_plans(parse_qs(url.query))
+        elif path.startswith("/plans/"):
+            self._send_saved_plan(path[len("/plans/"):])
+        elif path == "/health":
+            self._send_json(200, self.service.status())
+        elif path == "/metrics":
+            self._send(200, get_registry().prometheus_text().encode("utf-8"),
+                       "text/plain; version=0.0.4; charset=utf-8")
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        if url.path not in ("/plan", "/plan/pdf"):
+            self._send_json(404, {"error": "not found"})
+            return
+
+        try:
+            length = (self.headers.get("Content-Length") or "0").strip()
+            if not length.isdigit():
+                # A negative length would read(-1): block until the client hangs
+                # up. The body can't be skipped either, so the connection ends.
+                self.close_connection = True
+                raise ValueError("invalid Content-Length")
+            length = int(length)
+            if length > MAX_BODY_BYTES:
+                # The body is left unread, so it can't be followed by another request
+                self.close_connection = True
+                self._send_json(413, {"error": "request body too large"})
+                return
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("request body must be a JSON object")
+            inputs = parse_trip_request(body)
+        except (ValueError, TypeError) as error:
+            self._send_json(400, {"error": str(error)})
+            return
+
+        want_pdf = url.path == "/plan/pdf"
+        query = parse_qs(url.query)
+        itinerary = want_pdf or query.get("itinerary", ["1"])[0] != "0"
+        reuse = query.get("reuse", ["1"])[0] != "0"
+        try:
+            plan = self.service.plan(inputs, itinerary=itinerary, client=self._client_id(), reuse=reuse)
+        except (Overloaded, LimiterError) as error:
+            self._send_json(429, {"error": str(error)},
+                            headers={"Retry-After": str(max(1, math.ceil(error.retry_after)))})
+            return
+        except FutureTimeoutError:
+            self._send_json(504, {"error": "plan generation timed out; retry shortly"})
+            return
+        except Exception as error:
+            self.log_error("plan failed: %r", error)
+            self._send_json(502, {"error": "plan generation failed"})
+            return
+
+        if want_pdf:
+            from utils.report_helper import report_pdf_bytes
+
+            self._send(200, report_pdf_bytes(plan["report"]), "application/pdf", headers={
+                "Content-Disposition": 'attachment; filename="TripMate_Complete_Plan.pdf"'
+            })
+        else:
+            self._send_json(200, {**plan, "report": plan["report"].to_dict()})
+
+    def _send_saved_plans(self, query):
+        def number(name):
+            value = query.get(name, [None])[0]
+            return None if value in (None, "") else int(value)
+
+        try:
+            # The store caps a page at MAX_SEARCH_LIMIT; a full page means "more"
+            limit = max(1, min(number("limit") or 20, MAX_SEARCH_LIMIT))
+            before = query.get("before", [None])[0]
+            if before:
+                created_at, plan_id = before.split(":")
+                before = (float(created_at), int(plan_id))
+            plans = get_plan_store().search(
+                to_location=query.get("to", [None])[0],
+                from_location=query.get("from", [None])[0],
+                month=query.get("month", [None])[0],
+                min_students=number("min_students"),
+                max_students=number("max_students"),
+                before=before or None,
+                limit=limit,
+            )
+        except ValueError as error:
+            self._send_json(400, {"error": str(error)})
+            return
+        last = plans[-1] if len(plans) == limit else None
+        self._send_json(200, {
+            "plans": plans,
+            "next": f"{last['created_at']!r}:{last['id']}" if last else None,
+        })
+
+    def _send_saved_plan(self, rest):
+        plan_id, _, fmt = rest.partition("/")
+        plan = get_plan_store().get(int(plan_id)) if plan_id.isdigit() else None
+        if plan is None or fmt not in ("", "pdf"):
+            self._send_json(404, {"error": "not found"})
+        elif fmt == "pdf":
+            from utils.report_helper import SECTIONS, report_pdf_bytes, saved_plan_report
+
+            sections = SECTIONS if plan.get("itinerary") else ("budget",)
+            pdf = report_pdf_bytes(saved_plan_report(plan), sections)
+            self._send(200, pdf, "application/pdf", headers={
+                "Content-Disposition": f'attachment; filename="TripMate_Plan_{plan["id"]}.pdf"'
+            })
+        else:
+            self._send_json(200, plan)
+
+    def _client_id(self):
+        # Quota key: an explicit client id, else the caller's address
+        return self.headers.get("X-Client-Id") or self.client_address[0]
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self._send(status, body, "application/json; charset=utf-8", headers)
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def make_server(host="127.0.0.1", port=8000, service=None):
+    handler = type("Handler", (PlanRequestHandler,), {"service": service or PlanService()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--metrics", action="store_true",
+                        help="record stage timings (GET /metrics) and log them as JSON lines")
+    args = parser.parse_args()
+    if args.metrics:
+        enable_metrics()
+
+    server = make_server(args.host, args.port)
+    print(f"Serving TripMate planning API on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,19 @@
+import io #Report downloads
+import logging #Plan store warnings
+import sqlite3 #Plan store errors
+import threading #Queue status from itinerary worker threads
+import time #Saved plan dates
+import uuid #Per-session inference quota
+from functools import partial #Deferred PDF downloads
 import streamlit as st #Web app UI
-import pandas as pd #For data manipulation
-import matplotlib.pyplot as plt #For plotting pie chart
-from utils.ai_helper import generate_itinerary #Flan-T5
-from utils.pdf_helper import generate_budget_pdf #PDF generation
+from utils.ai_helper import OFFLINE_NOTE, regenerate_day, stream_trip_days #Llama 3.2 (remote) or local transformers model
+from utils.itinerary_helper import Itinerary #Typed day-by-day itinerary
+from utils.report_helper import report_pdf_bytes, report_text, write_csv, write_json, write_text #Report exports
+from utils.chart_helper import render_pie_chart #Memoized pie chart (no figure leak)
+from utils.plan_helper import MONTHS, plan_key #Plan memo keys (normalized form inputs)
+from utils.limiter_helper import LimiterError, inference_session #Shared model rate limit
+from utils.metrics_helper import profiled #Sampled profiles
+from utils.store_helper import get_plan_store #Saved plans (SQLite)
 
 st.set_page_config(page_title="TripMate for Campus", layout="wide")
 
@@ -25,13 +36,7 @@ with st.form("trip_form"):
     with col1:
         from_location = st.text_input("From (Starting Location)")
         to_location = st.text_input("To (Destination)")
-        travel_month = st.selectbox(
-            "Planned Month",
-            [
-                "January", "February", "March", "April", "May", "June",
-                "July", "August", "September", "October", "November", "December"
-            ]
-        )
+        travel_month = st.selectbox("Planned Month", MONTHS)
 
     with col2:
         num_students = st.number_input(
@@ -64,13 +69,284 @@ with st.form("trip_form"):
             "Religious"
         ]
     )
+    reuse_itinerary = st.checkbox(
+        "Reuse a saved itinerary for a near-identical trip", value=True,
+        help="Same route, month, length and preferences with a similar group size"
+    )
 
     submit = st.form_submit_button("🚀 Generate Trip Plan")
 
 # =========================
-# OUTPUT SECTION
+# Plan memo (session state)
 # =========================
+# Every widget interaction (including the download buttons) reruns this
+# script with submit == False. The computed plan is kept in session state,
+# keyed by a hash of the normalized form inputs, so reruns redraw it
+# without calling the LLM or recomputing anything.
+
+MAX_PLANS_PER_SESSION = 5
+SAVED_PLANS_SHOWN = 10
+
+def build_plan(inputs, result=None):
+    from utils.plan_helper import plan_costs
+    from utils.report_helper import build_report
+
+    # Cost model (stay, distance, transport, food, misc), Budget / Mid-Range /
+    # Premium options, stay / food / vehicle / activity trade-offs and the
+    # trip report every download is exported from. A reopened plan passes
+    # its saved figures instead.
+    result = result or plan_costs(inputs)
+    costs = result["costs"]
+    optimized = result["optimized"]
+    report = result.get("report") or build_report(inputs, costs, result["options"])
+
+    return {
+        **costs,
+        "inputs": inputs,
+        "costs": costs,
+        "options": result["options"],
+        "optimized": optimized,
+        "report": report,
+        "itinerary": None,
+        "budget_text": report_text(report, ("budget",)),
+    }
+
+
+def attach_itinerary(plan, itinerary):
+    plan["itinerary"] = itinerary
+    plan["report"] = plan["report"].with_itinerary(itinerary)
+    plan["itinerary_text"] = report_text(plan["report"], ("itinerary",))
+
+
+def finish_plan(plan, itinerary):
+    attach_itinerary(plan, itinerary)
+    save_plan(plan)
+
+
+def save_plan(plan):
+    # Saved plans are a convenience: a store that can't be written (full
+    # disk, read-only checkout) must not break the page
+    try:
+        get_plan_store().save({
+            "key": plan_key(plan["inputs"]),
+            "inputs": plan["inputs"],
+            "costs": plan["costs"],
+            "options": plan["options"],
+            "optimized": plan["optimized"],
+            "budget_text": plan["budget_text"],
+            "itinerary": plan["itinerary"].to_dict(),
+            "itinerary_text": plan["itinerary_text"],
+        })
+    except (sqlite3.Error, OSError) as error:
+        logging.getLogger(__name__).warning("couldn't save plan: %s", error)
+
+
+def reopen_plan(plan_id):
+    # Saved plan -> session plan, with its saved figures and itinerary
+    saved = get_plan_store().get(plan_id)
+    if saved is None:
+        return None
+    plan = build_plan(saved["inputs"], saved)
+    if saved["itinerary"]:
+        attach_itinerary(plan, Itinerary.from_dict(saved["itinerary"]))
+    return plan
+
+
+def saved_itinerary(inputs):
+    # Saved plan whose itinerary fits this trip (see PlanStore.find_close_match)
+    try:
+        return get_plan_store().find_close_match(inputs)
+    except (sqlite3.Error, OSError) as error:
+        logging.getLogger(__name__).warning("couldn't search saved plans: %s", error)
+        return None
+
+
+def remember_plan(key, plan):
+    plans = st.session_state.setdefault("plans", {})
+    plans[key] = plan
+    while len(plans) > MAX_PLANS_PER_SESSION:
+        plans.pop(next(iter(plans)))
+    st.session_state["active_plan"] = key
+
+
+# Download data callbacks: they read the plan's report when the button is
+# clicked, so a regenerated day is in every format without redrawing the page
+def plan_pdf(plan, with_budget=False):
+    return report_pdf_bytes(plan["report"], ("itinerary", "budget") if with_budget else ("itinerary",))
+
+
+def plan_export(plan, write):
+    out = io.StringIO(newline="")
+    write(plan["report"], out)
+    return out.getvalue()
+
+
+def queue_status(placeholder):
+    # on_wait callback for the inference limiter. Chunked itineraries wait
+    # on worker threads, which need this script's context to draw.
+    from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+
+    def on_wait(position, eta_seconds):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        placeholder.info(
+            f"⏳ The planner is busy: you're #{position} in line, "
+            f"about {max(eta_seconds, 1):.0f}s to go."
+        )
+
+    return on_wait
+
+
+# A fragment reruns on its own: moving a what-if slider redraws only this
+# panel from the cached cost surface, never the plan or the itinerary.
+@st.fragment
+def what_if_panel(inputs):
+    from utils.chart_helper import cost_heatmap_spec
+    from utils.whatif_helper import MAX_DAYS, MAX_STUDENTS, get_cost_surface
+
+    surface = get_cost_surface(
+        inputs["from_location"], inputs["to_location"], inputs["location_types"]
+    )
+    # Sliders start from each plan's own inputs
+    key = plan_key(inputs)
+
+    col_students, col_days, col_budget = st.columns(3)
+    what_if_students = col_students.slider(
+        "Students", 1, MAX_STUDENTS, int(inputs["num_students"]), key=f"what_if_students:{key}"
+    )
+    what_if_days = col_days.slider(
+        "Days", 1, MAX_DAYS, int(inputs["num_days"]), key=f"what_if_days:{key}"
+    )
+    what_if_budget = col_budget.slider(
+        "Budget (₹)", 1000, max(2_000_000, int(inputs["max_budget"])),
+        int(inputs["max_budget"]), step=1000, key=f"what_if_budget:{key}"
+    )
+
+    total = surface.cell(what_if_budget, what_if_students, what_if_days)
+    col_total, col_per_student, col_usage = st.columns(3)
+    col_total.metric("Estimated Total", f"₹{total:,}", f"₹{total - what_if_budget:,} vs budget",
+                     delta_color="inverse")
+    col_per_student.metric("Per Student", f"₹{total // what_if_students:,}")
+    col_usage.metric("Budget Usage", f"{total * 100 // what_if_budget}%")
+
+    st.vega_lite_chart(
+        cost_heatmap_spec(
+            surface.students, surface.days, surface.cost_at(what_if_budget),
+            what_if_budget, (what_if_students, what_if_days)
+        )
+    )
+    st.caption(
+        f"~{surface.distance_km:,} km round trip · rates from tariff version "
+        f"{surface.tariff_version} · colour shows share of the selected budget"
+    )
+
+
+# One fragment per day: regenerating a day asks the model for that day
+# only and redraws only that day's section.
+@st.fragment
+def itinerary_day(plan, day):
+    inputs = plan["inputs"]
+    col_day, col_action = st.columns([6, 1])
+    if col_action.button("🔄 Regenerate", key=f"regenerate:{plan_key(inputs)}:{day}",
+                         help=f"Ask for a different plan for Day {day} only"):
+        session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+        try:
+            with col_day, st.spinner(f"Replanning Day {day}..."), inference_session(session_id):
+                new_day = regenerate_day(
+                    inputs["from_location"], inputs["to_location"], inputs["travel_month"],
+                    inputs["num_students"], inputs["num_days"], inputs["location_types"],
+                    plan["itinerary"], day
+                )
+        except LimiterError as error:
+            col_day.warning(f"⏳ {error}. Please try again in about {max(error.retry_after, 1):.0f}s.")
+        except Exception:
+            col_day.warning(f"Couldn't replan Day {day} right now; keeping the current plan.")
+        else:
+            plan["itinerary"].replace_day(new_day)
+            finish_plan(plan, plan["itinerary"])
+    col_day.markdown(plan["itinerary"].day(day).to_markdown())
+
+
+def render_itinerary(plan):
+    for day in range(1, len(plan["itinerary"]) + 1):
+        itinerary_day(plan, day)
+    if plan["itinerary"].has_offline_days:
+        st.caption(OFFLINE_NOTE)
+
+
+# Searching saved plans reruns only this panel; reopening one reruns the page
+@st.fragment
+def saved_plans_panel():
+    st.markdown("## 🗂️ Saved Plans")
+    destination = st.text_input("Destination", key="saved_plans_to")
+    month = st.selectbox("Month", ["Any month", *MONTHS], key="saved_plans_month")
+    try:
+        rows = get_plan_store().search(
+            to_location=destination.strip() or None,
+            month=None if month == "Any month" else month,
+            limit=SAVED_PLANS_SHOWN
+        )
+    except (sqlite3.Error, OSError):
+        st.caption("Saved plans are unavailable right now.")
+        return
+    if not rows:
+        st.caption("No saved plans match." if destination.strip() or month != "Any month"
+                   else "Plans you generate are saved here.")
+    for row in rows:
+        label = (
+            f"{row['from_location']} → {row['to_location']} · {row['travel_month']} · "
+            f"{row['num_students']} students · {row['num_days']} days"
+        )
+        if st.button(label, key=f"reopen:{row['id']}"):
+            saved = reopen_plan(row["id"])
+            if saved is not None:
+                remember_plan(plan_key(saved["inputs"]), saved)
+                st.rerun()
+        st.caption(
+            f"₹{row['total_cost'] or 0:,} · saved "
+            f"{time.strftime('%d %b %Y', time.localtime(row['created_at']))}"
+        )
+
+
 if submit:
+    inputs = {
+        "from_location": from_location,
+        "to_location": to_location,
+        "travel_month": travel_month,
+        "num_students": num_students,
+        "num_days": num_days,
+        "max_budget": max_budget,
+        "location_types": location_types,
+    }
+    key = plan_key(inputs)
+    if key in st.session_state.get("plans", {}):
+        st.session_state["active_plan"] = key
+    else:
+        with profiled("app_plan"):
+            new_plan = build_plan(inputs)
+        match = saved_itinerary(inputs) if reuse_itinerary else None
+        if match is not None:
+            new_plan["reused_from"] = {
+                "created_at": match["created_at"], "num_students": match["inputs"]["num_students"],
+            }
+            finish_plan(new_plan, Itinerary.from_dict(match["itinerary"]))
+        remember_plan(key, new_plan)
+
+plan = st.session_state.get("plans", {}).get(st.session_state.get("active_plan"))
+
+# =========================
+# OUTPUT SECTION
+# =========================
+if plan:
+    inputs = plan["inputs"]
+    from_location = inputs["from_location"]
+    to_location = inputs["to_location"]
+    travel_month = inputs["travel_month"]
+    num_students = inputs["num_students"]
+    num_days = inputs["num_days"]
+    max_budget = inputs["max_budget"]
+
     st.success("Trip plan generated successfully!")
     
 
@@ -92,75 +368,26 @@ if submit:
 
     st.markdown("---")
     
-    # ======================================================================
-    # Itinerary AI Generation using HuggingFace Inference API - Llama 3.2
-    # ======================================================================
+    # =========================
+    # Day-wise Itinerary
+    # =========================
     st.markdown("## 🗓️ Day-wise Itinerary")
+    reused_from = plan.get("reused_from")
+    if reused_from:
+        st.info(
+            f"♻️ Reusing the itinerary saved on "
+            f"{time.strftime('%d %b %Y', time.localtime(reused_from['created_at']))} for "
+            f"{reused_from['num_students']} students on the same route. "
+            "Use 🔄 Regenerate for a fresh plan of any day."
+        )
 
-    prompt = f"""
-    INPUT:
-    From: {from_location}
-    To: {to_location}
-    Travel Month: {travel_month}
-    Students: {num_students}
-    Days: {num_days}
-    Preferences: {location_types}
-
-    TASK:
-    Generate a {num_days}-day travel itinerary for college students.
-    
-    Rules:
-    - Do NOT mention prices, costs, budget, or money
-    - Focus only on travel flow, places, meals, and activities
-    - Write clearly for students
-    - Cover all {num_days} days
-
-    OUTPUT FORMAT:
-    Day 1:
-    - Morning:
-    - Afternoon:
-    - Evening:
-
-    Day 2:
-    - Morning:
-    - Afternoon:
-    - Evening:
-
-    (continue until Day {num_days})
-
-    OUTPUT:
-    """
-
-    with st.spinner("🤖 Generating itinerary using AI..."):
-        ai_itinerary = generate_itinerary(prompt)
-
-    st.write(ai_itinerary)
+    # Filled in last: the rest of the page doesn't depend on the itinerary,
+    # so it is drawn first and the days stream in here afterwards.
+    itinerary_section = st.container()
+    if plan["itinerary"] is not None:
+        with itinerary_section:
+            render_itinerary(plan)
     st.markdown("---")
-        
-   # =========================
-    # Stay Suggestion Logic
-    # =========================
-
-    nights = max(num_days - 1, 1)
-
-    if num_students <= 10:
-        stay_type = "Homestay"
-        stay_rate = 900
-        stay_note = "Best for small student groups and local experience"
-    elif num_students <= 40:
-        stay_type = "Budget Hotel"
-        stay_rate = 1200
-        stay_note = "Comfortable option for medium-sized student groups"
-    elif num_students <= 100:
-        stay_type = "Lodge / Dormitory"
-        stay_rate = 800
-        stay_note = "Cost-effective option for large student groups"
-    else:
-        stay_type = "Hostel / Group Accommodation"
-        stay_rate = 600
-        stay_note = "Most economical option for very large groups"
-
-    recommended_stay_cost = stay_rate * num_students * nights
 
     # =========================
     # Stay Suggestions
@@ -170,126 +397,35 @@ if submit:
     col1, col2 = st.columns(2)
 
     with col1:
-        st.metric("Recommended Stay Type", stay_type)
-        st.write(stay_note)
+        st.metric("Recommended Stay Type", plan["stay_type"])
+        st.write(plan["stay_note"])
 
     with col2:
-        st.metric("Cost per Student / Night", f"₹{stay_rate}")
-        st.metric("Total Stay Cost", f"₹{recommended_stay_cost:,}")
+        st.metric("Cost per Student / Night", f"₹{plan['stay_rate']}")
+        st.metric("Total Stay Cost", f"₹{plan['recommended_stay_cost']:,}")
 
     st.info(
         f"Stay cost is calculated for {num_students} students "
-        f"for {nights} night(s)."
+        f"for {plan['nights']} night(s)."
     )
 
     st.markdown("---")
 
-   
-
-    # =====================================================
-    # Distance Estimation logic (Region-based)
-    # =====================================================
-
-    same_state_distance = 500
-    neighbor_state_distance = 700
-    far_state_distance = 2000
-
-    kerala_cities = [
-        "Kochi", "Trivandrum", "Thiruvananthapuram", "Kozhikode",
-        "Kannur", "Wayanad", "Thrissur", "Alappuzha", "Kollam"
-    ]
-
-    from_in_kerala = from_location.strip().title() in kerala_cities
-    to_in_kerala = to_location.strip().title() in kerala_cities
-
-    if from_in_kerala and to_in_kerala:
-        estimated_distance_km = same_state_distance
-    elif from_in_kerala or to_in_kerala:
-        estimated_distance_km = neighbor_state_distance
-    else:
-        estimated_distance_km = far_state_distance
-
-    # =====================================================
-    # Transport Cost per KM logic (Group-based)
-    # =====================================================
-
-    if num_students <= 15:
-        cost_per_km = 22   # Tempo Traveller
-    elif num_students <= 40:
-        cost_per_km = 18   # Mini Bus
-    elif num_students <= 100:
-        cost_per_km = 15   # Large Bus
-    else:
-        cost_per_km = 14   # Multiple Buses
-
-    # =====================================================
-    # Food Cost per Student per Day logic (Budget-based)
-    # =====================================================
-
-    budget_per_student_per_day = max_budget / (num_students * num_days)
-
-    if budget_per_student_per_day <= 500:
-        food_cost_per_day = 300
-        type_of_food = "Basic Meals"
-    elif budget_per_student_per_day <= 800:
-        food_cost_per_day = 400
-        type_of_food = "Standard Meals"
-    else:
-        food_cost_per_day = 550
-        type_of_food = "Premium Meals"
-
-    # =====================================================
-    # Misc Cost per Student logic (Based on Location Types)
-    # =====================================================
-
-    misc_cost_map = {
-        "Nature": 200,
-        "Heritage": 250,
-        "Industry Visit": 150,
-        "Theme Park": 500,
-        "Adventure": 600,
-        "Religious": 150
-    }
-
-    if location_types:
-        misc_cost_per_student = max(
-            misc_cost_map.get(loc, 200) for loc in location_types
-        )
-    else:
-        misc_cost_per_student = 200
-        
-    # =========================
-    # Budget calculations
-    # =========================
-    transport_cost = estimated_distance_km * cost_per_km
-    food_cost = food_cost_per_day * num_students * num_days
-    misc_cost = misc_cost_per_student * num_students
-
-    used_budget = transport_cost + recommended_stay_cost + food_cost + misc_cost
-
-    usage_percent = int((used_budget / max_budget) * 100) if max_budget > 0 else 0
-    remaining_percent = max(0, 100 - usage_percent)
-    #--------- per student calculations ---------
-    transport_per_student = transport_cost / num_students
-    stay_per_student = recommended_stay_cost / num_students
-    food_per_student = food_cost / num_students
-    misc_per_student = misc_cost / num_students
-    total_per_student = used_budget / num_students
-    
-    
     # =========================
     # Budget Usage Visualization
     # =========================
     st.markdown("## 📊 Budget Usage")
 
+    usage_percent = plan["usage_percent"]
+
     col1, col2, col3 = st.columns(3)
-    col1.metric("Total Cost", f"₹{used_budget:,}")
+    col1.metric("Total Cost", f"₹{plan['used_budget']:,}")
     if usage_percent > 100:
         col2.metric("Used %", f"{usage_percent}%")
         col2.error("⚠️ Budget Exceeded")
     else:
         col2.metric("Used %", f"{usage_percent}%")
-    col3.metric("Remaining %", f"{remaining_percent}%")
+    col3.metric("Remaining %", f"{plan['remaining_percent']}%")
     if usage_percent < 100:
         st.progress(usage_percent / 100)
 
@@ -304,28 +440,31 @@ if submit:
     col1, col2 = st.columns(2)
     with col1:
         st.write(
-            f"🚍 **Transportation:** ₹{transport_cost:,}  (₹{int(transport_per_student):,} / student)"
+            f"🚍 **Transportation:** ₹{plan['transport_cost']:,}  (₹{int(plan['transport_per_student']):,} / student)"
+        )
+        st.caption(
+            f"{plan['vehicle']} · ~{plan['estimated_distance_km']:,} km round trip"
         )
 
         st.write(
-            f"🏨 **Stay:** ₹{recommended_stay_cost:,}  (₹{int(stay_per_student):,} / student)"
+            f"🏨 **Stay:** ₹{plan['recommended_stay_cost']:,}  (₹{int(plan['stay_per_student']):,} / student)"
         )
 
         st.write(
-            f"🍽️ **Food:** ₹{food_cost:,}  (₹{int(food_per_student):,} / student)"
+            f"🍽️ **Food:** ₹{plan['food_cost']:,}  (₹{int(plan['food_per_student']):,} / student)"
         )
 
         st.write(
-            f"🎟️ **Entry & Misc:** ₹{misc_cost:,}  (₹{int(misc_per_student):,} / student)"
+            f"🎟️ **Entry & Misc:** ₹{plan['misc_cost']:,}  (₹{int(plan['misc_per_student']):,} / student)"
         )
         st.write(
-            f"🧑 **Total Estimated Cost/Student: ₹{int(total_per_student):,} per student**"
+            f"🧑 **Total Estimated Cost/Student: ₹{int(plan['total_per_student']):,} per student**"
         )
 
     with col2:
         st.metric(
             "Total Estimated Cost",
-            f"₹{used_budget:,}"
+            f"₹{plan['used_budget']:,}"
         )
         
 
@@ -337,8 +476,9 @@ if submit:
 
     st.info(
         f"Food costs are estimated for {num_students} students across {num_days} days, "
-        f"aligned with the ₹{max_budget:,} budget, resulting in a {type_of_food} meal plan."
+        f"aligned with the ₹{max_budget:,} budget, resulting in a {plan['type_of_food']} meal plan."
     )
+    st.caption(f"Rates from tariff version {plan['tariff_version']}")
 
     st.markdown("---")
     # =========================================
@@ -346,97 +486,25 @@ if submit:
     # =========================================
     st.markdown("## 💰 Cost Breakdown & Distribution")
 
-    cost_df = pd.DataFrame({
-        "Category": ["Transportation", "Stay", "Food", "Entry & Misc"],
-        "Cost": [transport_cost, recommended_stay_cost, food_cost, misc_cost]
-    })
+    report = plan["report"]
+    categories = [line.category for line in report.costs]
+    category_costs = [line.total for line in report.costs]
 
     col1, col2 = st.columns(2)
 
     # ----- Bar Chart -----
     with col1:
         st.markdown("### 📊 Cost Breakdown")
-        st.bar_chart(cost_df.set_index("Category"))
+        st.bar_chart({"Category": categories, "Cost": category_costs}, x="Category", y="Cost")
 
     # ----- Pie Chart -----
     with col2:
         st.markdown("### 🥧 Budget Distribution")
 
-        fig, ax = plt.subplots(figsize=(4, 4))
-        cost_df.set_index("Category").plot.pie(
-            y="Cost",
-            autopct="%1.1f%%",
-            legend=False,
-            ax=ax
-        )
-        ax.set_ylabel("")
-        st.pyplot(fig)
+        render_pie_chart(st, categories, category_costs)
 
     st.markdown("---")
 
-
-    # ==========================================================================
-    # Alternative Budget Options (Derived from Food & Stay Logics used above)
-    # ==========================================================================
-
-    # Food tiers (already aligned with the food conditions coded above)
-    food_tiers = {
-        "Basic Meals": 300,
-        "Standard Meals": 400,
-        "Premium Meals": 550
-    }
-    # Stay tiers (derived from stay_type and stay_rate used above)
-    budget_food_rate = food_tiers["Basic Meals"]
-    mid_food_rate = food_cost_per_day
-    premium_food_rate = food_tiers["Premium Meals"]
-    # Stay tiers (derived from stay_rate used above)
-    budget_stay_rate = max(stay_rate - 300, 600)
-    mid_stay_rate = stay_rate
-    premium_stay_rate = stay_rate + 800
-
-    options = [
-        {
-            "Option": "Budget",
-            "Stay Type": "Economy Stay",
-            "Stay Rate": budget_stay_rate,
-            "Food Type": "Basic Meals",
-            "Food Rate": budget_food_rate
-        },
-        {
-            "Option": "Mid-Range (Recommended)",
-            "Stay Type": stay_type,
-            "Stay Rate": mid_stay_rate,
-            "Food Type": type_of_food,
-            "Food Rate": mid_food_rate
-        },
-        {
-            "Option": "Premium",
-            "Stay Type": "Premium Hotel / Resort",
-            "Stay Rate": premium_stay_rate,
-            "Food Type": "Premium Meals",
-            "Food Rate": premium_food_rate
-        }
-    ]
-
-    option_rows = []
-
-    for opt in options:
-        total_cost = (
-            transport_cost
-            + (opt["Stay Rate"] * num_students * nights)
-            + (opt["Food Rate"] * num_students * num_days)
-            + misc_cost
-        )
-
-        option_rows.append({
-            "Option": opt["Option"],
-            "Accommodation": opt["Stay Type"],
-            "Food": opt["Food Type"],
-            "Total Cost (₹)": total_cost
-        })
-
-    options_df = pd.DataFrame(option_rows)
-
     # ===================================================
     # Alternative Budget Options chart and analysis
     # ===================================================
@@ -446,7 +514,11 @@ if submit:
     # -------- Bar Chart --------
     with col_chart:
         st.markdown("### 📊 Cost Comparison")
-        st.bar_chart(options_df.set_index("Option")["Total Cost (₹)"])
+        st.bar_chart(
+            {"Option": [option.name for option in report.options],
+             "Total Cost (₹)": [option.total for option in report.options]},
+            x="Option", y="Total Cost (₹)"
+        )
 
     # -------- Analysis  --------
     with col_analysis:
@@ -454,157 +526,140 @@ if submit:
 
         subcols = st.columns(3)
 
-        for idx, (_, row) in enumerate(options_df.iterrows()):
+        for idx, option in enumerate(report.options):
             with subcols[idx]:
-                if "Recommended" in row["Option"]:
-                    st.markdown(f"### ⭐ {row['Option']}")
+                if option.recommended:
+                    st.markdown(f"### ⭐ {option.name}")
                 else:
-                    st.markdown(f"### {row['Option']}")
+                    st.markdown(f"### {option.name}")
 
-                st.write(f"🏨 **Stay:** {row['Accommodation']}")
-                st.write(f"🍽️ **Food:** {row['Food']}")
-                st.write(f"💰 **Total:** ₹{row['Total Cost (₹)']:,}")
+                st.write(f"🏨 **Stay:** {option.accommodation}")
+                st.write(f"🍽️ **Food:** {option.food}")
+                st.write(f"💰 **Total:** ₹{option.total:,}")
 
-                if row["Total Cost (₹)"] <= max_budget:
+                if option.within_budget:
                     st.success("✔ Within Budget")
                 else:
                     st.error("✖ Exceeds Budget")
 
+    # -------- Optimized Options (Pareto front) --------
+    st.markdown("### 🎯 Optimized Options")
+    st.caption(
+        f"{plan['optimized']['evaluated']:,} stay / food / vehicle / activity combinations compared; "
+        "each plan below is the most comfortable one at its price."
+    )
+    best = plan["optimized"]["best"]
+    if best:
+        st.success(
+            f"Best plan within ₹{max_budget:,}: {best['Stay']} · {best['Food']} · "
+            f"{best['Vehicle']} · {best['Activities']} — ₹{best['Total Cost (₹)']:,} "
+            f"(comfort {best['Comfort']})"
+        )
+    else:
+        st.warning(f"No combination fits within ₹{max_budget:,}. Cheapest options are listed first.")
+
+    front = plan["optimized"]["front"]
+    col_front_chart, col_front_table = st.columns([3, 7])
+    with col_front_chart:
+        st.scatter_chart(front, x="Total Cost (₹)", y="Comfort", color="Within Budget")
+    with col_front_table:
+        st.dataframe(front, hide_index=True)
+
+    # =========================
+    # What-if Explorer
+    # =========================
+    st.markdown("## 🎚️ What-if Explorer")
+    what_if_panel(inputs)
+
     # =========================
     # Download Section
     # =========================
     st.markdown("## 📥 Downloads")
 
-    budget_text = f"""
-    TRIPMATE FOR CAMPUS – BUDGET SUMMARY
-    ==================================
-
-    Trip Overview
-    -------------
-    From            : {from_location}
-    To              : {to_location}
-    Travel Month    : {travel_month}
-    Students        : {num_students}
-    Days            : {num_days}
-    Preferences     : {", ".join(location_types) if location_types else "Not specified"}
-
-    ----------------------------------
-    COST BREAKDOWN (TOTAL)
-    ----------------------------------
-    Transportation  : Rs. {transport_cost:,}
-    Stay            : Rs. {recommended_stay_cost:,}
-    Food            : Rs. {food_cost:,}
-    Entry & Misc    : Rs. {misc_cost:,}
-
-    TOTAL COST      : Rs. {used_budget:,}
-
-    ----------------------------------
-    PER STUDENT COST
-    ----------------------------------
-    Transportation  : Rs. {int(transport_per_student):,}
-    Stay            : Rs. {int(stay_per_student):,}
-    Food            : Rs. {int(food_per_student):,}
-    Entry & Misc    : Rs. {int(misc_per_student):,}
-
-    TOTAL / STUDENT : Rs. {int(total_per_student):,}
-
-    ----------------------------------
-    FOOD & STAY 
-    ----------------------------------
-    Food Type       : {type_of_food}
-    Food Cost       : Rs. {food_cost_per_day} per student per day
-
-    Stay Type       : {stay_type}
-    Stay Cost       : Rs. {stay_rate} per student per night
-    Nights          : {nights}
-
-    ----------------------------------
-    ALTERNATIVE OPTIONS
-    ----------------------------------
-    """
-    for _, row in options_df.iterrows():
-        status = (
-            "WITHIN BUDGET"
-            if row["Total Cost (₹)"] <= max_budget
-            else "EXCEEDS BUDGET"
-        )
-
-        budget_text += f"""
-    {row['Option']}
-    ----------------
-    Accommodation   : {row['Accommodation']}
-    Food             : {row['Food']}
-    Total Cost       : Rs. {row['Total Cost (₹)']:,}
-    Status           : {status}
-    """
-
-    #--- Itinerary section---
-    itinerary_text = f"""
-    TRIPMATE FOR CAMPUS – ITINERARY
-    ==============================
-
-    From         : {from_location}
-    To           : {to_location}
-    Travel Month : {travel_month}
-    Students     : {num_students}
-    Days         : {num_days}
-
-    --------------------------------
-    DAY-WISE ITINERARY
-    --------------------------------
-
-    {ai_itinerary}
-
-    ================================
-    Generated by TripMate for Campus
-    """
-
-    combined_text = itinerary_text + "\n\n" + budget_text
-
-
-    for _, row in options_df.iterrows():
-        budget_text += f"""
-    {row['Option']}
-    Stay           : {row['Accommodation']}
-    Food           : {row['Food']}
-    Total Cost     : Rs. {row['Total Cost (₹)']:,}
-    """
-
-    budget_text += f"""
-    ----------------------------------
-    BUDGET UTILIZATION
-    ----------------------------------
-    Maximum Budget  : Rs. {max_budget:,}
-    Used Percentage : {usage_percent}%
-    Status          : {"EXCEEDED" if usage_percent > 100 else "WITHIN BUDGET"}
-
-    ==================================
-    Generated by TripMate for Campus
-    """
-    col1, col2 = st.columns(2)
+    downloads_section = st.container()
 
-    # ---------- Itinerary button ----------
-    with col1:
-        itinerary_pdf = "TripMate_Itinerary.pdf"
-        generate_budget_pdf(itinerary_pdf, itinerary_text)
-
-        with open(itinerary_pdf, "rb") as f:
-            st.download_button(
-                label="📄 Download Itinerary (PDF) and Plan New Trip",
-                data=f,
-                file_name="TripMate_Itinerary.pdf",
-                mime="application/pdf"
+    # ======================================================================
+    # Itinerary AI Generation using HuggingFace Inference API - Llama 3.2
+    # ======================================================================
+    # Model calls from every session share one rate limit and FIFO queue;
+    # each session also has its own quota (utils/limiter_helper).
+    # Days are drawn as each one is parsed, then redrawn with their
+    # regenerate buttons once the whole itinerary is in.
+    if plan["itinerary"] is None:
+        session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex)
+        with itinerary_section:
+            waiting = st.empty()
+            streamed = st.empty()
+            days = []
+            try:
+                # Sampled separately from app_plan: this is most of a plan's time
+                with profiled("app_itinerary"), \
+                        inference_session(session_id, on_wait=queue_status(waiting)):
+                    for day in stream_trip_days(
+                        inputs["from_location"], inputs["to_location"],
+                        inputs["travel_month"], inputs["num_students"],
+                        inputs["num_days"], inputs["location_types"]
+                    ):
+                        days.append(day)
+                        waiting.empty()
+                        streamed.markdown("\n\n".join(day.to_markdown() for day in days))
+            except LimiterError as error:
+                retry_minutes = error.retry_after / 60
+                waiting.warning(
+                    f"⏳ {error}. Please try again in about "
+                    + (f"{retry_minutes:.0f} min." if retry_minutes >= 1
+                       else f"{max(error.retry_after, 1):.0f}s.")
+                )
+            else:
+                waiting.empty()
+                streamed.empty()
+                finish_plan(plan, Itinerary(days))
+                render_itinerary(plan)
+
+    if plan["itinerary"] is None:
+        downloads_section.info("Downloads will be available once the itinerary is ready.")
+    else:
+        with downloads_section:
+            col1, col2 = st.columns(2)
+
+            # ---------- Itinerary button ----------
+            with col1:
+                st.download_button(
+                    label="📄 Download Itinerary (PDF) and Plan New Trip",
+                    data=partial(plan_pdf, plan),
+                    file_name="TripMate_Itinerary.pdf",
+                    mime="application/pdf"
+                )
+
+            # ---------- Itinerary + Budget button ----------
+            with col2:
+                st.download_button(
+                    label="📄 Download Itinerary + Budget (PDF) and Plan New Trip",
+                    data=partial(plan_pdf, plan, with_budget=True),
+                    file_name="TripMate_Itinerary_And_Budget.pdf",
+                    mime="application/pdf"
+                )
+
+            # ---------- Same report as text, JSON and CSV ----------
+            col3, col4, col5 = st.columns(3)
+            col3.download_button(
+                label="📝 Full Report (TXT)",
+                data=partial(plan_export, plan, write_text),
+                file_name="TripMate_Report.txt",
+                mime="text/plain"
+            )
+            col4.download_button(
+                label="🧾 Full Report (JSON)",
+                data=partial(plan_export, plan, write_json),
+                file_name="TripMate_Report.json",
+                mime="application/json"
+            )
+            col5.download_button(
+                label="📊 Full Report (CSV)",
+                data=partial(plan_export, plan, write_csv),
+                file_name="TripMate_Report.csv",
+                mime="text/csv"
             )
 
-    # ---------- Itinerary + Budget button ----------
-    with col2:
-        combined_pdf = "TripMate_Itinerary_And_Budget.pdf"
-        generate_budget_pdf(combined_pdf, combined_text)
-
-        with open(combined_pdf, "rb") as f:
-            st.download_button(
-                label="📄 Download Itinerary + Budget (PDF) and Plan New Trip",
-                data=f,
-                file_name="TripMate_Itinerary_And_Budget.pdf",
-                mime="application/pdf"
-            )
\ No newline at end of file
+with st.sidebar:
+    saved_plans_panel()
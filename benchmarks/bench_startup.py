@@ -0,0 +1,89 @@
+"""Cold-start benchmark: module import time and first paint of the form.
+
+Each sample runs in a fresh interpreter so nothing is already imported.
+Exits with status 1 when the median first paint exceeds the budget or a
+heavy module (pandas, matplotlib, reportlab, huggingface_hub, torch) is
+loaded before the user submits the form.
+
+    python benchmarks/bench_startup.py --runs 5 --budget-ms 2500
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+HEAVY_MODULES = ["pandas", "matplotlib", "reportlab", "huggingface_hub", "torch", "transformers"]
+
+PROBE = r"""
+import json, sys, time
+sys.path.insert(0, {root!r})
+heavy = {heavy!r}
+
+start = time.perf_counter()
+import utils.ai_helper, utils.pdf_helper
+import_ms = (time.perf_counter() - start) * 1000
+
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({app!r}, default_timeout=60)
+start = time.perf_counter()
+at.run()
+paint_ms = (time.perf_counter() - start) * 1000
+
+print(json.dumps({{
+    "import_ms": import_ms,
+    "first_paint_ms": paint_ms,
+    "form_rendered": len(at.button) > 0 and not at.exception,
+    "heavy_loaded": [name for name in heavy if name in sys.modules],
+}}))
+"""
+
+
+def run_once():
+    code = PROBE.format(
+        root=ROOT, heavy=HEAVY_MODULES, app=os.path.join(ROOT, "app.py")
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=2500.0,
+                        help="maximum median first paint in milliseconds")
+    args = parser.parse_args()
+
+    samples = [run_once() for _ in range(args.runs)]
+    import_ms = [sample["import_ms"] for sample in samples]
+    paint_ms = [sample["first_paint_ms"] for sample in samples]
+    heavy_loaded = sorted({name for sample in samples for name in sample["heavy_loaded"]})
+
+    result = {
+        "runs": args.runs,
+        "import_ms_median": round(statistics.median(import_ms), 1),
+        "import_ms_max": round(max(import_ms), 1),
+        "first_paint_ms_median": round(statistics.median(paint_ms), 1),
+        "first_paint_ms_max": round(max(paint_ms), 1),
+        "budget_ms": args.budget_ms,
+        "heavy_loaded": heavy_loaded,
+        "form_rendered": all(sample["form_rendered"] for sample in samples),
+    }
+    print(json.dumps(result, indent=2))
+
+    failed = (
+        result["first_paint_ms_median"] > args.budget_ms
+        or heavy_loaded
+        or not result["form_rendered"]
+    )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
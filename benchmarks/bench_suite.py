@@ -0,0 +1,411 @@
+"""Offline benchmark suite: cost model, prompts, PDFs, report exports, plan store, inference wrapper, end to end.
+
+Runs without network access: model calls go to a local stub with the
+InferenceClient.chat_completion response shape (benchmarks/stub_inference.py)
+and a configurable latency and token rate. Results are written as JSON and
+compared against a stored baseline; any case whose median is more than
+--tolerance slower than the slowest of the baseline's passes, on every one
+of --confirm measurements, fails the run (exit status 1). The baseline is
+several passes of the suite, so each case's threshold covers the spread it
+shows on that machine. Fast cases are looped
+until one sample takes SAMPLE_MS, so even microsecond cases are timed over a
+stable duration.
+
+    python benchmarks/bench_suite.py                       # run, compare with baseline.json
+    python benchmarks/bench_suite.py --only pdf --output results.json
+    python benchmarks/bench_suite.py --save-baseline       # after an intended change
+
+Baselines are machine-specific: regenerate benchmarks/baseline.json on the
+machine (or CI runner) that runs the comparison. The baseline records the
+machine it was taken on; on any other machine the comparison is reported
+but does not fail the run.
+"""
+import argparse
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Benchmarks must not be paced by the shared model rate limit, touch the
+# on-disk itinerary cache or record metrics
+os.environ.setdefault("TRIPMATE_LIMITER_RATE", "100000")
+os.environ.setdefault("TRIPMATE_LIMITER_BURST", "100000")
+os.environ.setdefault("TRIPMATE_SESSION_QUOTA", "100000000")
+os.environ["TRIPMATE_CACHE_PATH"] = ""
+os.environ["TRIPMATE_METRICS"] = "0"
+
+from benchmarks.stub_inference import install_stub  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+PDF_DAYS = (1, 3, 5, 7, 10, 15)
+STORE_PLANS = 100_000
+# Shortest time one sample may take: below a few milliseconds, timer
+# resolution and scheduler noise move microsecond cases by tens of percent
+SAMPLE_MS = 10
+
+TRIP = {
+    "from_location": "Kochi", "to_location": "Munnar", "travel_month": "May",
+    "num_students": 40, "num_days": 5, "max_budget": 250000,
+    "location_types": ["Nature", "Adventure"],
+}
+
+
+# =========================
+# Timing
+# =========================
+
+def _run_loops(func, loops):
+    start = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return time.perf_counter() - start
+
+
+def measure(func, min_time=0.3, min_samples=5, max_samples=200):
+    # Fast cases are looped so each sample takes at least SAMPLE_MS; the
+    # reported times are per call
+    func()
+    loops = 1
+    while _run_loops(func, loops) < SAMPLE_MS / 1000 and loops < 1_000_000:
+        loops *= 2
+
+    samples = []
+    stop = time.perf_counter() + min_time
+    while len(samples) < min_samples or (time.perf_counter() < stop and len(samples) < max_samples):
+        samples.append(_run_loops(func, loops) / loops * 1000)
+    samples.sort()
+    return {
+        "median_ms": round(statistics.median(samples), 4),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 4),
+        "min_ms": round(samples[0], 4),
+        "samples": len(samples),
+        "loops": loops,
+    }
+
+
+# =========================
+# Cases
+# =========================
+
+def cost_cases():
+    from utils.cost_helper import budget_options, estimate_distance_km, estimate_trip_cost
+    from utils.optimizer_helper import optimize_budget
+    from utils.plan_helper import plan_costs
+    from utils.whatif_helper import get_cost_surface
+
+    distance_km = estimate_distance_km(TRIP["from_location"], TRIP["to_location"])
+    args = (TRIP["num_students"], TRIP["num_days"], TRIP["max_budget"], distance_km,
+            TRIP["location_types"])
+    costs = estimate_trip_cost(*args)
+    surface = get_cost_surface(TRIP["from_location"], TRIP["to_location"], TRIP["location_types"])
+    return {
+        "cost/estimate_trip_cost": lambda: estimate_trip_cost(*args),
+        "cost/budget_options": lambda: budget_options(costs),
+        "cost/optimize_budget": lambda: optimize_budget(*args),
+        "cost/plan_costs": lambda: plan_costs(TRIP),
+        "cost/what_if_slice": lambda: surface.cost_at(TRIP["max_budget"]),
+    }
+
+
+def prompt_cases():
+    from utils.ai_helper import build_chunk_prompt, build_day_prompt, build_itinerary_prompt
+    from utils.fallback_helper import template_days
+    from utils.itinerary_helper import Itinerary
+
+    args = (TRIP["from_location"], TRIP["to_location"], TRIP["travel_month"],
+            TRIP["num_students"], TRIP["num_days"], TRIP["location_types"])
+    itinerary = Itinerary(template_days(TRIP["to_location"], TRIP["location_types"], TRIP["num_days"]))
+    return {
+        "prompt/itinerary": lambda: build_itinerary_prompt(*args),
+        "prompt/chunk": lambda: build_chunk_prompt(*args, 4, 5),
+        "prompt/day": lambda: build_day_prompt(*args, itinerary, 3),
+    }
+
+
+def pdf_cases():
+    from utils.fallback_helper import template_days
+    from utils.itinerary_helper import Itinerary
+    from utils.plan_helper import plan_costs
+    from utils.report_helper import write_booklet, write_pdf
+
+    cases, reports = {}, {}
+    for days in PDF_DAYS:
+        inputs = {**TRIP, "num_days": days}
+        report = reports[days] = plan_costs(inputs)["report"].with_itinerary(
+            Itinerary(template_days(TRIP["to_location"], TRIP["location_types"], days))
+        )
+        # Straight to write_pdf: report_pdf_bytes would serve every call
+        # after the first from its cache
+        cases[f"pdf/days_{days:02d}"] = lambda report=report: write_pdf(report, BytesIO())
+    # Both layout passes and the contents, 10 x 5-day trips
+    cases["pdf/booklet_10_trips"] = lambda: write_booklet([reports[5]] * 10, BytesIO())
+    return cases
+
+
+def report_cases():
+    from io import StringIO
+
+    from utils.fallback_helper import template_days
+    from utils.itinerary_helper import Itinerary
+    from utils.plan_helper import plan_costs
+    from utils.report_helper import build_report, write_csv, write_json, write_text
+
+    result = plan_costs(TRIP)
+    itinerary = Itinerary(template_days(TRIP["to_location"], TRIP["location_types"], TRIP["num_days"]))
+    report = result["report"].with_itinerary(itinerary)
+    return {
+        "report/build": lambda: build_report(TRIP, result["costs"], result["options"], itinerary),
+        "report/text": lambda: write_text(report, StringIO()),
+        "report/json": lambda: write_json(report, StringIO()),
+        "report/csv": lambda: write_csv(report, StringIO()),
+    }
+
+
+_plan_store = None
+
+
+def _bench_plan_store():
+    # Built once per process (every pass of --save-baseline reuses it):
+    # mostly groups of 20-60, a few up to 200, spread over 200 destinations
+    global _plan_store
+    if _plan_store is None:
+        import random
+
+        from utils.store_helper import PlanStore
+
+        store = PlanStore(":memory:")
+        rng = random.Random(1)
+        for index in range(STORE_PLANS):
+            num_students = round(rng.triangular(10, 200, 40))
+            store.save({
+                "key": f"bench-{index}",
+                "inputs": {**TRIP, "to_location": f"Town {rng.randrange(200)}",
+                           "num_students": num_students},
+                "costs": {"used_budget": 1000 * num_students, "total_per_student": 1000},
+                "itinerary": [{"day": 1, "morning": "Walk", "source": "model"}],
+            })
+        _plan_store = store
+    return _plan_store
+
+
+def store_cases():
+    store = _bench_plan_store()
+    page = store.search(limit=20)
+    return {
+        "store/recent": lambda: store.search(limit=20),
+        "store/recent_page_2": lambda: store.search(
+            before=(page[-1]["created_at"], page[-1]["id"]), limit=20
+        ),
+        "store/destination": lambda: store.search(to_location="Town 17", limit=20),
+        # A few hundred plans, read from idx_plans_group and sorted
+        "store/students_narrow": lambda: store.search(min_students=190, max_students=195),
+        # No plan this large: found empty in the index, not by a full scan
+        "store/students_none": lambda: store.search(min_students=250, max_students=300),
+        # Most plans: created_at is walked until a page matches
+        "store/students_wide": lambda: store.search(min_students=20, max_students=100),
+    }
+
+
+def inference_cases():
+    from utils.ai_helper import (
+        build_itinerary_prompt, generate_itinerary, max_tokens_for_days, stream_itinerary
+    )
+
+    prompt = build_itinerary_prompt(
+        TRIP["from_location"], TRIP["to_location"], TRIP["travel_month"],
+        TRIP["num_students"], 3, TRIP["location_types"]
+    )
+    params = {"use_cache": False, "max_tokens": max_tokens_for_days(3)}
+    return {
+        "inference/chat_3_days": lambda: generate_itinerary(prompt, **params),
+        "inference/stream_3_days": lambda: "".join(stream_itinerary(prompt, **params)),
+    }
+
+
+def end_to_end_cases():
+    from utils.ai_helper import get_itinerary_cache
+    from utils.plan_helper import build_trip_plan
+    from utils.report_helper import write_pdf
+
+    def plan(days):
+        # Cold: nothing cached, every model call goes to the stub
+        get_itinerary_cache().clear()
+        write_pdf(build_trip_plan({**TRIP, "num_days": days})["report"], BytesIO())
+
+    return {
+        "e2e/plan_03_days": lambda: plan(3),
+        "e2e/plan_15_days": lambda: plan(15),
+    }
+
+
+GROUPS = [cost_cases, prompt_cases, pdf_cases, report_cases, store_cases, inference_cases,
+          end_to_end_cases]
+
+
+def run_suite(patterns=None, min_time=0.3, names=None):
+    results = {}
+    for group in GROUPS:
+        for name, func in group().items():
+            if patterns and not any(fnmatch.fnmatch(name, f"*{p}*") for p in patterns):
+                continue
+            if names is not None and name not in names:
+                continue
+            results[name] = measure(func, min_time=min_time)
+            print(f"{name:<28} {results[name]['median_ms']:>10.3f} ms", file=sys.stderr)
+    return results
+
+
+# =========================
+# Baseline comparison
+# =========================
+
+def machine_fingerprint():
+    # What a baseline's timings depend on, beyond the code under test
+    processor = platform.processor()
+    try:
+        with open("/proc/cpuinfo", encoding="utf-8") as f:
+            processor = next(
+                (line.split(":", 1)[1].strip() for line in f if line.startswith("model name")),
+                processor,
+            )
+    except OSError:
+        pass
+    return {
+        "python": f"{platform.python_implementation()} {platform.python_version()}",
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "processor": processor,
+        "cpus": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    # -> list of {"case", "baseline_ms", "median_ms", "change", "status"}
+    # Relative to the baseline, with no absolute floor: over SAMPLE_MS
+    # samples the median of a microsecond case is as steady as a slow one's
+    # within a run, and between runs it moves by no more than the
+    # baseline's own passes did
+    rows = []
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            rows.append({"case": name, "median_ms": result["median_ms"], "status": "new"})
+            continue
+        change = result["median_ms"] / base["median_ms"] - 1 if base["median_ms"] else 0.0
+        limit = base.get("max_median_ms", base["median_ms"]) * (1 + tolerance)
+        status = "ok"
+        if result["median_ms"] > limit:
+            status = "regression"
+        elif change < -tolerance:
+            status = "faster"
+        rows.append({
+            "case": name, "baseline_ms": base["median_ms"], "median_ms": result["median_ms"],
+            "change": round(change, 3), "status": status,
+        })
+    return rows
+
+
+def merge_passes(passes):
+    # Each case's middle pass, plus the slowest median any pass measured
+    merged = {}
+    for name in passes[0]:
+        runs = sorted((results[name] for results in passes), key=lambda r: r["median_ms"])
+        merged[name] = {**runs[len(runs) // 2], "max_median_ms": runs[-1]["median_ms"]}
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="*", default=None,
+                        help="run only cases whose name contains one of these (e.g. pdf cost/)")
+    parser.add_argument("--min-time", type=float, default=0.3,
+                        help="seconds to sample each case for")
+    parser.add_argument("--stub-latency-ms", type=float, default=20.0,
+                        help="stub model latency before the first token")
+    parser.add_argument("--stub-tokens-per-second", type=float, default=2000.0)
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--tolerance", type=float, default=0.30,
+                        help="allowed slowdown of a case's median vs the slowest baseline pass "
+                             "(0.30 = 30%%)")
+    parser.add_argument("--confirm", type=int, default=3,
+                        help="measurements a case must regress on before the run fails")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store these results as the new baseline instead of comparing")
+    parser.add_argument("--passes", type=int, default=5,
+                        help="runs of the suite a saved baseline is made of")
+    args = parser.parse_args()
+
+    stub = {"latency_ms": args.stub_latency_ms, "tokens_per_second": args.stub_tokens_per_second}
+    install_stub(args.stub_latency_ms / 1000, args.stub_tokens_per_second)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": machine_fingerprint(),
+            "stub": stub,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": run_suite(args.only, args.min_time),
+    }
+
+    if args.save_baseline:
+        passes = [report["results"]]
+        for _ in range(args.passes - 1):
+            passes.append(run_suite(args.only, args.min_time))
+        report["meta"]["passes"] = len(passes)
+        report["results"] = merge_passes(passes)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+        return
+
+    regressions = []
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        meta = baseline.get("meta", {})
+        if meta.get("stub") != stub:
+            print("warning: stub settings differ from the baseline's", file=sys.stderr)
+        report["comparison"] = compare(report["results"], baseline, args.tolerance)
+        regressions = [row for row in report["comparison"] if row["status"] == "regression"]
+        for _ in range(args.confirm - 1):
+            if not regressions:
+                break
+            # The whole machine slows down for seconds at a time: measure the
+            # suspects again and keep their faster run
+            print(f"Re-measuring {len(regressions)} slower cases", file=sys.stderr)
+            again = run_suite(min_time=args.min_time, names={row["case"] for row in regressions})
+            for name, result in again.items():
+                if result["median_ms"] < report["results"][name]["median_ms"]:
+                    report["results"][name] = result
+            report["comparison"] = compare(report["results"], baseline, args.tolerance)
+            regressions = [row for row in report["comparison"] if row["status"] == "regression"]
+        if meta.get("machine") != report["meta"]["machine"]:
+            print("warning: the baseline was taken on a different machine "
+                  f"({meta.get('machine')}); comparison not gated", file=sys.stderr)
+            regressions = []
+        for row in regressions:
+            print(f"REGRESSION {row['case']}: {row['baseline_ms']:.3f} ms -> "
+                  f"{row['median_ms']:.3f} ms ({row['change']:+.0%})", file=sys.stderr)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
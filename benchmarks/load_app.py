@@ -0,0 +1,245 @@
+"""Load test: concurrent headless sessions of app.py against a stubbed model.
+
+Each concurrency level runs in a fresh worker process (like one Streamlit
+server process) in which N threads each drive their own AppTest session
+through the trip_form submit flow: fill in the form, submit, and wait for
+the full page, itinerary included. Trips are varied so sessions don't
+share cached plans or itineraries. Reported per level: page latency
+p50/p95/p99, pages per second and the worker's peak RSS. One unmeasured
+warm-up page per worker keeps import time out of the numbers.
+
+    python benchmarks/load_app.py --levels 1 2 4 8 16 --pages 4
+    python benchmarks/load_app.py --slo-ms 3000 --min-capacity 4 --output load.json
+
+Levels stop ramping once p95 misses --slo-ms; capacity is the highest
+level that met it. Exits with status 1 when capacity is below
+--min-capacity or a session raised.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROUTES = [("Kochi", "Munnar"), ("Bangalore", "Mysore"), ("Chennai", "Pondicherry"),
+          ("Kozhikode", "Wayanad"), ("Trivandrum", "Kanyakumari")]
+
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+def peak_rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # bytes vs KiB
+
+
+def concurrent_app_test():
+    # AppTest swaps process-wide state on every run (the Runtime singleton
+    # and a patched config.get_option) and recompiles the script, which
+    # breaks when sessions run in parallel threads. This variant sets that
+    # state up once per worker process and only does the per-session part
+    # of a run. It leans on AppTest internals (written against Streamlit
+    # 1.5x and later).
+    from unittest.mock import MagicMock, patch
+
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.dataframe_source_manager import DataframeSourceManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.pages_manager import PagesManager
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import AppTest
+    from streamlit.testing.v1.local_script_runner import LocalScriptRunner
+    from streamlit.testing.v1.util import build_mock_config_get_option
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.dataframe_source_mgr = DataframeSourceManager()
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime._instance = runtime
+    patch.object(config, "get_option", new=build_mock_config_get_option({"global.appTest": True})).start()
+    script_cache = ScriptCache()
+
+    class ConcurrentAppTest(AppTest):
+        def __init__(self, script_path, **kwargs):
+            super().__init__(script_path, **kwargs)
+            self.session_id = uuid.uuid4().hex
+
+        def _run(self, widget_state=None, timeout=None):
+            pages_manager = PagesManager(self._script_path, script_cache, setup_watcher=False)
+            runner = LocalScriptRunner(
+                self._script_path, self._session_state, pages_manager,
+                args=self.args, kwargs=self.kwargs, fragment_storage=self._fragment_storage,
+            )
+            # Shared bytecode and a distinct session id per AppTest, as
+            # sessions have in a real server
+            runner._script_cache = script_cache
+            runner._session_id = self.session_id
+            self._tree = runner.run(
+                widget_state, self.query_params, timeout or self.default_timeout, self._page_hash
+            )
+            self._tree._runner = self
+            return self
+
+    return ConcurrentAppTest
+
+
+def run_worker(concurrency, pages, days):
+    # One worker process: `concurrency` sessions, `pages` submits each
+    import threading
+
+    sys.path.insert(0, ROOT)
+    os.environ.setdefault("TRIPMATE_LIMITER_RATE", "100000")
+    os.environ.setdefault("TRIPMATE_LIMITER_BURST", "100000")
+    os.environ.setdefault("TRIPMATE_SESSION_QUOTA", "100000000")
+    os.environ["TRIPMATE_CACHE_PATH"] = ""
+    os.environ["TRIPMATE_PLAN_STORE_PATH"] = ""  # in memory
+
+    from benchmarks.stub_inference import install_stub
+
+    AppTest = concurrent_app_test()
+
+    stub = install_stub(float(os.environ["LOAD_STUB_LATENCY"]),
+                        float(os.environ["LOAD_STUB_TOKENS_PER_SECOND"]))
+    app_path = os.path.join(ROOT, "app.py")
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start_barrier = threading.Barrier(concurrency)
+
+    def session(index):
+        at = AppTest(app_path, default_timeout=120)
+        at.run()
+        start_barrier.wait()
+        try:
+            for page in range(pages):
+                trip = index * pages + page
+                from_location, to_location = ROUTES[trip % len(ROUTES)]
+                at.text_input[0].input(from_location)
+                at.text_input[1].input(to_location)
+                at.number_input[0].set_value(10 + trip % 400)  # distinct plans and prompts
+                at.number_input[1].set_value(days)
+                at.checkbox[0].uncheck()  # measure generation, not itinerary reuse
+                at.button[0].click()
+                started = time.perf_counter()
+                at.run()
+                elapsed = time.perf_counter() - started
+                with lock:
+                    latencies.append(elapsed * 1000)
+                    if at.exception:
+                        errors.append(at.exception[0].message)
+        except Exception as error:
+            with lock:
+                errors.append(repr(error))
+
+    # Warm-up page so imports and first-use setup aren't counted
+    warm_up = AppTest(app_path, default_timeout=120)
+    warm_up.run()
+    warm_up.text_input[0].input("Warm Up")
+    warm_up.text_input[1].input("Page")
+    warm_up.button[0].click()
+    warm_up.run()
+    warm_up_calls = stub.client.calls
+
+    threads = [threading.Thread(target=session, args=(index,)) for index in range(concurrency)]
+    wall_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "pages": len(latencies),
+        "p50_ms": round(percentile(latencies, 0.50), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+        "p99_ms": round(percentile(latencies, 0.99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+        "pages_per_second": round(len(latencies) / wall, 2) if wall else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "model_calls": stub.client.calls - warm_up_calls,
+        "errors": errors[:5],
+        "error_count": len(errors),
+    }
+
+
+def run_level(concurrency, args):
+    env = {
+        **os.environ,
+        "LOAD_STUB_LATENCY": str(args.stub_latency_ms / 1000),
+        "LOAD_STUB_TOKENS_PER_SECOND": str(args.stub_tokens_per_second),
+    }
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", str(concurrency),
+         "--pages", str(args.pages), "--days", str(args.days)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 2, 4, 8, 16],
+                        help="concurrent sessions per step of the ramp")
+    parser.add_argument("--pages", type=int, default=4, help="trip submits per session")
+    parser.add_argument("--days", type=int, default=3, help="trip length (sets itinerary size)")
+    parser.add_argument("--stub-latency-ms", type=float, default=200.0)
+    parser.add_argument("--stub-tokens-per-second", type=float, default=100.0)
+    parser.add_argument("--slo-ms", type=float, default=5000.0,
+                        help="p95 page latency a level must meet to count toward capacity")
+    parser.add_argument("--min-capacity", type=int, default=0,
+                        help="fail when fewer concurrent sessions than this meet the SLO")
+    parser.add_argument("--output", help="write the report JSON here as well")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.pages, args.days)))
+        return
+
+    levels, capacity = [], 0
+    for concurrency in args.levels:
+        result = run_level(concurrency, args)
+        levels.append(result)
+        print(
+            f"{concurrency:>4} sessions  p50 {result['p50_ms']:>8.0f} ms  p95 {result['p95_ms']:>8.0f} ms  "
+            f"p99 {result['p99_ms']:>8.0f} ms  {result['pages_per_second']:>6.2f} pages/s  "
+            f"RSS {result['peak_rss_mb']:>6.0f} MB  errors {result['error_count']}",
+            file=sys.stderr
+        )
+        if result["p95_ms"] > args.slo_ms or result["error_count"]:
+            break
+        capacity = concurrency
+
+    report = {
+        "stub": {"latency_ms": args.stub_latency_ms, "tokens_per_second": args.stub_tokens_per_second},
+        "pages_per_session": args.pages,
+        "days": args.days,
+        "slo_p95_ms": args.slo_ms,
+        "capacity": capacity,
+        "levels": levels,
+    }
+    output = json.dumps(report, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+
+    failed = capacity < args.min_capacity or any(level["error_count"] for level in levels)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
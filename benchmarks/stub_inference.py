@@ -0,0 +1,103 @@
+"""Offline stand-in for the hosted model, for benchmarks and load tests.
+
+StubInferenceClient answers InferenceClient.chat_completion() calls with
+the same response shape (choices[0].message.content, streamed
+choices[0].delta.content chunks, usage) after a configurable latency and
+at a configurable token rate. Itinerary prompts get valid JSON Lines days,
+so the whole parse / fallback path runs as it would against the real API.
+
+    from benchmarks.stub_inference import install_stub
+    install_stub(latency=0.02, tokens_per_second=2000)
+"""
+import json
+import re
+import threading
+import time
+from types import SimpleNamespace
+
+from utils import backend_helper
+
+CHARS_PER_TOKEN = 4
+TOKENS_PER_CHUNK = 4
+
+_DAY_RANGE = re.compile(r"ONLY Day (\d+) to Day (\d+)")
+_ONE_DAY = re.compile(r"ONLY Day (\d+) of")
+_TRIP_DAYS = re.compile(r"Days: (\d+)")
+
+
+def _requested_days(prompt):
+    match = _DAY_RANGE.search(prompt)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+    match = _ONE_DAY.search(prompt)
+    if match:
+        return int(match.group(1)), int(match.group(1))
+    match = _TRIP_DAYS.search(prompt)
+    return 1, int(match.group(1)) if match else 1
+
+
+def stub_itinerary(prompt):
+    first_day, last_day = _requested_days(prompt)
+    return "\n".join(
+        json.dumps({
+            "day": day,
+            "morning": f"Breakfast near the hostel, then the day {day} sightseeing walk",
+            "afternoon": "Lunch at a local canteen and a guided visit to the main attraction",
+            "evening": "Group dinner and free time to explore the market",
+        })
+        for day in range(first_day, last_day + 1)
+    )
+
+
+class StubInferenceClient:
+    def __init__(self, latency=0.02, tokens_per_second=2000.0):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def chat_completion(self, messages, stream=False, max_tokens=700, **params):
+        with self._lock:
+            self.calls += 1
+        prompt = messages[-1]["content"]
+        text = stub_itinerary(prompt)[:max_tokens * CHARS_PER_TOKEN]
+        usage = SimpleNamespace(
+            prompt_tokens=sum(len(m["content"]) for m in messages) // CHARS_PER_TOKEN,
+            completion_tokens=len(text) // CHARS_PER_TOKEN,
+        )
+        if stream:
+            return self._stream(text)
+        self._sleep(self.latency + usage.completion_tokens / self.tokens_per_second)
+        message = SimpleNamespace(role="assistant", content=text)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(index=0, message=message, finish_reason="stop")],
+            usage=usage,
+        )
+
+    def _stream(self, text):
+        self._sleep(self.latency)
+        step = TOKENS_PER_CHUNK * CHARS_PER_TOKEN
+        for start in range(0, len(text), step):
+            self._sleep(TOKENS_PER_CHUNK / self.tokens_per_second)
+            delta = SimpleNamespace(role="assistant", content=text[start:start + step])
+            yield SimpleNamespace(choices=[SimpleNamespace(index=0, delta=delta, finish_reason=None)])
+
+    @staticmethod
+    def _sleep(seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class StubBackend(backend_helper.RemoteBackend):
+    # The remote backend's code path (deadlines, hedging, streaming) with
+    # the stub client in place of InferenceClient
+    def __init__(self, latency=0.02, tokens_per_second=2000.0):
+        self.model_name = "stub"
+        self.client = StubInferenceClient(latency, tokens_per_second)
+
+
+def install_stub(latency=0.02, tokens_per_second=2000.0, name=None):
+    # Makes get_backend() return the stub for the configured backend name
+    backend = StubBackend(latency, tokens_per_second)
+    backend_helper._backends[name or backend_helper.BACKEND] = backend
+    return backend
@@ -0,0 +1,364 @@
+"""Plan a batch of trips without the Streamlit UI.
+
+Reads trip requests from a CSV or JSONL file with the same fields as the
+app's trip form (from_location, to_location, travel_month, num_students,
+num_days, max_budget, location_types and an optional trip_id), then
+writes one PDF per trip plus summary.csv to the output directory.
+
+Costs are computed on a process pool, itineraries are generated with at
+most --concurrency trips in flight, and PDFs are rendered back on the
+process pool. Every finished trip is appended to checkpoint.jsonl, so an
+interrupted batch resumes where it stopped when run again with the same
+input (failed trips are retried).
+
+Planned trips are saved to the plan store (utils/store_helper), where the
+app, the API and scripts/plans.py can find them again; a trip close to a
+saved one (same route, month, length and preferences, similar group size)
+reuses its itinerary instead of calling the model. --no-reuse always
+generates, --no-store leaves the store alone.
+
+    python scripts/batch_plan.py trips.csv
+    python scripts/batch_plan.py trips.jsonl --output-dir out --workers 8 --concurrency 16
+    python scripts/batch_plan.py trips.csv --no-itinerary
+    python scripts/batch_plan.py trips.csv --no-reuse
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.plan_helper import parse_trip_request, plan_key  # noqa: E402
+
+SUMMARY_FIELDS = [
+    "trip_id", "status", "from_location", "to_location", "travel_month",
+    "num_students", "num_days", "max_budget", "location_types",
+    "distance_km", "stay_type", "vehicle", "food_type", "total_cost",
+    "cost_per_student", "usage_percent", "within_budget", "plan_id", "reused_plan",
+    "pdf", "error",
+]
+
+_UNSAFE_FILENAME = re.compile(r"[^A-Za-z0-9._-]+")
+
+
+# =========================
+# Input
+# =========================
+
+def read_requests(path):
+    # Yields (trip_id, raw row dict)
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    row = json.loads(line)
+                    yield str(row.get("trip_id") or f"trip-{line_no:05d}"), row
+    else:
+        with open(path, encoding="utf-8", newline="") as f:
+            for row_no, row in enumerate(csv.DictReader(f), 1):
+                yield str(row.get("trip_id") or f"trip-{row_no:05d}"), row
+
+
+# =========================
+# Pipeline stages
+# =========================
+# Stage functions run in worker processes, so they live at module level
+# and import the cost model there.
+
+def cost_stage(trips):
+    # trips: list of (trip_id, inputs) -> list of (trip_id, inputs, summary, details, error);
+    # details holds the costs, the options table and the trip report
+    from utils.cost_helper import budget_options, estimate_distance_km, estimate_trip_cost
+    from utils.report_helper import build_report
+
+    results = []
+    for trip_id, inputs in trips:
+        try:
+            costs = estimate_trip_cost(
+                inputs["num_students"], inputs["num_days"], inputs["max_budget"],
+                estimate_distance_km(inputs["from_location"], inputs["to_location"]),
+                inputs["location_types"]
+            )
+            summary = {
+                "distance_km": costs["estimated_distance_km"],
+                "stay_type": costs["stay_type"],
+                "vehicle": costs["vehicle"],
+                "food_type": costs["type_of_food"],
+                "total_cost": costs["used_budget"],
+                "cost_per_student": int(costs["total_per_student"]),
+                "usage_percent": costs["usage_percent"],
+                "within_budget": costs["used_budget"] <= inputs["max_budget"],
+            }
+            options = budget_options(costs)
+            details = {
+                "costs": costs, "options": options,
+                "report": build_report(inputs, costs, options),
+            }
+            results.append((trip_id, inputs, summary, details, None))
+        except Exception as error:
+            results.append((trip_id, inputs, None, None, f"cost model: {error}"))
+    return results
+
+
+def itinerary_stage(inputs, store=None):
+    # -> (Itinerary, id of the reused plan or None)
+    from utils.ai_helper import generate_trip_itinerary
+    from utils.itinerary_helper import Itinerary
+
+    match = store.find_close_match(inputs) if store is not None else None
+    if match is not None:
+        ai_itinerary = Itinerary.from_dict(match["itinerary"])
+    else:
+        ai_itinerary = generate_trip_itinerary(
+            inputs["from_location"], inputs["to_location"], inputs["travel_month"],
+            inputs["num_students"], inputs["num_days"], inputs["location_types"]
+        )
+    return ai_itinerary, match and match["id"]
+
+
+def pdf_stage(path, report, sections):
+    from utils.report_helper import write_pdf
+
+    # Written under a temporary name so a killed run never leaves a
+    # truncated PDF behind a "done" checkpoint
+    partial_path = path + ".partial"
+    write_pdf(report, partial_path, sections)
+    os.replace(partial_path, path)
+    return path
+
+
+# =========================
+# Checkpoint and summary
+# =========================
+
+def load_checkpoint(path):
+    records = {}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # last line of an interrupted write
+                records[record["trip_id"]] = record
+    return records
+
+
+def write_summary(path, order, records):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for trip_id in order:
+            record = records.get(trip_id)
+            if record is None:
+                continue
+            row = {**record.get("inputs", {}), **(record.get("summary") or {}), **record}
+            row["location_types"] = "|".join(row.get("location_types") or [])
+            writer.writerow(row)
+
+
+class Progress:
+    def __init__(self, total, stream=sys.stderr, interval=2.0):
+        self.total = total
+        self.done = 0
+        self.failed = 0
+        self.stream = stream
+        self.interactive = stream.isatty()
+        self.interval = interval
+        self.start = time.perf_counter()
+        self._last_report = 0.0
+
+    def update(self, ok):
+        self.done += 1
+        self.failed += not ok
+        now = time.perf_counter()
+        if self.interactive or now - self._last_report >= self.interval or self.done == self.total:
+            self._last_report = now
+            self.report(now)
+
+    def report(self, now):
+        elapsed = now - self.start
+        rate = self.done / elapsed if elapsed else 0.0
+        eta = (self.total - self.done) / rate if rate else 0.0
+        line = (
+            f"{self.done}/{self.total} trips ({self.done * 100 // max(self.total, 1)}%) · "
+            f"{rate:.1f} trips/s · ETA {eta:.0f}s · {self.failed} failed"
+        )
+        if self.interactive:
+            self.stream.write("\r" + line.ljust(72))
+            if self.done == self.total:
+                self.stream.write("\n")
+        else:
+            self.stream.write(line + "\n")
+        self.stream.flush()
+
+
+# =========================
+# Driver
+# =========================
+
+def run_batch(input_path, output_dir, workers=None, concurrency=8, chunk_size=25,
+              itineraries=True, fresh=False, store=True, reuse=True):
+    from utils.report_helper import report_text
+    from utils.store_helper import get_plan_store
+
+    os.makedirs(output_dir, exist_ok=True)
+    plan_store = get_plan_store() if store else None
+    reuse_store = plan_store if reuse else None
+    checkpoint_path = os.path.join(output_dir, "checkpoint.jsonl")
+    if fresh and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    records = load_checkpoint(checkpoint_path)
+
+    order, todo, seen = [], [], set()
+    invalid = []
+    for trip_id, row in read_requests(input_path):
+        if trip_id in seen:
+            raise SystemExit(f"Duplicate trip_id {trip_id!r} in {input_path}")
+        seen.add(trip_id)
+        order.append(trip_id)
+        if records.get(trip_id, {}).get("status") == "ok":
+            continue
+        try:
+            todo.append((trip_id, parse_trip_request(row)))
+        except (ValueError, TypeError) as error:
+            invalid.append((trip_id, str(error)))
+
+    skipped = len(order) - len(todo) - len(invalid)
+    print(
+        f"{len(order)} trips in {input_path}: {skipped} already done, "
+        f"{len(todo)} to plan, {len(invalid)} invalid",
+        file=sys.stderr
+    )
+
+    progress = Progress(len(todo) + len(invalid))
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+        def record(trip_id, status, inputs=None, summary=None, pdf=None, error=None):
+            entry = {
+                "trip_id": trip_id, "status": status, "inputs": inputs or {},
+                "summary": summary, "pdf": pdf, "error": error,
+            }
+            records[trip_id] = entry
+            checkpoint.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            checkpoint.flush()
+            progress.update(status == "ok")
+
+        for trip_id, error in invalid:
+            record(trip_id, "failed", error=f"invalid request: {error}")
+
+        with ProcessPoolExecutor(max_workers=workers) as processes, \
+                ThreadPoolExecutor(max_workers=concurrency) as io_pool:
+            # future -> (stage, payload); stages chain as each one completes
+            pending = {}
+            for start in range(0, len(todo), chunk_size):
+                future = processes.submit(cost_stage, todo[start:start + chunk_size])
+                pending[future] = ("cost", None)
+
+            def save(inputs, summary, details, report):
+                # Saved from this thread only; the id goes into summary.csv
+                if plan_store is not None:
+                    summary["plan_id"] = plan_store.save({
+                        "key": plan_key(inputs), "inputs": inputs,
+                        "costs": details["costs"], "options": details["options"],
+                        "budget_text": report_text(report, ("budget",)),
+                        "itinerary": [day.to_dict() for day in report.days] or None,
+                        "itinerary_text": report_text(report, ("itinerary",)) if report.days else None,
+                    })
+
+            def submit_pdf(trip_id, inputs, summary, report, sections):
+                path = os.path.join(output_dir, _UNSAFE_FILENAME.sub("_", trip_id) + ".pdf")
+                future = processes.submit(pdf_stage, path, report, sections)
+                pending[future] = ("pdf", (trip_id, inputs, summary))
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, payload = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as error:
+                        if stage == "cost":
+                            raise
+                        trip_id, inputs, summary = payload[:3]
+                        record(trip_id, "failed", inputs, summary, error=f"{stage}: {error}")
+                        continue
+
+                    if stage == "cost":
+                        for trip_id, inputs, summary, details, error in result:
+                            if error:
+                                record(trip_id, "failed", inputs, error=error)
+                            elif itineraries:
+                                future = io_pool.submit(itinerary_stage, inputs, reuse_store)
+                                pending[future] = ("itinerary", (trip_id, inputs, summary, details))
+                            else:
+                                save(inputs, summary, details, details["report"])
+                                submit_pdf(trip_id, inputs, summary, details["report"], ("budget",))
+                    elif stage == "itinerary":
+                        trip_id, inputs, summary, details = payload
+                        itinerary, summary["reused_plan"] = result
+                        report = details["report"].with_itinerary(itinerary)
+                        save(inputs, summary, details, report)
+                        submit_pdf(trip_id, inputs, summary, report, ("itinerary", "budget"))
+                    else:
+                        trip_id, inputs, summary = payload
+                        record(trip_id, "ok", inputs, summary, pdf=os.path.basename(result))
+
+    summary_path = os.path.join(output_dir, "summary.csv")
+    write_summary(summary_path, order, records)
+    return progress, summary_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="CSV or JSONL file of trip requests")
+    parser.add_argument("--output-dir", default="batch_output")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for the cost model and PDFs (default: CPU count)")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="trips whose itineraries are generated at the same time")
+    parser.add_argument("--chunk-size", type=int, default=25,
+                        help="trips per cost-model task")
+    parser.add_argument("--no-itinerary", action="store_true",
+                        help="skip itinerary generation; PDFs contain the budget summary only")
+    parser.add_argument("--fresh", action="store_true",
+                        help="ignore the existing checkpoint and plan every trip again")
+    parser.add_argument("--no-store", action="store_true",
+                        help="don't save plans to (or reuse itineraries from) the plan store")
+    parser.add_argument("--no-reuse", action="store_true",
+                        help="generate every itinerary even when a saved plan is a close match")
+    parser.add_argument("--metrics", action="store_true",
+                        help="log stage timings as JSON lines and write metrics.prom to the "
+                             "output directory (worker-process stages are logged only)")
+    args = parser.parse_args()
+    if args.metrics:
+        from utils.metrics_helper import enable_metrics
+
+        os.environ["TRIPMATE_METRICS"] = "1"  # for the worker processes
+        enable_metrics()
+
+    progress, summary_path = run_batch(
+        args.input, args.output_dir, workers=args.workers, concurrency=args.concurrency,
+        chunk_size=args.chunk_size, itineraries=not args.no_itinerary, fresh=args.fresh,
+        store=not args.no_store, reuse=not args.no_reuse
+    )
+    elapsed = time.perf_counter() - progress.start
+    print(
+        f"{progress.done} trips processed ({progress.failed} failed) in {elapsed:.1f}s "
+        f"· {progress.done / elapsed if elapsed else 0:.1f} trips/s -> {summary_path}"
+    )
+    if args.metrics:
+        from utils.metrics_helper import get_registry
+
+        with open(os.path.join(args.output_dir, "metrics.prom"), "w", encoding="utf-8") as f:
+            f.write(get_registry().prometheus_text())
+    if progress.failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Write a booklet of saved plans: one PDF, one trip per section, with contents.
+
+Trips come from the plan store (TRIPMATE_PLAN_STORE_PATH), newest first,
+picked by the same filters as `scripts/plans.py list`, by id, or from the
+plan_id column of a batch run's summary.csv (in its order). Plans are read,
+laid out and released one at a time, so memory stays flat however many
+trips the booklet covers.
+
+    python scripts/booklet.py --to Munnar --month May -o munnar_may.pdf
+    python scripts/booklet.py --summary batch_output/summary.csv -o department.pdf
+    python scripts/booklet.py --ids 12 15 42 --sections budget -o budgets.pdf
+"""
+import argparse
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.pdf_helper import BOOKLET_TITLE  # noqa: E402
+from utils.report_helper import SECTIONS, saved_plan_report, write_booklet  # noqa: E402
+from utils.store_helper import get_plan_store  # noqa: E402
+
+
+def summary_plan_ids(path):
+    with open(path, newline="", encoding="utf-8") as handle:
+        for row in csv.DictReader(handle):
+            if row.get("plan_id"):
+                yield int(row["plan_id"])
+
+
+def selected_plans(store, args):
+    if args.ids or args.summary:
+        plan_ids = args.ids or summary_plan_ids(args.summary)
+    else:
+        plan_ids = (plan["id"] for plan in store.iter_search(
+            to_location=args.to, from_location=args.from_location, month=args.month,
+            min_students=args.min_students, max_students=args.max_students,
+        ))
+    for plan_id in plan_ids:
+        plan = store.get(plan_id)
+        if plan is None:
+            print(f"Skipping plan {plan_id}: not in the store", file=sys.stderr)
+            continue
+        yield plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", default="trip_booklet.pdf")
+    parser.add_argument("--title", default=BOOKLET_TITLE)
+    parser.add_argument("--ids", type=int, nargs="+", help="saved plan ids, in booklet order")
+    parser.add_argument("--summary", help="a batch run's summary.csv")
+    parser.add_argument("--to", help="destination")
+    parser.add_argument("--from", dest="from_location", help="starting location")
+    parser.add_argument("--month")
+    parser.add_argument("--min-students", type=int)
+    parser.add_argument("--max-students", type=int)
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument("--no-contents", action="store_true",
+                        help="skip the table of contents (one layout pass instead of two)")
+    args = parser.parse_args()
+
+    try:
+        reports = (saved_plan_report(plan) for plan in selected_plans(get_plan_store(), args))
+        stats = write_booklet(
+            reports, args.output, args.sections, title=args.title, contents=not args.no_contents
+        )
+    except ValueError as error:
+        raise SystemExit(str(error))
+
+    if not stats["trips"]:
+        os.remove(args.output)
+        raise SystemExit("No saved plans match.")
+    print(
+        f"{stats['trips']} trips, {stats['pages']} pages in {stats['seconds']:.1f}s "
+        f"({stats['pages_per_second']} pages/s) -> {args.output}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Precompute the place-to-place distance matrix used by utils/geo_helper.
+
+Reads the gazetteer (data/places.csv or TRIPMATE_PLACES_PATH) and writes
+a condensed float32 matrix plus a JSON sidecar. Re-run it whenever the
+place list changes; a stale matrix is detected and ignored.
+
+    python scripts/build_distance_matrix.py
+    python scripts/build_distance_matrix.py --places my_places.csv --output /srv/tripmate/distances.npy
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.geo_helper import (  # noqa: E402
+    DEFAULT_MATRIX_PATH, DEFAULT_PLACES_PATH, Gazetteer, build_distance_matrix
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--places", default=DEFAULT_PLACES_PATH)
+    parser.add_argument("--output", default=DEFAULT_MATRIX_PATH)
+    args = parser.parse_args()
+
+    gazetteer = Gazetteer.from_csv(args.places)
+    start = time.perf_counter()
+    build_distance_matrix(gazetteer, args.output)
+    elapsed = time.perf_counter() - start
+
+    n = len(gazetteer)
+    print(
+        f"{n} places, {n * (n - 1) // 2:,} pairs, "
+        f"{os.path.getsize(args.output) / 1e6:.1f} MB -> {args.output} "
+        f"in {elapsed:.2f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""List, search and reopen saved plans from the command line.
+
+Plans saved by the app, the API and scripts/batch_plan.py live in the plan
+store (TRIPMATE_PLAN_STORE_PATH). Listing prints one line per plan, newest
+first; `show` prints a saved plan's reports, or its JSON, or writes it
+back out as a PDF.
+
+    python scripts/plans.py list --to Munnar --month May --limit 50
+    python scripts/plans.py list --min-students 30 --max-students 60
+    python scripts/plans.py show 42
+    python scripts/plans.py show 42 --json
+    python scripts/plans.py show 42 --pdf plan_42.pdf
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.store_helper import get_plan_store  # noqa: E402
+
+
+def list_plans(args):
+    plans = get_plan_store().search(
+        to_location=args.to, from_location=args.from_location, month=args.month,
+        min_students=args.min_students, max_students=args.max_students, limit=args.limit
+    )
+    for plan in plans:
+        saved = time.strftime("%Y-%m-%d %H:%M", time.localtime(plan["created_at"]))
+        print(
+            f"{plan['id']:>8}  {saved}  {plan['from_location']} -> {plan['to_location']}  "
+            f"{plan['travel_month']}  {plan['num_students']} students  {plan['num_days']} days  "
+            f"₹{plan['total_cost'] or 0:,}" + ("" if plan["reusable"] else "  (no model itinerary)")
+        )
+    if not plans:
+        print("No saved plans match.", file=sys.stderr)
+
+
+def show_plan(args):
+    plan = get_plan_store().get(args.plan_id)
+    if plan is None:
+        raise SystemExit(f"No saved plan with id {args.plan_id}")
+    sections = [text for text in (plan["itinerary_text"], plan["budget_text"]) if text]
+    if args.pdf:
+        from utils.report_helper import SECTIONS, saved_plan_report, write_pdf
+
+        write_pdf(saved_plan_report(plan), args.pdf, SECTIONS if plan["itinerary"] else ("budget",))
+        print(f"Plan {plan['id']} written to {args.pdf}")
+    elif args.json:
+        print(json.dumps(plan, indent=2, ensure_ascii=False))
+    else:
+        print("\n".join(sections))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    listing = commands.add_parser("list", help="saved plans, newest first")
+    listing.add_argument("--to", help="destination")
+    listing.add_argument("--from", dest="from_location", help="starting location")
+    listing.add_argument("--month")
+    listing.add_argument("--min-students", type=int)
+    listing.add_argument("--max-students", type=int)
+    listing.add_argument("--limit", type=int, default=20)
+    listing.set_defaults(run=list_plans)
+
+    show = commands.add_parser("show", help="reopen one saved plan")
+    show.add_argument("plan_id", type=int)
+    show.add_argument("--json", action="store_true", help="print the whole plan as JSON")
+    show.add_argument("--pdf", help="write the itinerary + budget PDF here")
+    show.set_defaults(run=show_plan)
+
+    args = parser.parse_args()
+    try:
+        args.run(args)
+    except ValueError as error:
+        raise SystemExit(str(error))
+
+
+if __name__ == "__main__":
+    main()
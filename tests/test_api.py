@@ -0,0 +1,66 @@
+import json
+import socket
+import threading
+
+import pytest
+
+import api
+
+
+@pytest.fixture
+def server():
+    server = api.make_server(port=0, service=api.PlanService(workers=1, queue=1))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address
+    server.shutdown()
+    server.server_close()
+
+
+def exchange(address, payload):
+    # Sends raw bytes on one connection; returns everything the server
+    # wrote before closing it
+    with socket.create_connection(address, timeout=5) as connection:
+        connection.sendall(payload)
+        chunks = []
+        while True:
+            try:
+                chunk = connection.recv(65536)
+            except socket.timeout:
+                break
+            if not chunk:
+                break
+            chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def test_oversized_body_closes_the_connection(server):
+    body = b"x" * (api.MAX_BODY_BYTES + 1)
+    response = exchange(server, (
+        b"POST /plan HTTP/1.1\r\nHost: test\r\n"
+        b"Content-Length: " + str(len(body)).encode() + b"\r\n\r\n" + body
+        + b"GET /health HTTP/1.1\r\nHost: test\r\n\r\n"
+    ))
+    assert response.startswith(b"HTTP/1.1 413 ")
+    assert b"Connection: close" in response
+    # The unread body is not parsed as a request, and nothing else is answered
+    assert response.count(b"HTTP/1.1 ") == 1
+
+
+@pytest.mark.parametrize("length", [b"-1", b"abc"])
+def test_invalid_content_length_is_rejected(server, length):
+    response = exchange(server, (
+        b"POST /plan HTTP/1.1\r\nHost: test\r\nContent-Length: " + length + b"\r\n\r\n{}"
+        + b"GET /health HTTP/1.1\r\nHost: test\r\n\r\n"
+    ))
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert response.count(b"HTTP/1.1 ") == 1
+
+
+def test_keep_alive_serves_follow_up_requests(server):
+    response = exchange(server, (
+        b"GET /health HTTP/1.1\r\nHost: test\r\n\r\n"
+        b"GET /health HTTP/1.1\r\nHost: test\r\nConnection: close\r\n\r\n"
+    ))
+    assert response.count(b"HTTP/1.1 200 ") == 2
+    assert json.loads(response.rsplit(b"\r\n\r\n", 1)[1])
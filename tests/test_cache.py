@@ -0,0 +1,91 @@
+import pytest
+
+from utils import cache_helper
+from utils.cache_helper import ItineraryCache, make_key
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_helper.time, "time", clock)
+    return clock
+
+
+def cache_at(tmp_path, **options):
+    return ItineraryCache(path=str(tmp_path / "itineraries.sqlite3"), **options)
+
+
+def disk_keys(cache):
+    return {key for (key,) in cache._db.execute("SELECT key FROM itineraries")}
+
+
+def test_key_ignores_argument_order():
+    assert make_key(prompt="p", max_tokens=10) == make_key(max_tokens=10, prompt="p")
+    assert make_key(prompt="p", max_tokens=10) != make_key(prompt="p", max_tokens=11)
+
+
+def test_entries_expire_after_ttl(tmp_path, clock):
+    cache = cache_at(tmp_path, ttl_seconds=60)
+    cache.set("a", "plan")
+    clock.now += 60
+    assert cache.get("a") == "plan"
+    clock.now += 1
+    assert cache.get("a") is None
+    assert disk_keys(cache) == set()
+    assert cache.stats()["misses"] == 1
+
+
+def test_expired_entries_are_purged_on_write(tmp_path, clock):
+    cache = cache_at(tmp_path, ttl_seconds=60)
+    cache.set("old", "plan")
+    clock.now += 61
+    cache.set("new", "plan")
+    assert disk_keys(cache) == {"new"}
+
+
+def test_disk_tier_survives_a_restart(tmp_path, clock):
+    cache_at(tmp_path).set("a", "plan")
+    reopened = cache_at(tmp_path)
+    assert reopened.get("a") == "plan"
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.get("a") == "plan"
+    assert reopened.stats()["memory_hits"] == 1
+
+
+def test_memory_tier_evicts_least_recently_used(tmp_path, clock):
+    cache = ItineraryCache(path=None, max_memory_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"  # b is now the oldest
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_disk_tier_evicts_least_recently_read(tmp_path, clock):
+    cache = cache_at(tmp_path, max_memory_entries=1, max_disk_entries=2)
+    cache.set("a", "1")
+    clock.now += 1
+    cache.set("b", "2")
+    clock.now += 1
+    assert cache.get("a") == "1"  # read from disk: a is fresher than b
+    clock.now += 1
+    cache.set("c", "3")
+    assert disk_keys(cache) == {"a", "c"}
+
+
+def test_clear_empties_both_tiers(tmp_path, clock):
+    cache = cache_at(tmp_path)
+    cache.set("a", "plan")
+    cache.clear()
+    assert cache.get("a") is None
+    assert disk_keys(cache) == set()
@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+from utils.itinerary_helper import DayStreamParser
+
+DAYS = [
+    {"day": 1, "morning": "Tea gardens", "afternoon": "Mattupetty Dam", "evening": "Campfire"},
+    {"day": 2, "morning": "Eravikulam", "afternoon": "Anamudi viewpoint", "evening": "Market"},
+    {"day": 3, "morning": "Spice farm", "afternoon": "Echo Point", "evening": "Return"},
+]
+JSONL = "".join(json.dumps(day) + "\n" for day in DAYS)
+
+
+def feed_in_pieces(parser, text, size):
+    days = []
+    for start in range(0, len(text), size):
+        days.extend(parser.feed(text[start:start + size]))
+    return days
+
+
+@pytest.mark.parametrize("size", [1, 7, 64, len(JSONL)])
+def test_each_day_is_emitted_once_its_line_completes(size):
+    parser = DayStreamParser()
+    days = feed_in_pieces(parser, JSONL, size)
+    assert [day.morning for day in days] == ["Tea gardens", "Eravikulam", "Spice farm"]
+    assert [day.day for day in days] == [1, 2, 3]
+    assert parser.finish() == []
+
+
+def test_day_is_not_emitted_before_its_newline():
+    parser = DayStreamParser()
+    line = json.dumps(DAYS[0])
+    assert parser.feed(line) == []
+    assert [day.day for day in parser.feed("\n")] == [1]
+
+
+def test_last_line_without_newline_comes_from_finish():
+    parser = DayStreamParser()
+    assert len(parser.feed(JSONL.rstrip("\n"))) == 2
+    assert [day.evening for day in parser.finish()] == ["Return"]
+
+
+def test_days_are_numbered_from_first_day_whatever_the_model_wrote():
+    parser = DayStreamParser(first_day=4)
+    days = parser.feed(JSONL) + parser.finish()
+    assert [day.day for day in days] == [4, 5, 6]
+    assert parser.next_day == 7
+
+
+def test_fences_prose_and_invalid_lines_are_skipped():
+    text = (
+        "Here is your plan:\n```jsonl\n"
+        + json.dumps(DAYS[0]) + "\n"
+        + '{"day": 2, "morning": "Only a morning"}\n'
+        + '{"day": 3, "morning": broken json}\n'
+        + json.dumps(DAYS[1]) + "\n```\n"
+    )
+    parser = DayStreamParser()
+    days = feed_in_pieces(parser, text, 5) + parser.finish()
+    assert [(day.day, day.morning) for day in days] == [(1, "Tea gardens"), (2, "Eravikulam")]
+
+
+def test_text_layout_is_parsed_when_the_stream_ends():
+    text = (
+        "Day 1:\n- Morning: Tea gardens\n- Afternoon: Dam\n- Evening: Campfire\n\n"
+        "Day 2:\n- Morning: Eravikulam\n- Afternoon: Viewpoint\n- Evening: Market\n"
+    )
+    parser = DayStreamParser()
+    assert feed_in_pieces(parser, text, 9) == []
+    days = parser.finish()
+    assert [(day.day, day.afternoon) for day in days] == [(1, "Dam"), (2, "Viewpoint")]
@@ -0,0 +1,137 @@
+import threading
+import time
+
+import pytest
+
+from utils import limiter_helper
+from utils.limiter_helper import (
+    InferenceLimiter, QueueFull, QuotaExceeded, acquire_inference, inference_session
+)
+from utils.resilience_helper import call_with_deadline, deadline_after
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    # The module-wide limiter, fresh and fast enough not to slow tests down
+    limiter = InferenceLimiter(rate=1000, burst=4, max_queue=10, max_wait=5, session_quota=10)
+    monkeypatch.setattr(limiter_helper, "_limiter", limiter)
+    return limiter
+
+
+def used(limiter, session):
+    return len(limiter._usage.get(session, ()))
+
+
+def test_burst_then_queue_in_arrival_order():
+    clock = Clock()
+    limiter = InferenceLimiter(rate=1, burst=2, max_queue=10, max_wait=1000, session_quota=0,
+                               clock=clock)
+    assert limiter.acquire() == 0.0
+    assert limiter.acquire() == 0.0
+
+    served = []
+    threads = []
+    for index in range(5):
+        thread = threading.Thread(target=lambda index=index: (limiter.acquire(), served.append(index)))
+        thread.start()
+        threads.append(thread)
+        # The clock is stopped, so nobody is served until every ticket is queued
+        while limiter.status()["queued"] < index + 1:
+            time.sleep(0.001)
+
+    while any(thread.is_alive() for thread in threads):
+        clock.now += 1
+        time.sleep(0.01)
+    assert served == [0, 1, 2, 3, 4]
+
+
+def test_cost_above_burst_is_refused():
+    limiter = InferenceLimiter(rate=1, burst=4)
+    with pytest.raises(ValueError):
+        limiter.acquire(5)
+
+
+def test_wait_longer_than_timeout_is_refused():
+    clock = Clock()
+    limiter = InferenceLimiter(rate=1, burst=2, session_quota=0, clock=clock)
+    limiter.acquire(2)
+    with pytest.raises(QueueFull) as raised:
+        limiter.acquire(2, timeout=1)
+    assert raised.value.retry_after == pytest.approx(2)
+    assert limiter.status()["queued"] == 0
+
+
+def test_session_quota_per_window():
+    clock = Clock()
+    limiter = InferenceLimiter(rate=1000, burst=4, session_quota=3, quota_window=60, clock=clock)
+    for _ in range(3):
+        limiter.acquire(session="a")
+    with pytest.raises(QuotaExceeded) as raised:
+        limiter.acquire(session="a")
+    assert raised.value.retry_after == pytest.approx(60)
+    limiter.acquire(session="b")  # other sessions are unaffected
+
+    clock.now += 60
+    limiter.acquire(session="a")
+    assert used(limiter, "a") == 1
+
+
+def test_idle_sessions_are_forgotten():
+    clock = Clock()
+    limiter = InferenceLimiter(rate=1000, burst=4, session_quota=3, quota_window=60, clock=clock)
+    for index in range(100):
+        clock.now += 0.01
+        limiter.acquire(session=f"s{index}")
+    assert len(limiter._usage) == 100
+
+    clock.now += 60
+    limiter.acquire(session="late")
+    assert list(limiter._usage) == ["late"]
+
+
+def test_refused_wait_gives_the_quota_back():
+    clock = Clock()
+    limiter = InferenceLimiter(rate=1, burst=2, session_quota=5, clock=clock)
+    limiter.acquire(2, session="a")
+    with pytest.raises(QueueFull):
+        limiter.acquire(2, session="b", timeout=1)
+    assert used(limiter, "a") == 2
+    assert "b" not in limiter._usage
+
+
+def test_large_cost_is_acquired_in_pieces(limiter):
+    with inference_session("batch"):
+        acquire_inference(10)
+    assert used(limiter, "batch") == 10
+    with inference_session("batch"), pytest.raises(QuotaExceeded):
+        acquire_inference(1)
+
+
+def test_retries_and_hedges_each_take_quota(limiter):
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("reset")
+        if len(attempts) == 2:
+            time.sleep(0.3)  # slow enough to be hedged
+        return "ok"
+
+    with inference_session("student"):
+        result = call_with_deadline(
+            flaky, deadline_after(5), admit=lambda timeout: acquire_inference(timeout=timeout),
+            retries=1, hedge_after=0.05,
+        )
+    assert result == "ok"
+    # The first attempt, its retry and the retry's hedge
+    assert len(attempts) == 3
+    assert used(limiter, "student") == 3
@@ -0,0 +1,56 @@
+import pytest
+
+from utils.cost_helper import estimate_trip_cost
+from utils.optimizer_helper import optimize_budget, plan_grid
+from utils.tariff_helper import get_tariff
+
+
+@pytest.mark.parametrize("num_students", [8, 15, 16, 40, 75, 150])
+@pytest.mark.parametrize("location_types", [[], ["Nature"], ["Nature", "Adventure", "Heritage"]])
+def test_default_choices_cost_what_the_cost_model_charges(num_students, location_types):
+    num_days, max_budget, distance_km = 4, 60000 * num_students // 40, 180
+    costs = estimate_trip_cost(num_students, num_days, max_budget, distance_km, location_types)
+    grid = plan_grid(num_students, num_days, distance_km, location_types)
+
+    index = (
+        grid["stays"].index(costs["stay_type"]),
+        grid["foods"].index(costs["type_of_food"]),
+        grid["vehicles"].index(costs["vehicle"]),
+        grid["activities"].index(tuple(location_types)),
+    )
+    assert grid["valid"][index]
+    assert grid["cost"][index] == costs["used_budget"]
+
+
+def test_stay_tiers_are_priced_alike():
+    tariff = get_tariff()
+    rates = dict(zip(tariff.optimizer.stay_types, tariff.optimizer.stay_rates.tolist()))
+    for tier in tariff.stay.tiers:
+        assert rates[tier["type"]] == tier["rate"]
+
+
+def test_vehicles_too_small_for_the_group_are_not_offered():
+    grid = plan_grid(40, 3, 100, ["Nature"])
+    offered = {
+        vehicle for index, vehicle in enumerate(grid["vehicles"])
+        if grid["valid"][:, :, index, :].any()
+    }
+    assert "Tempo Traveller" not in offered
+    assert {"Mini Bus", "Large Bus", "Multiple Buses"} <= offered
+
+
+def test_activity_set_costs_its_dearest_type():
+    tariff = get_tariff()
+    grid = plan_grid(20, 3, 100, ["Nature", "Adventure"])
+    both = grid["activities"].index(("Nature", "Adventure"))
+    adventure = grid["activities"].index(("Adventure",))
+    assert (grid["cost"][..., both] == grid["cost"][..., adventure]).all()
+    assert tariff.misc_cost_map["Adventure"] > tariff.misc_cost_map["Nature"]
+
+
+def test_best_plan_fits_the_budget():
+    result = optimize_budget(40, 5, 250000, 180, ["Nature", "Adventure"])
+    assert result["best"]["Within Budget"]
+    assert result["best"]["Total Cost (₹)"] <= 250000
+    costs = [plan["Total Cost (₹)"] for plan in result["front"]]
+    assert costs == sorted(costs)
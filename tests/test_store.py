@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from utils import store_helper
+from utils.store_helper import PlanStore
+
+
+def plan(index, num_students, to_location="Munnar"):
+    return {
+        "key": f"plan-{index}",
+        "inputs": {
+            "from_location": "Kochi", "to_location": to_location, "travel_month": "May",
+            "num_students": num_students, "num_days": 3, "max_budget": 100000,
+            "location_types": ["Nature"],
+        },
+        "costs": {"used_budget": 90000, "total_per_student": 90000 // num_students},
+        "itinerary": [{"day": 1, "morning": "Walk", "source": "model"}],
+    }
+
+
+@pytest.fixture
+def store(monkeypatch):
+    # Half the plans share one timestamp, so pages must break ties on id
+    clock = iter([1000.0] * 50 + [1000.0 + step for step in range(1, 1000)])
+    monkeypatch.setattr(store_helper.time, "time", lambda: next(clock))
+    store = PlanStore(":memory:")
+    sizes = random.Random(7).choices(range(10, 121), k=100)
+    for index, size in enumerate(sizes):
+        store.save(plan(index, size, to_location=("Munnar", "Wayanad")[index % 2]))
+    yield store
+    store.close()
+
+
+def newest_first(plans):
+    return sorted(plans, key=lambda p: (p["created_at"], p["id"]), reverse=True)
+
+
+@pytest.mark.parametrize("page_size", [1, 7, 50, 100, 200])
+def test_pages_cover_every_plan_once_newest_first(store, page_size):
+    plans = list(store.iter_search(page_size=page_size))
+    assert len(plans) == 100
+    assert len({p["id"] for p in plans}) == 100
+    assert plans == newest_first(plans)
+
+
+def test_before_continues_after_the_last_row(store):
+    first = store.search(limit=60)
+    rest = store.search(before=(first[-1]["created_at"], first[-1]["id"]), limit=60)
+    assert [p["id"] for p in first + rest] == [p["id"] for p in store.iter_search(page_size=13)]
+
+
+def test_pages_respect_filters(store):
+    plans = list(store.iter_search(page_size=4, to_location="wayanad", min_students=30))
+    assert plans
+    assert all(p["to_location"] == "Wayanad" and p["num_students"] >= 30 for p in plans)
+    assert len(plans) == sum(
+        1 for p in store.iter_search() if p["to_location"] == "Wayanad" and p["num_students"] >= 30
+    )
+
+
+@pytest.mark.parametrize("low, high", [(40, 45), (10, 120), (None, 20), (100, None), (200, 300)])
+def test_range_search_is_the_same_by_either_index(store, monkeypatch, low, high):
+    results = []
+    for sort_cost in (1e12, 1e-12):  # walk created_at; read idx_plans_group
+        monkeypatch.setattr(store_helper, "RANGE_SORT_COST", sort_cost)
+        results.append(list(store.iter_search(page_size=9, min_students=low, max_students=high)))
+    assert results[0] == results[1]
+    assert all(
+        (low is None or p["num_students"] >= low) and (high is None or p["num_students"] <= high)
+        for p in results[0]
+    )
@@ -1,30 +1,496 @@
+import contextvars
+import logging
 import os
-from huggingface_hub import InferenceClient
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from utils.backend_helper import configured_backend, get_backend
+from utils.cache_helper import ItineraryCache, make_key
+from utils.fallback_helper import template_days
+from utils.itinerary_helper import (
+    DayPlan, DayStreamParser, Itinerary, ItineraryFormatError, parse_days
+)
+from utils.limiter_helper import QuotaExceeded, acquire_inference
+from utils.metrics_helper import estimate_tokens, record_tokens, span, timed
+from utils.resilience_helper import (
+    FIRST_TOKEN_DEADLINE, ITINERARY_DEADLINE, call_with_deadline, deadline_after,
+    stream_with_deadline
+)
+
+logger = logging.getLogger(__name__)
+
+SYSTEM_PROMPT = "You are an expert travel planner for college students."
+GENERATION_PARAMS = {
+    "max_tokens": 700,
+    "temperature": 0.7,
+    "top_p": 0.9,
+}
+
+# Token budget per request scales with the number of days it covers
+# (~3 slots of a few sentences each per day), instead of a flat 700.
+TOKENS_PER_DAY = 220
+TOKENS_OVERHEAD = 60
+MAX_TOKENS_LIMIT = 4096
 
-client = InferenceClient(
-    model="meta-llama/Llama-3.2-3B-Instruct",
-    token=os.getenv("HF_TOKEN")
+# "single": one request for the whole trip, "parallel": day-range chunks
+# generated concurrently, "auto": parallel once the trip is longer than
+# one chunk.
+ITINERARY_MODE = os.getenv("TRIPMATE_ITINERARY_MODE", "auto")
+ITINERARY_CHUNK_DAYS = int(os.getenv("TRIPMATE_ITINERARY_CHUNK_DAYS", 3))
+ITINERARY_MAX_WORKERS = int(os.getenv("TRIPMATE_ITINERARY_MAX_WORKERS", 4))
+
+OFFLINE_NOTE = (
+    "The AI planner was unavailable or too slow, so days marked "
+    "\"offline guide\" come from TripMate's offline attractions guide."
 )
 
-def generate_itinerary(prompt: str) -> str:
-    response = client.chat_completion(
-        messages=[
-            {
-                "role": "system",
-                "content": "You are an expert travel planner for college students."
-            },
-            {
-                "role": "user",
-                "content": prompt
-            }
-        ],
-        max_tokens=700,
-        temperature=0.7,
-        top_p=0.9
+# One JSON object per line, so each day can be validated and shown as soon
+# as its line is complete (see utils/itinerary_helper.py)
+DAY_FORMAT = '{{"day": {day}, "morning": "...", "afternoon": "...", "evening": "..."}}'
+JSON_RULES = """- Output JSON Lines only: one JSON object per day, one line each
+    - No markdown, no code fences, no text before or after the JSON lines"""
+
+_itinerary_cache = None
+_itinerary_cache_lock = threading.Lock()
+
+
+def get_itinerary_cache():
+    # Created on first use (not at import) and shared by the whole process.
+    global _itinerary_cache
+    if _itinerary_cache is None:
+        with _itinerary_cache_lock:
+            if _itinerary_cache is None:
+                _itinerary_cache = ItineraryCache()
+    return _itinerary_cache
+
+
+@timed("prompt_build")
+def build_itinerary_prompt(from_location, to_location, travel_month,
+                           num_students, num_days, location_types) -> str:
+    # Inputs are canonicalized so equivalent requests produce the same
+    # prompt text (and therefore the same cache key).
+    from_location = from_location.strip().title()
+    to_location = to_location.strip().title()
+    location_types = sorted(location_types)
+
+    return f"""
+    INPUT:
+    From: {from_location}
+    To: {to_location}
+    Travel Month: {travel_month}
+    Students: {num_students}
+    Days: {num_days}
+    Preferences: {location_types}
+
+    TASK:
+    Generate a {num_days}-day travel itinerary for college students.
+    
+    Rules:
+    - Do NOT mention prices, costs, budget, or money
+    - Focus only on travel flow, places, meals, and activities
+    - Write clearly for students
+    - Cover all {num_days} days
+    {JSON_RULES}
+
+    OUTPUT FORMAT:
+    {DAY_FORMAT.format(day=1)}
+    {DAY_FORMAT.format(day=2)}
+    (continue until Day {num_days})
+
+    OUTPUT:
+    """
+
+
+@timed("prompt_build")
+def build_chunk_prompt(from_location, to_location, travel_month,
+                       num_students, num_days, location_types,
+                       first_day, last_day) -> str:
+    from_location = from_location.strip().title()
+    to_location = to_location.strip().title()
+    location_types = sorted(location_types)
+
+    if first_day == 1:
+        start_note = f"Day 1 starts with the journey from {from_location}."
+    else:
+        start_note = f"Earlier days are already planned; continue the trip from Day {first_day}."
+    if last_day == num_days:
+        end_note = f"Day {num_days} ends with the return journey to {from_location}."
+    else:
+        end_note = "Later days are planned separately; do not end the trip."
+
+    return f"""
+    INPUT:
+    From: {from_location}
+    To: {to_location}
+    Travel Month: {travel_month}
+    Students: {num_students}
+    Total Trip Days: {num_days}
+    Preferences: {location_types}
+
+    TASK:
+    Write ONLY Day {first_day} to Day {last_day} of a {num_days}-day travel itinerary for college students.
+    {start_note}
+    {end_note}
+
+    Rules:
+    - Do NOT mention prices, costs, budget, or money
+    - Focus only on travel flow, places, meals, and activities
+    - Write clearly for students
+    - Cover every day from Day {first_day} to Day {last_day}, nothing else
+    {JSON_RULES}
+
+    OUTPUT FORMAT:
+    {DAY_FORMAT.format(day=first_day)}
+    (continue until Day {last_day})
+
+    OUTPUT:
+    """
+
+
+@timed("prompt_build")
+def build_day_prompt(from_location, to_location, travel_month,
+                     num_students, num_days, location_types,
+                     itinerary, day) -> str:
+    # Regenerating one day: only that day's context is sent (where the
+    # students are coming from and going to next), plus the current plan
+    # for the day so the model suggests something different.
+    from_location = from_location.strip().title()
+    to_location = to_location.strip().title()
+    location_types = sorted(location_types)
+    current = itinerary.day(day)
+
+    context = []
+    if day == 1:
+        context.append(f"Day 1 starts with the journey from {from_location}.")
+    else:
+        context.append(f"Day {day - 1} ends with: {itinerary.day(day - 1).evening}")
+    if day == num_days:
+        context.append(f"Day {day} ends with the return journey to {from_location}.")
+    else:
+        context.append(f"Day {day + 1} starts with: {itinerary.day(day + 1).morning}")
+    context = "\n    ".join(context)
+
+    return f"""
+    INPUT:
+    From: {from_location}
+    To: {to_location}
+    Travel Month: {travel_month}
+    Students: {num_students}
+    Total Trip Days: {num_days}
+    Preferences: {location_types}
+
+    CONTEXT:
+    {context}
+
+    CURRENT PLAN FOR DAY {day} (the students want an alternative):
+    Morning: {current.morning}
+    Afternoon: {current.afternoon}
+    Evening: {current.evening}
+
+    TASK:
+    Write a different plan for ONLY Day {day} of this {num_days}-day travel itinerary for college students.
+
+    Rules:
+    - Do NOT mention prices, costs, budget, or money
+    - Focus only on travel flow, places, meals, and activities
+    - Write clearly for students
+    - Fit between the days around it; avoid repeating the current plan
+    {JSON_RULES}
+
+    OUTPUT FORMAT:
+    {DAY_FORMAT.format(day=day)}
+
+    OUTPUT:
+    """
+
+
+def max_tokens_for_days(days: int) -> int:
+    return min(TOKENS_OVERHEAD + TOKENS_PER_DAY * days, MAX_TOKENS_LIMIT)
+
+
+def day_chunks(num_days, chunk_days=ITINERARY_CHUNK_DAYS):
+    chunk_days = max(chunk_days, 1)
+    return [
+        (first, min(first + chunk_days - 1, num_days))
+        for first in range(1, num_days + 1, chunk_days)
+    ]
+
+
+def itinerary_cache_key(prompt: str, **params) -> str:
+    # Whitespace and letter case don't change what the model is asked for.
+    # Built from the configuration: a cache hit must not load the model.
+    canonical_prompt = " ".join(prompt.split()).casefold()
+    backend = configured_backend()
+    return make_key(
+        backend=backend.name,
+        model=backend.model_name,
+        system=SYSTEM_PROMPT,
+        prompt=canonical_prompt,
+        params={**GENERATION_PARAMS, **params},
     )
 
-    return response.choices[0].message.content
 
+def _messages(prompt: str):
+    return [
+        {
+            "role": "system",
+            "content": SYSTEM_PROMPT
+        },
+        {
+            "role": "user",
+            "content": prompt
+        }
+    ]
+
+
+def _prompt_tokens(prompt):
+    return estimate_tokens(SYSTEM_PROMPT) + estimate_tokens(prompt)
+
+
+def generate_itinerary(prompt: str, use_cache: bool = True, deadline=None, **params) -> str:
+    # deadline: absolute time.monotonic() by which the model must answer
+    # (default: ITINERARY_DEADLINE from now)
+    params = {**GENERATION_PARAMS, **params}
+    key = itinerary_cache_key(prompt, **params)
+    if use_cache:
+        cached = get_itinerary_cache().get(key)
+        if cached is not None:
+            return cached
+
+    backend = get_backend()
+    messages = _messages(prompt)
+    with span("inference", backend=backend.name, max_tokens=params["max_tokens"]) as timing:
+        if backend.uses_deadlines:
+            # Retried on transient errors and hedged once if slow; raises
+            # DeadlineExceeded when the deadline passes
+            itinerary = call_with_deadline(
+                lambda: backend.chat(messages, **params),
+                deadline or deadline_after(ITINERARY_DEADLINE),
+                admit=lambda timeout: acquire_inference(timeout=timeout),
+            )
+        else:
+            acquire_inference()
+            itinerary = backend.chat(messages, **params)
+        record_tokens(timing, _prompt_tokens(prompt), estimate_tokens(itinerary))
+    if use_cache and itinerary:
+        get_itinerary_cache().set(key, itinerary)
+    return itinerary
+
+
+def stream_itinerary(prompt: str, use_cache: bool = True, deadline=None, **params):
+    # Yields the itinerary piece by piece as the model produces it.
+    # A cache hit is yielded in one piece; a completed stream is cached.
+    # The first piece must arrive within FIRST_TOKEN_DEADLINE and the rest
+    # by deadline, otherwise DeadlineExceeded is raised.
+    params = {**GENERATION_PARAMS, **params}
+    key = itinerary_cache_key(prompt, **params)
+    if use_cache:
+        cached = get_itinerary_cache().get(key)
+        if cached is not None:
+            yield cached
+            return
+
+    backend = get_backend()
+    messages = _messages(prompt)
+    parts = []
+    started = time.perf_counter()
+    with span("inference", backend=backend.name, max_tokens=params["max_tokens"],
+              stream=True) as timing:
+        if backend.uses_deadlines:
+            tokens = stream_with_deadline(
+                lambda: backend.stream(messages, **params),
+                deadline or deadline_after(ITINERARY_DEADLINE),
+                first_token_deadline=deadline_after(FIRST_TOKEN_DEADLINE),
+                admit=lambda timeout: acquire_inference(timeout=timeout),
+            )
+        else:
+            acquire_inference()
+            tokens = backend.stream(messages, **params)
+
+        try:
+            for token in tokens:
+                if not parts:
+                    timing.set(first_token_seconds=round(time.perf_counter() - started, 6))
+                parts.append(token)
+                yield token
+        finally:
+            record_tokens(timing, _prompt_tokens(prompt), estimate_tokens("".join(parts)))
+
+    itinerary = "".join(parts)
+    if use_cache and itinerary:
+        get_itinerary_cache().set(key, itinerary)
+
+
+def generate_itineraries(prompts, use_cache: bool = True, **params):
+    # Batched variant for backends that generate several prompts in one
+    # forward pass (the local model); cache hits are left out of the batch.
+    params = {**GENERATION_PARAMS, **params}
+    keys = [itinerary_cache_key(prompt, **params) for prompt in prompts]
+    results = [get_itinerary_cache().get(key) if use_cache else None for key in keys]
+    missing = [index for index, result in enumerate(results) if result is None]
+    if missing:
+        backend = get_backend()
+        with span("inference", backend=backend.name, max_tokens=params["max_tokens"],
+                  batch=len(missing)) as timing:
+            acquire_inference(len(missing))
+            generated = backend.chat_batch(
+                [_messages(prompts[index]) for index in missing], **params
+            )
+            record_tokens(
+                timing,
+                sum(_prompt_tokens(prompts[index]) for index in missing),
+                sum(estimate_tokens(text) for text in generated),
+            )
+        for index, itinerary in zip(missing, generated):
+            results[index] = itinerary
+            if use_cache and itinerary:
+                get_itinerary_cache().set(keys[index], itinerary)
+    return results
 
 
+def _parsed_or_template(text, first_day, last_day, to_location, location_types, num_days,
+                        error="incomplete output"):
+    # Validated days from the model's text; days it left out (or got
+    # wrong) are taken from the offline template
+    days = parse_days(text, first_day)[:last_day - first_day + 1] if text else []
+    if len(days) < last_day - first_day + 1:
+        logger.warning("Days %d-%d fell back to the offline template: %s",
+                       first_day + len(days), last_day, error)
+        days += template_days(to_location, location_types, num_days,
+                              first_day + len(days), last_day)
+    return days
 
+
+def stream_days_chunked(from_location, to_location, travel_month,
+                        num_students, num_days, location_types,
+                        chunk_days=ITINERARY_CHUNK_DAYS,
+                        max_workers=ITINERARY_MAX_WORKERS,
+                        use_cache: bool = True):
+    # Day ranges are generated concurrently on a bounded pool and yielded
+    # (as DayPlans) in day order as soon as each one, and everything
+    # before it, is done.
+    chunks = day_chunks(num_days, chunk_days)
+    prompts = [
+        build_chunk_prompt(
+            from_location, to_location, travel_month,
+            num_students, num_days, location_types,
+            first_day, last_day
+        )
+        for first_day, last_day in chunks
+    ]
+
+    if configured_backend().prefers_batching:
+        try:
+            texts = generate_itineraries(
+                prompts, use_cache,
+                max_tokens=max(max_tokens_for_days(last - first + 1) for first, last in chunks)
+            )
+        except QuotaExceeded:
+            raise
+        except Exception as error:
+            logger.warning("Itinerary fell back to the offline template: %r", error)
+            yield from template_days(to_location, location_types, num_days)
+            return
+        for (first_day, last_day), text in zip(chunks, texts):
+            yield from _parsed_or_template(
+                text, first_day, last_day, to_location, location_types, num_days
+            )
+        return
+
+    # Each chunk runs in a copy of the caller's context so its model call
+    # is admitted under the caller's inference session. All chunks share
+    # one deadline; a chunk that misses it (or fails) is filled in from
+    # the offline template for its days.
+    deadline = deadline_after(ITINERARY_DEADLINE)
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(chunks)))) as pool:
+        futures = [
+            pool.submit(
+                contextvars.copy_context().run,
+                generate_itinerary,
+                prompt,
+                use_cache,
+                deadline=deadline,
+                max_tokens=max_tokens_for_days(last_day - first_day + 1),
+            )
+            for prompt, (first_day, last_day) in zip(prompts, chunks)
+        ]
+        for (first_day, last_day), future in zip(chunks, futures):
+            text, error = "", "incomplete output"
+            try:
+                text = future.result()
+            except QuotaExceeded:
+                raise
+            except Exception as failure:
+                error = repr(failure)
+            yield from _parsed_or_template(
+                text, first_day, last_day, to_location, location_types, num_days, error
+            )
+
+
+def stream_trip_days(from_location, to_location, travel_month,
+                     num_students, num_days, location_types,
+                     mode=None, use_cache: bool = True):
+    # Yields exactly num_days DayPlans, in order
+    mode = mode or ITINERARY_MODE
+    if mode == "parallel" or (mode == "auto" and num_days > ITINERARY_CHUNK_DAYS):
+        return stream_days_chunked(
+            from_location, to_location, travel_month,
+            num_students, num_days, location_types,
+            use_cache=use_cache
+        )
+
+    prompt = build_itinerary_prompt(
+        from_location, to_location, travel_month,
+        num_students, num_days, location_types
+    )
+    return _days_with_offline_fallback(
+        stream_itinerary(prompt, use_cache, max_tokens=max_tokens_for_days(num_days)),
+        to_location, location_types, num_days
+    )
+
+
+def _days_with_offline_fallback(pieces, to_location, location_types, num_days):
+    # Parses the model's pieces into days as each line completes. If the
+    # model fails, misses its deadline or leaves days out, the remaining
+    # days are taken from the offline template.
+    parser = DayStreamParser()
+    try:
+        for piece in pieces:
+            for day in parser.feed(piece):
+                if day.day <= num_days:
+                    yield day
+        error = "incomplete output"
+    except QuotaExceeded:
+        raise
+    except Exception as failure:
+        error = repr(failure)
+    for day in parser.finish():
+        if day.day <= num_days:
+            yield day
+
+    if parser.next_day <= num_days:
+        logger.warning("Days %d-%d fell back to the offline template: %s",
+                       parser.next_day, num_days, error)
+        yield from template_days(to_location, location_types, num_days, parser.next_day)
+
+
+def generate_trip_itinerary(*args, **kwargs) -> Itinerary:
+    return Itinerary(stream_trip_days(*args, **kwargs))
+
+
+def regenerate_day(from_location, to_location, travel_month,
+                   num_students, num_days, location_types,
+                   itinerary, day) -> DayPlan:
+    # A new plan for one day of an existing itinerary; one small request
+    # (a single day's tokens) instead of regenerating the whole trip.
+    # Raises on failure so the caller can keep the current day.
+    prompt = build_day_prompt(
+        from_location, to_location, travel_month,
+        num_students, num_days, location_types,
+        itinerary, day
+    )
+    text = generate_itinerary(prompt, max_tokens=max_tokens_for_days(1))
+    days = parse_days(text, first_day=day)
+    if not days:
+        raise ItineraryFormatError(f"the model did not return a valid plan for day {day}")
+    return days[0]
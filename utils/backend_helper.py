@@ -0,0 +1,232 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+# Inference backends share one small interface:
+#   chat(messages, **params) -> str
+#   stream(messages, **params) -> iterator of text pieces
+#   chat_batch(list_of_messages, **params) -> list of str
+# params use the chat_completion names (max_tokens, temperature, top_p).
+# uses_deadlines: whether callers should bound calls with deadlines and
+# fall back when they are missed (see utils/resilience_helper). A local
+# model can't be interrupted and is slow on CPU by nature, so it is not.
+#
+# TRIPMATE_BACKEND selects the implementation:
+#   "remote" - Hugging Face Inference API (default)
+#   "local"  - transformers model running on this machine's CPU
+
+BACKEND = os.getenv("TRIPMATE_BACKEND", "remote")
+REMOTE_MODEL = os.getenv("TRIPMATE_REMOTE_MODEL", "meta-llama/Llama-3.2-3B-Instruct")
+REMOTE_TIMEOUT = float(os.getenv("TRIPMATE_REMOTE_TIMEOUT", 30))
+LOCAL_MODEL = os.getenv("TRIPMATE_LOCAL_MODEL", "google/flan-t5-base")
+LOCAL_INT8 = os.getenv("TRIPMATE_LOCAL_INT8", "0") == "1"
+LOCAL_BATCH_SIZE = int(os.getenv("TRIPMATE_LOCAL_BATCH_SIZE", 4))
+# A local stream that produces nothing for this long is given up on
+LOCAL_TOKEN_TIMEOUT = float(os.getenv("TRIPMATE_LOCAL_TOKEN_TIMEOUT", 120))
+
+
+class RemoteBackend:
+    name = "remote"
+    model_name = REMOTE_MODEL
+    prefers_batching = False
+    uses_deadlines = True
+
+    def __init__(self, model_name=REMOTE_MODEL, token=None, timeout=REMOTE_TIMEOUT):
+        from huggingface_hub import InferenceClient
+
+        self.model_name = model_name
+        # Upper bound for calls a deadline has already given up on
+        self.client = InferenceClient(
+            model=model_name,
+            token=token or os.getenv("HF_TOKEN"),
+            timeout=timeout
+        )
+
+    def chat(self, messages, **params):
+        response = self.client.chat_completion(messages=messages, **params)
+        return response.choices[0].message.content
+
+    def stream(self, messages, **params):
+        for chunk in self.client.chat_completion(
+            messages=messages, stream=True, **params
+        ):
+            if not chunk.choices:
+                continue
+            token = chunk.choices[0].delta.content
+            if token:
+                yield token
+
+    def chat_batch(self, batch, **params):
+        # The hosted API has no batch endpoint; fan out instead.
+        with ThreadPoolExecutor(max_workers=max(1, min(len(batch), 4))) as pool:
+            return list(pool.map(lambda messages: self.chat(messages, **params), batch))
+
+
+class LocalBackend:
+    name = "local"
+    model_name = LOCAL_MODEL
+    prefers_batching = True
+    uses_deadlines = False
+
+    def __init__(self, model_name=LOCAL_MODEL, quantize=LOCAL_INT8,
+                 batch_size=LOCAL_BATCH_SIZE):
+        self.model_name = model_name
+        self.quantize = quantize
+        self.batch_size = batch_size
+        self.tokenizer, self.model = _load_local_model(model_name, quantize)
+        self.is_seq2seq = self.model.config.is_encoder_decoder
+        # generate() is not re-entrant on a shared model; serialize callers.
+        self._lock = threading.Lock()
+
+    def chat(self, messages, **params):
+        return self.chat_batch([messages], **params)[0]
+
+    def chat_batch(self, batch, **params):
+        import torch
+
+        texts = [self._render(messages) for messages in batch]
+        outputs = []
+        for start in range(0, len(texts), self.batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + self.batch_size],
+                return_tensors="pt",
+                padding=True,
+                truncation=True
+            )
+            with self._lock, torch.inference_mode():
+                generated = self.model.generate(**inputs, **self._generate_kwargs(params))
+            if not self.is_seq2seq:
+                generated = generated[:, inputs["input_ids"].shape[1]:]
+            outputs.extend(
+                self.tokenizer.batch_decode(generated, skip_special_tokens=True)
+            )
+        return [text.strip() for text in outputs]
+
+    def stream(self, messages, **params):
+        import queue
+
+        import torch
+        from transformers import TextIteratorStreamer
+
+        inputs = self.tokenizer(
+            self._render(messages), return_tensors="pt", truncation=True
+        )
+        streamer = TextIteratorStreamer(
+            self.tokenizer, skip_prompt=not self.is_seq2seq, skip_special_tokens=True,
+            timeout=LOCAL_TOKEN_TIMEOUT
+        )
+        errors = []
+
+        def run():
+            # The streamer is always ended, or a failed generate() would
+            # leave the loop below waiting for tokens that never come
+            try:
+                with self._lock, torch.inference_mode():
+                    self.model.generate(
+                        **inputs, streamer=streamer, **self._generate_kwargs(params)
+                    )
+            except BaseException as error:
+                errors.append(error)
+            finally:
+                streamer.end()
+
+        worker = threading.Thread(target=run, daemon=True)
+        worker.start()
+        try:
+            for token in streamer:
+                if token:
+                    yield token
+        except queue.Empty:
+            raise TimeoutError(
+                f"local model produced nothing for {LOCAL_TOKEN_TIMEOUT:.0f}s"
+            ) from None
+        worker.join()
+        if errors:
+            raise errors[0]
+
+    def _render(self, messages):
+        if not self.is_seq2seq and getattr(self.tokenizer, "chat_template", None):
+            return self.tokenizer.apply_chat_template(
+                messages, tokenize=False, add_generation_prompt=True
+            )
+        return "\n\n".join(message["content"] for message in messages)
+
+    def _generate_kwargs(self, params):
+        temperature = params.get("temperature", 0.7)
+        kwargs = {
+            "max_new_tokens": params.get("max_tokens", 700),
+            "do_sample": temperature > 0,
+            "pad_token_id": self.tokenizer.pad_token_id,
+        }
+        if temperature > 0:
+            kwargs["temperature"] = temperature
+            kwargs["top_p"] = params.get("top_p", 0.9)
+        return kwargs
+
+
+@lru_cache(maxsize=None)
+def _load_local_model(model_name, quantize):
+    # Loaded once per process and shared by every session.
+    import torch
+    from transformers import (
+        AutoConfig, AutoModelForCausalLM, AutoModelForSeq2SeqLM, AutoTokenizer
+    )
+
+    config = AutoConfig.from_pretrained(model_name)
+    model_class = (
+        AutoModelForSeq2SeqLM if config.is_encoder_decoder else AutoModelForCausalLM
+    )
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    if not config.is_encoder_decoder:
+        tokenizer.padding_side = "left"
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+    model = model_class.from_pretrained(model_name, torch_dtype=torch.float32)
+    model.eval()
+    if quantize:
+        model = torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+    return tokenizer, model
+
+
+BACKENDS = {
+    "remote": RemoteBackend,
+    "local": LocalBackend,
+}
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def configured_backend(name=None):
+    # The backend if it has been built, else its class: enough for name,
+    # model_name and the flags without loading a client or model
+    name = name or BACKEND
+    backend = _backends.get(name)
+    if backend is not None:
+        return backend
+    if name not in BACKENDS:
+        raise ValueError(
+            f"Unknown TRIPMATE_BACKEND {name!r}; expected one of {sorted(BACKENDS)}"
+        )
+    return BACKENDS[name]
+
+
+def get_backend(name=None):
+    # Backends (and the InferenceClient / model inside them) are built on
+    # first use and then shared by every session in the process.
+    name = name or BACKEND
+    backend = _backends.get(name)
+    if backend is None:
+        if name not in BACKENDS:
+            raise ValueError(
+                f"Unknown TRIPMATE_BACKEND {name!r}; expected one of {sorted(BACKENDS)}"
+            )
+        with _backends_lock:
+            backend = _backends.get(name)
+            if backend is None:
+                backend = _backends[name] = BACKENDS[name]()
+    return backend
@@ -0,0 +1,105 @@
+import os
+from functools import lru_cache
+from io import BytesIO
+
+from utils.metrics_helper import timed
+
+# "matplotlib": PNG rendered once per cost vector and memoized
+# "vega":       native Streamlit/Vega-Lite chart, no matplotlib at all
+PIE_RENDERER = os.getenv("TRIPMATE_PIE_RENDERER", "matplotlib")
+
+
+@lru_cache(maxsize=256)
+@timed("chart_png")
+def pie_chart_png(categories: tuple, values: tuple) -> bytes:
+    # A bare Figure (not plt.subplots) is never registered with pyplot, so
+    # it is garbage-collected with this frame instead of piling up in the
+    # pyplot figure registry on every run.
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=(4, 4))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.pie(values, labels=categories, autopct="%1.1f%%")
+    ax.set_ylabel("")
+
+    buffer = BytesIO()
+    fig.savefig(buffer, format="png", bbox_inches="tight")
+    return buffer.getvalue()
+
+
+def pie_chart_spec(categories, values):
+    return {
+        "data": {
+            "values": [
+                {"Category": category, "Cost": value}
+                for category, value in zip(categories, values)
+            ]
+        },
+        "mark": {"type": "arc", "tooltip": True},
+        "encoding": {
+            "theta": {"field": "Cost", "type": "quantitative"},
+            "color": {"field": "Category", "type": "nominal"},
+        },
+        "view": {"stroke": None},
+    }
+
+
+@timed("chart_render")
+def render_pie_chart(container, categories, values, renderer=None):
+    # container: the streamlit module or any column/container object
+    categories = tuple(categories)
+    values = tuple(float(value) for value in values)
+    if (renderer or PIE_RENDERER) == "vega":
+        container.vega_lite_chart(pie_chart_spec(categories, values))
+    else:
+        container.image(pie_chart_png(categories, values))
+
+
+HEATMAP_MAX_ROWS = 50
+
+
+def cost_heatmap_spec(students, days, costs, max_budget, selected):
+    # costs: (len(students), len(days)) array of total trip cost; cells are
+    # coloured by share of max_budget so 100% marks the budget line. Group
+    # sizes are sampled down to HEATMAP_MAX_ROWS rows to keep the payload
+    # small. selected: (num_students, num_days), drawn as a marker on the
+    # row it falls in.
+    step = -(-len(students) // HEATMAP_MAX_ROWS)
+    rows = slice(step - 1, None, step)
+    students, costs = students[rows], costs[rows]
+    usage = costs * (100.0 / max_budget)
+    values = [
+        {"Students": int(n), "Days": int(d), "Cost": int(cost), "Usage": round(float(pct), 1)}
+        for n, cost_row, usage_row in zip(students, costs, usage)
+        for d, cost, pct in zip(days, cost_row, usage_row)
+    ]
+
+    num_students, num_days = selected
+    marker_row = int(students[min(-(-num_students // step), len(students)) - 1])
+    axes = {
+        "x": {"field": "Days", "type": "ordinal"},
+        "y": {"field": "Students", "type": "ordinal", "sort": "descending"},
+    }
+    return {
+        "data": {"values": values},
+        "layer": [
+            {
+                "mark": {"type": "rect", "tooltip": True},
+                "encoding": {
+                    **axes,
+                    "color": {
+                        "field": "Usage", "type": "quantitative", "title": "% of budget",
+                        "scale": {"domainMid": 100, "scheme": "redyellowgreen", "reverse": True},
+                    },
+                },
+            },
+            {
+                "data": {"values": [{"Students": marker_row, "Days": num_days}]},
+                "mark": {"type": "point", "shape": "diamond", "filled": True,
+                         "color": "black", "size": 80},
+                "encoding": axes,
+            },
+        ],
+    }
@@ -0,0 +1,89 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Concurrency building blocks for the HTTP API:
+#   SingleFlight     - concurrent calls with the same key share one execution
+#   BoundedExecutor  - thread pool with a bounded backlog; when full it
+#                      rejects work with Overloaded(retry_after) instead of
+#                      queueing it without limit
+
+
+class Overloaded(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f"Server busy; retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def submit(self, key, start):
+        # start() -> Future, called only if no call for key is in flight.
+        # Returns (future, shared): shared is True when joining an existing
+        # call. The key is released as soon as the call finishes, so later
+        # calls run again (results are cached further down, not here).
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                return future, True
+            future = self._flights[key] = start()
+        future.add_done_callback(lambda _: self._forget(key, future))
+        return future, False
+
+    def _forget(self, key, future):
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+
+    def __len__(self):
+        return len(self._flights)
+
+
+class BoundedExecutor:
+    # At most max_workers tasks run and at most max_queue wait. Retry-After
+    # is estimated from the moving average task duration and the backlog.
+    def __init__(self, max_workers, max_queue, name="worker"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._average_seconds = 1.0
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def retry_after(self):
+        backlog = max(self._pending - self.max_workers + 1, 1)
+        return max(1, math.ceil(self._average_seconds * backlog / self.max_workers))
+
+    def submit(self, fn, *args, **kwargs):
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                raise Overloaded(self.retry_after())
+            self._pending += 1
+
+        def run():
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._pending -= 1
+                    self._average_seconds += 0.2 * (elapsed - self._average_seconds)
+
+        try:
+            return self._pool.submit(run)
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,233 @@
+import numpy as np
+
+from utils.geo_helper import get_gazetteer
+from utils.metrics_helper import timed
+from utils.tariff_helper import get_tariff
+
+# Trip cost model shared by the Streamlit app and batch tooling.
+#
+# Scalar API (one trip, plain Python numbers):
+#   estimate_distance_km(from_location, to_location)
+#   estimate_trip_cost(num_students, num_days, max_budget, distance_km, location_types)
+#   budget_options(costs)
+#
+# Vectorized API (NumPy arrays, one element per candidate trip):
+#   preferences_mask(location_types)
+#   estimate_trip_costs(num_students, num_days, max_budget, distance_km, preference_masks)
+
+# Stay / transport / food / misc rates come from the tariff file
+# (see utils/tariff_helper); every function takes an optional tariff and
+# defaults to the current one.
+
+# Transport covers the round trip; very short hops still get a minimum
+# for local movement at the destination.
+ROUND_TRIP_FACTOR = 2
+MIN_TRIP_DISTANCE_KM = 50
+
+# Region-based fallback for places missing from the gazetteer
+SAME_STATE_DISTANCE = 500
+NEIGHBOR_STATE_DISTANCE = 700
+FAR_STATE_DISTANCE = 2000
+
+KERALA_CITIES = [
+    "Kochi", "Trivandrum", "Thiruvananthapuram", "Kozhikode",
+    "Kannur", "Wayanad", "Thrissur", "Alappuzha", "Kollam"
+]
+
+OPTION_NAMES = ["Budget", "Mid-Range (Recommended)", "Premium"]
+
+
+# =========================
+# Scalar API
+# =========================
+
+def estimate_distance_km(from_location, to_location):
+    gazetteer = get_gazetteer()
+    from_place = gazetteer.resolve(from_location)
+    to_place = gazetteer.resolve(to_location)
+    if from_place is not None and to_place is not None:
+        one_way_km = gazetteer.road_distance_km(from_place, to_place)
+        return max(int(round(one_way_km * ROUND_TRIP_FACTOR)), MIN_TRIP_DISTANCE_KM)
+    return estimate_region_distance_km(from_location, to_location)
+
+
+def estimate_region_distance_km(from_location, to_location):
+    from_in_kerala = from_location.strip().title() in KERALA_CITIES
+    to_in_kerala = to_location.strip().title() in KERALA_CITIES
+
+    if from_in_kerala and to_in_kerala:
+        return SAME_STATE_DISTANCE
+    elif from_in_kerala or to_in_kerala:
+        return NEIGHBOR_STATE_DISTANCE
+    return FAR_STATE_DISTANCE
+
+
+@timed("cost_model")
+def estimate_trip_cost(num_students, num_days, max_budget, distance_km, location_types,
+                       tariff=None):
+    tariff = tariff or get_tariff()
+    nights = max(num_days - 1, 1)
+
+    stay = tariff.stay.lookup(num_students)
+    stay_type, stay_rate, stay_note = stay["type"], stay["rate"], stay["note"]
+    transport = tariff.transport.lookup(num_students)
+    vehicle, cost_per_km = transport["vehicle"], transport["cost_per_km"]
+
+    budget_per_student_per_day = max_budget / (num_students * num_days)
+    food = tariff.food.lookup(budget_per_student_per_day)
+    type_of_food, food_cost_per_day = food["type"], food["rate"]
+
+    misc_per_student_rate = tariff.misc_cost_per_student(location_types)
+
+    recommended_stay_cost = stay_rate * num_students * nights
+    transport_cost = distance_km * cost_per_km
+    food_cost = food_cost_per_day * num_students * num_days
+    misc_cost = misc_per_student_rate * num_students
+
+    used_budget = transport_cost + recommended_stay_cost + food_cost + misc_cost
+
+    usage_percent = int((used_budget / max_budget) * 100) if max_budget > 0 else 0
+    remaining_percent = max(0, 100 - usage_percent)
+
+    return {
+        "tariff_version": tariff.version,
+        "num_students": num_students,
+        "num_days": num_days,
+        "max_budget": max_budget,
+        "nights": nights,
+        "stay_type": stay_type,
+        "stay_rate": stay_rate,
+        "stay_note": stay_note,
+        "recommended_stay_cost": recommended_stay_cost,
+        "estimated_distance_km": distance_km,
+        "vehicle": vehicle,
+        "cost_per_km": cost_per_km,
+        "type_of_food": type_of_food,
+        "food_cost_per_day": food_cost_per_day,
+        "misc_cost_per_student": misc_per_student_rate,
+        "transport_cost": transport_cost,
+        "food_cost": food_cost,
+        "misc_cost": misc_cost,
+        "used_budget": used_budget,
+        "usage_percent": usage_percent,
+        "remaining_percent": remaining_percent,
+        "transport_per_student": transport_cost / num_students,
+        "stay_per_student": recommended_stay_cost / num_students,
+        "food_per_student": food_cost / num_students,
+        "misc_per_student": misc_cost / num_students,
+        "total_per_student": used_budget / num_students,
+    }
+
+
+def budget_options(costs, tariff=None):
+    tariff = tariff or get_tariff()
+    basic_food = tariff.food.tiers[0]
+    premium_food = tariff.food.tiers[-1]
+    num_students = costs["num_students"]
+    num_days = costs["num_days"]
+    nights = costs["nights"]
+    stay_rate = costs["stay_rate"]
+
+    options = [
+        ("Economy Stay", max(stay_rate - tariff.budget_stay_discount, tariff.min_stay_rate),
+         basic_food["type"], basic_food["rate"]),
+        (costs["stay_type"], stay_rate,
+         costs["type_of_food"], costs["food_cost_per_day"]),
+        ("Premium Hotel / Resort", stay_rate + tariff.premium_stay_markup,
+         premium_food["type"], premium_food["rate"]),
+    ]
+
+    rows = []
+    for name, (stay_type, option_stay_rate, food_type, food_rate) in zip(OPTION_NAMES, options):
+        total_cost = (
+            costs["transport_cost"]
+            + (option_stay_rate * num_students * nights)
+            + (food_rate * num_students * num_days)
+            + costs["misc_cost"]
+        )
+        rows.append({
+            "Option": name,
+            "Accommodation": stay_type,
+            "Food": food_type,
+            "Total Cost (₹)": total_cost
+        })
+    return rows
+
+
+# =========================
+# Vectorized API
+# =========================
+
+def preferences_mask(location_types, tariff=None):
+    # Bit positions follow the tariff's misc_cost_per_student keys (plus
+    # one bit for any type it doesn't list), so build masks with the same
+    # tariff the costs are computed with.
+    return (tariff or get_tariff()).preferences_mask(location_types)
+
+
+def estimate_trip_costs(num_students, num_days, max_budget, distance_km, preference_masks,
+                        tariff=None):
+    tariff = tariff or get_tariff()
+    num_students = np.asarray(num_students, dtype=np.int64)
+    num_days = np.asarray(num_days, dtype=np.int64)
+    max_budget = np.asarray(max_budget, dtype=np.int64)
+    distance_km = np.asarray(distance_km)
+    preference_masks = np.asarray(preference_masks, dtype=np.int64)
+
+    nights = np.maximum(num_days - 1, 1)
+
+    stay_index = tariff.stay.indices(num_students)
+    stay_rate = tariff.stay_rates[stay_index]
+
+    transport_index = tariff.transport.indices(num_students)
+    cost_per_km = tariff.cost_per_km[transport_index]
+
+    budget_per_student_per_day = max_budget / (num_students * num_days)
+    food_index = tariff.food.indices(budget_per_student_per_day)
+    food_rates = tariff.food_rates
+    food_cost_per_day = food_rates[food_index]
+
+    misc_per_student_rate = tariff.misc_by_mask[preference_masks]
+
+    student_nights = num_students * nights
+    student_days = num_students * num_days
+
+    stay_cost = stay_rate * student_nights
+    transport_cost = distance_km * cost_per_km
+    food_cost = food_cost_per_day * student_days
+    misc_cost = misc_per_student_rate * num_students
+
+    fixed_cost = transport_cost + misc_cost
+    used_budget = fixed_cost + stay_cost + food_cost
+
+    usage_percent = np.where(
+        max_budget > 0, ((used_budget / np.where(max_budget > 0, max_budget, 1)) * 100), 0
+    ).astype(np.int64)
+
+    budget_stay_rate = np.maximum(stay_rate - tariff.budget_stay_discount, tariff.min_stay_rate)
+    premium_stay_rate = stay_rate + tariff.premium_stay_markup
+
+    return {
+        "nights": nights,
+        "stay_index": stay_index,
+        "stay_rate": stay_rate,
+        "cost_per_km": cost_per_km,
+        "food_index": food_index,
+        "food_cost_per_day": food_cost_per_day,
+        "misc_cost_per_student": misc_per_student_rate,
+        "recommended_stay_cost": stay_cost,
+        "transport_cost": transport_cost,
+        "food_cost": food_cost,
+        "misc_cost": misc_cost,
+        "used_budget": used_budget,
+        "usage_percent": usage_percent,
+        "remaining_percent": np.maximum(0, 100 - usage_percent),
+        "total_per_student": used_budget / num_students,
+        "budget_option_total": (
+            fixed_cost + budget_stay_rate * student_nights + food_rates[0] * student_days
+        ),
+        "mid_option_total": used_budget,
+        "premium_option_total": (
+            fixed_cost + premium_stay_rate * student_nights + food_rates[-1] * student_days
+        ),
+    }
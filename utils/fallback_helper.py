@@ -0,0 +1,105 @@
+import csv
+import os
+import threading
+from collections import defaultdict
+from functools import lru_cache
+
+from utils.geo_helper import get_gazetteer
+from utils.itinerary_helper import SLOTS, DayPlan
+
+# Offline template itineraries, used when the model is slow or down.
+# Built from a bundled attractions list (data/attractions.csv: destination,
+# name, type, slot, note), keyed by the gazetteer's canonical destination
+# name; rows with destination "*" are generic activities for any place.
+#
+# Output is deterministic and made of the same DayPlan objects as a
+# parsed model itinerary, so a template day can stand in for any day.
+
+DEFAULT_ATTRACTIONS_PATH = os.getenv(
+    "TRIPMATE_ATTRACTIONS_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "attractions.csv")
+)
+GENERIC = "*"
+
+
+class Attraction:
+    __slots__ = ("name", "type", "slot", "note")
+
+    def __init__(self, name, type, slot, note):
+        self.name = name
+        self.type = type
+        self.slot = slot
+        self.note = note
+
+    def describe(self):
+        return f"{self.name} – {self.note}" if self.note else self.name
+
+
+def load_attractions(path):
+    by_destination = defaultdict(list)
+    with open(path, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            by_destination[row["destination"]].append(
+                Attraction(row["name"], row["type"], row["slot"], row["note"])
+            )
+    return dict(by_destination)
+
+
+_attractions = None
+_attractions_lock = threading.Lock()
+
+
+def get_attractions():
+    global _attractions
+    if _attractions is None:
+        with _attractions_lock:
+            if _attractions is None:
+                _attractions = load_attractions(DEFAULT_ATTRACTIONS_PATH)
+    return _attractions
+
+
+def _ranked(attractions, location_types):
+    # Preferred types first (in preference order), file order within a type
+    if not location_types:
+        return list(attractions)
+    rank = {loc: index for index, loc in enumerate(location_types)}
+    return sorted(attractions, key=lambda a: rank.get(a.type, len(rank)))
+
+
+@lru_cache(maxsize=256)
+def _template_days(to_location, location_types, num_days):
+    attractions = get_attractions()
+    place = get_gazetteer().resolve(to_location)
+    destination = place.name if place is not None else to_location.strip().title()
+
+    unused = _ranked(attractions.get(destination, []), location_types)
+    generic = _ranked(attractions.get(GENERIC, []), location_types)
+    generic_turn = defaultdict(int)
+
+    def pick(slot):
+        for index, attraction in enumerate(unused):
+            if attraction.slot == slot:
+                return unused.pop(index).describe()
+        # Nothing left for this slot at the destination: cycle through the
+        # generic activities that fit it
+        fitting = [a for a in generic if a.slot in (slot, "Any")] or generic
+        attraction = fitting[generic_turn[slot] % len(fitting)]
+        generic_turn[slot] += 1
+        return attraction.describe()
+
+    return tuple(tuple(pick(slot) for slot in SLOTS) for _ in range(num_days))
+
+
+def template_days(to_location, location_types, num_days, first_day=1, last_day=None):
+    # Days first_day..last_day of the template for the whole trip, so a
+    # chunk of days matches the same days of the full template
+    days = _template_days(to_location, tuple(location_types or ()), num_days)
+    return [
+        DayPlan(day, *days[day - 1], source="offline")
+        for day in range(first_day, (last_day or num_days) + 1)
+    ]
+
+
+def template_itinerary(to_location, location_types, num_days, first_day=1, last_day=None):
+    days = template_days(to_location, location_types, num_days, first_day, last_day)
+    return "\n\n".join(day.to_text() for day in days)
@@ -0,0 +1,351 @@
+import csv
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import tempfile
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+
+# Offline gazetteer of Indian cities and towns (data/places.csv) with
+# in-memory indexes:
+#   - normalized name / alias hash         exact resolution, O(1)
+#   - sorted name list                     prefix resolution, O(log n)
+#   - trigram postings                     fuzzy resolution (typos)
+#   - uniform lat/lon grid                 nearest-neighbour lookup
+# Road distances are haversine x ROAD_FACTOR. They come from the
+# precomputed memory-mapped matrix when one matches the gazetteer (see
+# scripts/build_distance_matrix.py), otherwise they are computed on the
+# fly and memoized per place pair.
+
+DEFAULT_PLACES_PATH = os.getenv(
+    "TRIPMATE_PLACES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "places.csv")
+)
+DEFAULT_MATRIX_PATH = os.getenv(
+    "TRIPMATE_DISTANCE_MATRIX_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "distance_matrix.npy")
+)
+ROAD_FACTOR = float(os.getenv("TRIPMATE_ROAD_FACTOR", 1.3))
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = 111.195
+PLACES_PER_CELL = 4
+MIN_FUZZY_SCORE = 0.45
+FUZZY_SHORTLIST = 8
+
+logger = logging.getLogger(__name__)
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(name):
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    return _NON_ALNUM.sub(" ", name.casefold()).strip()
+
+
+def _trigrams(normalized):
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class Place:
+    __slots__ = ("id", "name", "state", "lat", "lon")
+
+    def __init__(self, id, name, state, lat, lon):
+        self.id = id
+        self.name = name
+        self.state = state
+        self.lat = lat
+        self.lon = lon
+
+    def __repr__(self):
+        return f"Place({self.name!r}, {self.state!r}, {self.lat}, {self.lon})"
+
+
+class Gazetteer:
+    def __init__(self, places, aliases=None):
+        # places: list of (name, state, lat, lon); aliases: {alias: place index}
+        self.places = [
+            Place(index, name, state, float(lat), float(lon))
+            for index, (name, state, lat, lon) in enumerate(places)
+        ]
+
+        self._exact = {}
+        for place in self.places:
+            self._exact.setdefault(normalize_name(place.name), place.id)
+        for alias, index in (aliases or {}).items():
+            self._exact.setdefault(normalize_name(alias), index)
+
+        self._sorted_names = sorted(self._exact)
+        self._trigram_postings = defaultdict(list)
+        for key in self._sorted_names:
+            for gram in _trigrams(key):
+                self._trigram_postings[gram].append(key)
+
+        # Cell size adapts to density: about PLACES_PER_CELL places per cell
+        lats = [place.lat for place in self.places] or [0.0]
+        lons = [place.lon for place in self.places] or [0.0]
+        area = max((max(lats) - min(lats)) * (max(lons) - min(lons)), 1.0)
+        self.grid_degrees = math.sqrt(area * PLACES_PER_CELL / max(len(self.places), 1))
+        self._grid = defaultdict(list)
+        for place in self.places:
+            self._grid[self._cell(place.lat, place.lon)].append(
+                (place.lat, place.lon, place.id)
+            )
+
+        self.matrix = None
+        self.resolve = lru_cache(maxsize=4096)(self._resolve)
+        self._pair_km = lru_cache(maxsize=65536)(self._pair_km_uncached)
+
+    def fingerprint(self, count=None):
+        # Identifies the place list (or its first `count` places) that a
+        # distance matrix was built for
+        digest = hashlib.sha256()
+        for place in self.places[:count]:
+            digest.update(f"{place.name}\0{place.lat:.6f}\0{place.lon:.6f}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    @classmethod
+    def from_csv(cls, path):
+        places, aliases = [], {}
+        with open(path, encoding="utf-8", newline="") as f:
+            for index, row in enumerate(csv.DictReader(f)):
+                places.append((row["name"], row["state"], row["lat"], row["lon"]))
+                for alias in filter(None, row.get("aliases", "").split("|")):
+                    aliases[alias] = index
+        return cls(places, aliases)
+
+    def __len__(self):
+        return len(self.places)
+
+    # ---------- name resolution ----------
+    def _resolve(self, name):
+        key = normalize_name(name)
+        if not key:
+            return None
+
+        index = self._exact.get(key)
+        if index is not None:
+            return self.places[index]
+
+        # Unique prefix ("thiruvanan", "kozhik")
+        start = bisect_left(self._sorted_names, key)
+        matches = []
+        for candidate in self._sorted_names[start:start + 2]:
+            if candidate.startswith(key):
+                matches.append(candidate)
+        if len(matches) == 1 and len(key) >= 4:
+            return self.places[self._exact[matches[0]]]
+
+        # Fuzzy: Dice coefficient over trigrams. Candidates come from the
+        # rarest trigrams of the query only, so common ones ("  k", "pur")
+        # don't drag thousands of names into scoring.
+        grams = _trigrams(key)
+        rare = sorted(grams, key=lambda gram: len(self._trigram_postings.get(gram, ())))
+        shared = defaultdict(int)
+        for gram in rare[:max(3, len(rare) // 2)]:
+            for candidate in self._trigram_postings.get(gram, ()):
+                shared[candidate] += 1
+        shortlist = sorted(shared, key=shared.get, reverse=True)[:FUZZY_SHORTLIST]
+        best, best_score = None, MIN_FUZZY_SCORE
+        for candidate in shortlist:
+            candidate_grams = _trigrams(candidate)
+            score = 2 * len(grams & candidate_grams) / (len(grams) + len(candidate_grams))
+            if score > best_score:
+                best, best_score = candidate, score
+        return self.places[self._exact[best]] if best else None
+
+    # ---------- nearest neighbour ----------
+    def _cell(self, lat, lon):
+        return (
+            int(math.floor(lat / self.grid_degrees)),
+            int(math.floor(lon / self.grid_degrees)),
+        )
+
+    def nearest(self, lat, lon, k=1, max_rings=64):
+        # Search grid rings outward. Candidates are ranked with the
+        # equirectangular approximation (exact enough at these scales) and
+        # the search stops once the k-th candidate is closer than the edge
+        # of the searched square.
+        size = self.grid_degrees
+        row, col = self._cell(lat, lon)
+        lon_scale = max(math.cos(math.radians(lat)), 0.01)
+        found = []
+        for ring in range(max_rings + 1):
+            for r in range(row - ring, row + ring + 1):
+                step = 1 if abs(r - row) == ring else 2 * ring
+                for c in range(col - ring, col + ring + 1, max(step, 1)):
+                    for place_lat, place_lon, index in self._grid.get((r, c), ()):
+                        dy = place_lat - lat
+                        dx = (place_lon - lon) * lon_scale
+                        found.append((dy * dy + dx * dx, index))
+            if len(found) >= k:
+                edge = min(
+                    lat - (row - ring) * size, (row + ring + 1) * size - lat,
+                    (lon - (col - ring) * size) * lon_scale,
+                    ((col + ring + 1) * size - lon) * lon_scale,
+                )
+                found.sort()
+                if found[k - 1][0] <= edge * edge:
+                    break
+        found.sort()
+        result = []
+        for _, index in found[:k]:
+            place = self.places[index]
+            result.append((haversine_km(lat, lon, place.lat, place.lon), place))
+        return result
+
+    # ---------- distances ----------
+    def _pair_km_uncached(self, a, b):
+        pa, pb = self.places[a], self.places[b]
+        return haversine_km(pa.lat, pa.lon, pb.lat, pb.lon) * ROAD_FACTOR
+
+    def road_distance_km(self, from_place, to_place):
+        a, b = sorted((from_place.id, to_place.id))
+        if self.matrix is not None and b < self.matrix.count:
+            return self.matrix.km(a, b) * ROAD_FACTOR
+        # Places added after the matrix was built
+        return self._pair_km(a, b)
+
+
+# =========================
+# Precomputed distance matrix
+# =========================
+# Straight-line km between every pair of places, stored as the condensed
+# upper triangle (n * (n - 1) / 2 float32 values) in a .npy file with a
+# JSON sidecar. It is opened with mmap_mode="r", so every worker process
+# shares the same page-cache copy and opening it reads nothing up front.
+# Places appended to the gazetteer after the build are not in the matrix
+# and fall back to on-the-fly haversine.
+
+def _condensed_index(n, i, j):
+    # i < j
+    return i * (2 * n - i - 1) // 2 + (j - i - 1)
+
+
+class DistanceMatrix:
+    def __init__(self, condensed, count):
+        self.condensed = condensed
+        self.count = count
+
+    def km(self, i, j):
+        if i == j:
+            return 0.0
+        if i > j:
+            i, j = j, i
+        return float(self.condensed[_condensed_index(self.count, i, j)])
+
+    @classmethod
+    def open(cls, path, gazetteer=None):
+        # Returns None when the matrix was built for a different place list,
+        # or when it (or its sidecar) is missing or unreadable: distances
+        # then fall back to on-the-fly haversine
+        import numpy as np
+
+        try:
+            with open(path + ".json", encoding="utf-8") as f:
+                meta = json.load(f)
+            count = int(meta["count"])
+            if gazetteer is not None and (
+                count > len(gazetteer)
+                or meta["places_sha256"] != gazetteer.fingerprint(count)
+            ):
+                return None
+            condensed = np.load(path, mmap_mode="r")
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            logger.warning("Ignoring distance matrix %s: %s", path, error)
+            return None
+        if condensed.shape != (count * (count - 1) // 2,):
+            logger.warning("Ignoring distance matrix %s: shape %s does not match %d places",
+                           path, condensed.shape, count)
+            return None
+        return cls(condensed, count)
+
+
+def _temp_path(path):
+    # A new file next to path, so os.replace() onto path is atomic
+    fd, temp = tempfile.mkstemp(
+        dir=os.path.dirname(os.path.abspath(path)), prefix=os.path.basename(path) + ".",
+        suffix=".tmp"
+    )
+    os.close(fd)
+    os.chmod(temp, 0o644)  # mkstemp's 0600 would hide it from other users' workers
+    return temp
+
+
+def build_distance_matrix(gazetteer, path, flush_rows=256):
+    # Filled one source row at a time and flushed every flush_rows rows,
+    # so memory use stays O(n) even for tens of thousands of places.
+    # Written to temporary files that replace the matrix, then the
+    # sidecar: processes that have the old matrix mapped keep reading it,
+    # and an interrupted build leaves the old pair untouched.
+    import numpy as np
+
+    n = len(gazetteer.places)
+    lat = np.radians(np.array([place.lat for place in gazetteer.places], dtype=np.float64))
+    lon = np.radians(np.array([place.lon for place in gazetteer.places], dtype=np.float64))
+    cos_lat = np.cos(lat)
+
+    matrix_temp = _temp_path(path)
+    meta_temp = _temp_path(path + ".json")
+    try:
+        condensed = np.lib.format.open_memmap(
+            matrix_temp, mode="w+", dtype=np.float32, shape=(n * (n - 1) // 2,)
+        )
+        for i in range(n - 1):
+            dphi = lat[i + 1:] - lat[i]
+            dlmb = lon[i + 1:] - lon[i]
+            a = np.sin(dphi / 2) ** 2 + cos_lat[i] * cos_lat[i + 1:] * np.sin(dlmb / 2) ** 2
+            offset = _condensed_index(n, i, i + 1)
+            condensed[offset:offset + n - i - 1] = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+            if (i + 1) % flush_rows == 0:
+                condensed.flush()
+        condensed.flush()
+        del condensed
+
+        with open(meta_temp, "w", encoding="utf-8") as f:
+            json.dump({
+                "format": "condensed-upper-triangle-float32-km",
+                "count": n,
+                "places_sha256": gazetteer.fingerprint(),
+            }, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(matrix_temp, path)
+        os.replace(meta_temp, path + ".json")
+    finally:
+        for temp in (matrix_temp, meta_temp):
+            if os.path.exists(temp):
+                os.remove(temp)
+
+
+_gazetteer = None
+_gazetteer_lock = threading.Lock()
+
+
+def get_gazetteer():
+    global _gazetteer
+    if _gazetteer is None:
+        with _gazetteer_lock:
+            if _gazetteer is None:
+                gazetteer = Gazetteer.from_csv(DEFAULT_PLACES_PATH)
+                if os.path.exists(DEFAULT_MATRIX_PATH):
+                    # A matrix built for a different place list is ignored
+                    gazetteer.matrix = DistanceMatrix.open(DEFAULT_MATRIX_PATH, gazetteer)
+                _gazetteer = gazetteer
+    return _gazetteer
@@ -0,0 +1,207 @@
+import json
+import logging
+import re
+
+# Structured itineraries. The model is asked for JSON Lines, one object
+# per day:
+#   {"day": 1, "morning": "...", "afternoon": "...", "evening": "..."}
+# Output is validated and parsed into DayPlan objects as each line
+# completes, so days can be shown while later ones are still being
+# written, and any single day can be replaced later. Output in the older
+# "Day N: / - Morning:" text layout is still accepted.
+
+logger = logging.getLogger(__name__)
+
+SLOTS = ("Morning", "Afternoon", "Evening")
+MAX_SLOT_CHARS = 600
+
+_FENCE = re.compile(r"^\s*```(?:json|jsonl)?\s*$", re.IGNORECASE | re.MULTILINE)
+_TEXT_DAY = re.compile(r"^\W*Day\s+\d+\s*:?", re.IGNORECASE | re.MULTILINE)
+_TEXT_SLOT = re.compile(
+    r"^\W*(Morning|Afternoon|Evening)\W*:\s*(.*?)(?=^\W*(?:Morning|Afternoon|Evening)\W*:|\Z)",
+    re.IGNORECASE | re.MULTILINE | re.DOTALL
+)
+
+
+class ItineraryFormatError(ValueError):
+    pass
+
+
+class DayPlan:
+    __slots__ = ("day", "morning", "afternoon", "evening", "source")
+
+    def __init__(self, day, morning, afternoon, evening, source="model"):
+        self.day = day
+        self.morning = morning
+        self.afternoon = afternoon
+        self.evening = evening
+        self.source = source  # "model" or "offline"
+
+    @classmethod
+    def from_dict(cls, data, day, source="model"):
+        # Validates one parsed object; the day number is assigned by the
+        # caller (models often restart numbering in a chunk)
+        if not isinstance(data, dict):
+            raise ItineraryFormatError(f"expected an object, got {type(data).__name__}")
+        fields = {str(key).strip().lower(): value for key, value in data.items()}
+        slots = []
+        for slot in SLOTS:
+            value = fields.get(slot.lower())
+            if isinstance(value, list):
+                value = "; ".join(str(item) for item in value)
+            if not isinstance(value, str) or not value.strip():
+                raise ItineraryFormatError(f"day {day}: missing {slot.lower()}")
+            slots.append(" ".join(value.split())[:MAX_SLOT_CHARS])
+        return cls(day, *slots, source=source)
+
+    def slots(self):
+        return zip(SLOTS, (self.morning, self.afternoon, self.evening))
+
+    def to_dict(self):
+        return {
+            "day": self.day, "morning": self.morning, "afternoon": self.afternoon,
+            "evening": self.evening, "source": self.source,
+        }
+
+    def heading(self):
+        suffix = " (offline guide)" if self.source == "offline" else ""
+        return f"Day {self.day}{suffix}:"
+
+    def to_text(self):
+        return "\n".join([self.heading()] + [f"- {slot}: {text}" for slot, text in self.slots()])
+
+    def to_markdown(self):
+        return "\n".join(
+            [f"**{self.heading()}**", ""] + [f"- **{slot}:** {text}" for slot, text in self.slots()]
+        )
+
+    def __repr__(self):
+        return f"DayPlan({self.day}, source={self.source!r})"
+
+
+class Itinerary:
+    def __init__(self, days):
+        self.days = sorted(days, key=lambda day: day.day)
+
+    @classmethod
+    def from_dict(cls, days):
+        # to_dict() output (e.g. a saved plan) -> Itinerary
+        return cls([
+            DayPlan.from_dict(data, int(data["day"]), data.get("source", "model")) for data in days
+        ])
+
+    def day(self, number):
+        return self.days[number - 1]
+
+    def replace_day(self, day_plan):
+        self.days[day_plan.day - 1] = day_plan
+
+    @property
+    def has_offline_days(self):
+        return any(day.source == "offline" for day in self.days)
+
+    def to_dict(self):
+        return [day.to_dict() for day in self.days]
+
+    def to_text(self):
+        return "\n\n".join(day.to_text() for day in self.days)
+
+    def __len__(self):
+        return len(self.days)
+
+
+# =========================
+# Parsing
+# =========================
+
+def _json_objects(text):
+    # A JSON array / {"days": [...]} document, else one object per line
+    text = _FENCE.sub("", text).strip()
+    try:
+        document = json.loads(text)
+    except ValueError:
+        document = None
+    if isinstance(document, dict) and isinstance(document.get("days"), list):
+        return document["days"]
+    if isinstance(document, list):
+        return document
+    if isinstance(document, dict):
+        return [document]
+
+    objects = []
+    for line in text.splitlines():
+        start, end = line.find("{"), line.rfind("}")
+        if start == -1 or end <= start:
+            continue
+        try:
+            objects.append(json.loads(line[start:end + 1]))
+        except ValueError:
+            continue
+    return objects
+
+
+def _text_days(text):
+    # Older "Day N:" / "- Morning: ..." layout
+    blocks = _TEXT_DAY.split(text)[1:]
+    days = []
+    for block in blocks:
+        slots = {slot.lower(): body.strip() for slot, body in _TEXT_SLOT.findall(block)}
+        days.append(slots)
+    return days
+
+
+def parse_days(text, first_day=1, source="model"):
+    # Returns the valid days in order, numbered from first_day; invalid
+    # entries are skipped (and logged) rather than failing the whole text
+    objects = _json_objects(text) or _text_days(text)
+    days = []
+    for data in objects:
+        try:
+            days.append(DayPlan.from_dict(data, first_day + len(days), source))
+        except ItineraryFormatError as error:
+            logger.warning("Skipping invalid itinerary day: %s", error)
+    return days
+
+
+class DayStreamParser:
+    # Incremental parser for streamed JSON Lines: feed() returns the days
+    # completed by each piece, finish() whatever is left (including the
+    # text layout, which can only be parsed once it is complete).
+    def __init__(self, first_day=1):
+        self.next_day = first_day
+        self._buffer = ""
+        self._text_lines = []  # non-JSON lines, for the text-layout parser
+        self._seen_json = False
+
+    def feed(self, piece):
+        self._buffer += piece
+        *lines, self._buffer = self._buffer.split("\n")
+        return self._parse_lines(lines)
+
+    def finish(self):
+        rest, self._buffer = self._buffer, ""
+        days = self._parse_lines([rest])
+        if not self._seen_json:
+            days = parse_days("\n".join(self._text_lines), self.next_day)
+            self.next_day += len(days)
+        self._text_lines = []
+        return days
+
+    def _parse_lines(self, lines):
+        days = []
+        for line in lines:
+            start, end = line.find("{"), line.rfind("}")
+            if start == -1 or end <= start:
+                if not self._seen_json:
+                    self._text_lines.append(line)
+                continue
+            try:
+                data = json.loads(line[start:end + 1])
+                day = DayPlan.from_dict(data, self.next_day)
+            except (ValueError, ItineraryFormatError) as error:
+                logger.warning("Skipping invalid itinerary line: %s", error)
+                continue
+            self._seen_json = True
+            self.next_day += 1
+            days.append(day)
+        return days
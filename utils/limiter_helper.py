@@ -0,0 +1,250 @@
+import contextvars
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Process-wide admission control for upstream model calls.
+#
+# A token bucket (LIMITER_RATE calls per second, bursts of LIMITER_BURST)
+# paces calls across every session. Callers that find the bucket empty
+# wait in one FIFO queue, so they are served strictly in arrival order and
+# a burst turns into a growing wait instead of a wave of upstream rate
+# limit errors. Each named session may also make at most SESSION_QUOTA
+# calls per SESSION_QUOTA_WINDOW seconds.
+#
+# The session (and an optional on_wait(position, eta_seconds) callback for
+# showing queue progress) is carried in a context variable set with
+# inference_session(), so the itinerary helpers don't need extra
+# arguments.
+
+LIMITER_RATE = float(os.getenv("TRIPMATE_LIMITER_RATE", 2.0))
+LIMITER_BURST = int(os.getenv("TRIPMATE_LIMITER_BURST", 4))
+LIMITER_MAX_QUEUE = int(os.getenv("TRIPMATE_LIMITER_MAX_QUEUE", 200))
+LIMITER_MAX_WAIT = float(os.getenv("TRIPMATE_LIMITER_MAX_WAIT", 60))
+SESSION_QUOTA = int(os.getenv("TRIPMATE_SESSION_QUOTA", 30))
+SESSION_QUOTA_WINDOW = float(os.getenv("TRIPMATE_SESSION_QUOTA_WINDOW", 3600))
+
+WAIT_REPORT_INTERVAL = 0.5
+
+
+class LimiterError(Exception):
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QuotaExceeded(LimiterError):
+    pass
+
+
+class QueueFull(LimiterError):
+    pass
+
+
+class _Ticket:
+    __slots__ = ("cost",)
+
+    def __init__(self, cost):
+        self.cost = cost
+
+
+class InferenceLimiter:
+    def __init__(self, rate=LIMITER_RATE, burst=LIMITER_BURST, max_queue=LIMITER_MAX_QUEUE,
+                 max_wait=LIMITER_MAX_WAIT, session_quota=SESSION_QUOTA,
+                 quota_window=SESSION_QUOTA_WINDOW, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.session_quota = session_quota
+        self.quota_window = quota_window
+        self._clock = clock
+        self._condition = threading.Condition()
+        self._tokens = float(burst)
+        self._updated = clock()
+        self._queue = deque()
+        self._usage = {}  # session -> deque of call timestamps, never empty
+        self._next_sweep = clock() + quota_window
+
+    # ---------- token bucket ----------
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _eta(self, ticket):
+        # Seconds until every ticket up to and including this one is paid
+        needed = 0
+        for queued in self._queue:
+            needed += queued.cost
+            if queued is ticket:
+                break
+        return max(0.0, (needed - self._tokens) / self.rate)
+
+    # ---------- per-session quota ----------
+    def _prune(self, session, now):
+        # Drops calls older than the window, and the session once it has none
+        usage = self._usage.get(session)
+        if usage is None:
+            return ()
+        while usage and now - usage[0] >= self.quota_window:
+            usage.popleft()
+        if not usage:
+            del self._usage[session]
+        return usage
+
+    def _sweep(self, now):
+        # Sessions that stop calling are never pruned by their own calls:
+        # once per window, drop every session whose last call has expired
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + self.quota_window
+        expired = [
+            session for session, usage in self._usage.items()
+            if now - usage[-1] >= self.quota_window
+        ]
+        for session in expired:
+            del self._usage[session]
+
+    def _check_quota(self, session, cost, now):
+        if session is None or not self.session_quota:
+            return
+        self._sweep(now)
+        usage = self._prune(session, now)
+        if len(usage) + cost > self.session_quota:
+            retry_after = self.quota_window - (now - usage[0]) if usage else self.quota_window
+            raise QuotaExceeded(
+                f"Session quota of {self.session_quota} model calls per "
+                f"{self.quota_window / 60:.0f} min reached",
+                retry_after
+            )
+
+    def _reserve_quota(self, session, cost, now):
+        if session is not None and self.session_quota:
+            self._usage.setdefault(session, deque()).extend([now] * cost)
+
+    def _release_quota(self, session, cost, now):
+        # Calls that never got a token don't count against the quota
+        if session is not None and self.session_quota:
+            usage = self._usage.get(session, ())
+            for _ in range(cost):
+                if now in usage:
+                    usage.remove(now)
+            self._prune(session, now)
+
+    # ---------- admission ----------
+    def acquire(self, cost=1, session=None, on_wait=None, timeout=None):
+        # Blocks until cost tokens are granted to this caller in FIFO order.
+        # Raises QuotaExceeded, or QueueFull when the queue is at capacity
+        # or the grant would come later than timeout (default max_wait).
+        # The bucket never holds more than burst tokens, so a larger cost
+        # could never be granted: it is a ValueError, not a wait.
+        if cost > self.burst:
+            raise ValueError(f"cost {cost} is more than the burst of {self.burst}")
+        timeout = self.max_wait if timeout is None else timeout
+        with self._condition:
+            now = self._clock()
+            self._check_quota(session, cost, now)
+            self._refill(now)
+            if not self._queue and self._tokens >= cost:
+                self._tokens -= cost
+                self._reserve_quota(session, cost, now)
+                return 0.0
+
+            if len(self._queue) >= self.max_queue:
+                raise QueueFull("Too many requests are waiting for the model", self._eta_all())
+            ticket = _Ticket(cost)
+            self._queue.append(ticket)
+            eta = self._eta(ticket)
+            if eta > timeout:
+                self._queue.remove(ticket)
+                raise QueueFull(
+                    f"Estimated wait of {eta:.0f}s is longer than {timeout:.0f}s", eta
+                )
+
+            # Reserved while queued so one session can't queue past its quota
+            start = reserved_at = now
+            self._reserve_quota(session, cost, reserved_at)
+            try:
+                while True:
+                    now = self._clock()
+                    self._refill(now)
+                    if self._queue[0] is ticket and self._tokens >= cost:
+                        self._queue.popleft()
+                        self._tokens -= cost
+                        self._condition.notify_all()
+                        return now - start
+                    if now - start > timeout:
+                        raise QueueFull(f"Waited more than {timeout:.0f}s for the model",
+                                        self._eta(ticket))
+                    if on_wait is not None:
+                        # The callback draws UI: run it without the lock, which
+                        # every session's acquire shares
+                        position, eta = self._queue.index(ticket) + 1, self._eta(ticket)
+                        self._condition.release()
+                        try:
+                            on_wait(position, eta)
+                        finally:
+                            self._condition.acquire()
+                    # Woken early when the head of the queue is served
+                    self._condition.wait(
+                        min(WAIT_REPORT_INTERVAL, max(self._eta(ticket), 0.01))
+                    )
+            except BaseException:
+                self._release_quota(session, cost, reserved_at)
+                if ticket in self._queue:
+                    self._queue.remove(ticket)
+                    self._condition.notify_all()
+                raise
+
+    def _eta_all(self):
+        return max(0.0, (sum(ticket.cost for ticket in self._queue) - self._tokens) / self.rate)
+
+    def status(self):
+        with self._condition:
+            self._refill(self._clock())
+            return {
+                "queued": len(self._queue),
+                "tokens": round(self._tokens, 2),
+                "estimated_wait": round(self._eta_all(), 1),
+            }
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_limiter():
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = InferenceLimiter()
+    return _limiter
+
+
+# (session, on_wait) for the upstream calls made in this context
+_current_session = contextvars.ContextVar("tripmate_inference_session", default=(None, None))
+
+
+@contextmanager
+def inference_session(session, on_wait=None):
+    token = _current_session.set((session, on_wait))
+    try:
+        yield
+    finally:
+        _current_session.reset(token)
+
+
+def acquire_inference(cost=1, timeout=None):
+    # A cost above the burst (e.g. a batch of many prompts) is acquired in
+    # pieces of at most burst tokens; returns the total wait
+    session, on_wait = _current_session.get()
+    limiter = get_limiter()
+    waited = 0.0
+    while cost > 0:
+        piece = min(cost, limiter.burst)
+        waited += limiter.acquire(piece, session=session, on_wait=on_wait, timeout=timeout)
+        cost -= piece
+    return waited
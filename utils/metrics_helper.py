@@ -0,0 +1,275 @@
+import cProfile
+import functools
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+# Per-stage timing spans (prompt build, inference, cost model, charts,
+# PDFs, ...), aggregated into latency histograms per stage.
+#
+#   with span("pdf_build", chars=len(text)):   # or @timed("pdf_build")
+#       ...
+#
+# Each finished span is also written as one JSON log line (logger
+# "tripmate.metrics"), and prometheus_text() renders the histograms and
+# counters in the Prometheus text exposition format (GET /metrics on the
+# API). Off by default: span() then hands back a shared no-op object, so
+# an instrumented call costs one flag check.
+#
+# Separately, a sampled fraction of runs can be profiled with cProfile
+# (profiled(); TRIPMATE_PROFILE_SAMPLE), writing .prof files that open in
+# snakeviz or pstats.
+
+METRICS_ENABLED = os.getenv("TRIPMATE_METRICS", "0") == "1"
+PROFILE_SAMPLE = float(os.getenv("TRIPMATE_PROFILE_SAMPLE", 0))  # 0..1 of runs
+PROFILE_DIR = os.getenv("TRIPMATE_PROFILE_DIR", ".tripmate_profiles")
+
+# Seconds; model calls dominate the top end
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+CHARS_PER_TOKEN = 4  # rough token estimate when the backend doesn't report usage
+
+logger = logging.getLogger("tripmate.metrics")
+
+_enabled = METRICS_ENABLED
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot: +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        index = 0
+        while index < len(self.buckets) and value > self.buckets[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.histograms = {}
+        self.errors = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds, ok=True):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            if not ok:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.errors.clear()
+            self.counters.clear()
+
+    def snapshot(self):
+        # {stage: {"count", "sum", "p50", "p95", "p99", "errors"}}
+        with self._lock:
+            return {
+                stage: {
+                    "count": histogram.count,
+                    "sum": round(histogram.sum, 6),
+                    "p50": histogram.quantile(0.50),
+                    "p95": histogram.quantile(0.95),
+                    "p99": histogram.quantile(0.99),
+                    "errors": self.errors.get(stage, 0),
+                }
+                for stage, histogram in sorted(self.histograms.items())
+            }
+
+    def prometheus_text(self):
+        lines = [
+            "# HELP tripmate_stage_seconds Time spent per pipeline stage.",
+            "# TYPE tripmate_stage_seconds histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'tripmate_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}'
+                    )
+                lines.append(f'tripmate_stage_seconds_sum{{stage="{stage}"}} {histogram.sum:.6f}')
+                lines.append(f'tripmate_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+            lines += [
+                "# HELP tripmate_stage_errors_total Stage runs that raised.",
+                "# TYPE tripmate_stage_errors_total counter",
+            ]
+            for stage, errors in sorted(self.errors.items()):
+                lines.append(f'tripmate_stage_errors_total{{stage="{stage}"}} {errors}')
+
+            typed = set()
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE tripmate_{name} counter")
+                    typed.add(name)
+                label_text = ",".join(f'{key}="{val}"' for key, val in labels)
+                lines.append(f"tripmate_{name}{{{label_text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry():
+    return _registry
+
+
+def metrics_enabled():
+    return _enabled
+
+
+def enable_metrics(enabled=True):
+    # For CLIs (--metrics); the environment sets the default
+    global _enabled
+    _enabled = enabled
+    if enabled and not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+
+
+class Span:
+    __slots__ = ("stage", "fields", "start")
+
+    def __init__(self, stage, fields):
+        self.stage = stage
+        self.fields = fields
+        self.start = time.perf_counter()
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        seconds = time.perf_counter() - self.start
+        ok = error_type is None
+        _registry.observe(self.stage, seconds, ok)
+        if logger.isEnabledFor(logging.INFO):
+            record = {"stage": self.stage, "seconds": round(seconds, 6), "ok": ok, **self.fields}
+            if not ok:
+                record["error"] = error_type.__name__
+            logger.info(json.dumps(record, default=str))
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def set(self, **fields):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, error_type, error, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(stage, **fields):
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(stage, fields)
+
+
+def timed(stage):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with Span(stage, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def estimate_tokens(text):
+    return -(-len(text) // CHARS_PER_TOKEN) if text else 0
+
+
+def record_tokens(span_, tokens_in, tokens_out):
+    span_.set(tokens_in=tokens_in, tokens_out=tokens_out)
+    if _enabled:
+        _registry.inc("model_tokens_total", tokens_in, direction="in")
+        _registry.inc("model_tokens_total", tokens_out, direction="out")
+
+
+# =========================
+# Sampled profiling
+# =========================
+# Only one cProfile profiler can run at a time, so a sampled run that
+# overlaps another one is simply not profiled.
+_profile_lock = threading.Lock()
+
+
+@contextmanager
+def profiled(name, sample=None):
+    sample = PROFILE_SAMPLE if sample is None else sample
+    if sample <= 0 or random.random() >= sample or not _profile_lock.acquire(blocking=False):
+        yield None
+        return
+    profiler = cProfile.Profile()
+    try:
+        try:
+            profiler.enable()
+        except ValueError:
+            # Another profiling tool (a debugger, coverage) is active
+            yield None
+            return
+        try:
+            yield profiler
+        finally:
+            profiler.disable()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        path = os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}.prof")
+        profiler.dump_stats(path)
+        logger.info(json.dumps({"profile": name, "path": path}))
+    finally:
+        _profile_lock.release()
+
+
+if METRICS_ENABLED:
+    enable_metrics()
@@ -0,0 +1,136 @@
+from itertools import combinations
+
+import numpy as np
+
+from utils.metrics_helper import timed
+from utils.tariff_helper import get_tariff
+
+# Budget optimizer: every combination of stay x food x vehicle x activity
+# set is priced and scored in one broadcast over 4-D arrays, then reduced
+# to the Pareto front of cost vs comfort and the most comfortable plan
+# that fits the budget.
+#
+# Comfort is a weighted sum of each choice's comfort score normalized to
+# 0..1 (weights and scores come from the tariff's "optimizer" block).
+# Prices follow the cost model's rules: vehicles are the tariff's transport
+# tiers, any one big enough for the group, at the tier's rate per km for
+# the whole group; activity sets are subsets of the preferred location
+# types (of all types when none are selected), charged per student at the
+# dearest type in the set.
+
+
+def _activity_sets(location_types, tariff):
+    universe = [loc for loc in (location_types or tariff.preference_types)
+                if loc in tariff.misc_cost_map]
+    sets = [()]
+    for size in range(1, len(universe) + 1):
+        sets.extend(combinations(universe, size))
+    return sets
+
+
+def _normalized(scores):
+    low, high = scores.min(), scores.max()
+    if high == low:
+        return np.ones_like(scores)
+    return (scores - low) / (high - low)
+
+
+def pareto_front(cost, comfort):
+    # Indices of plans no other plan beats on both cost and comfort,
+    # ordered by rising cost.
+    order = np.lexsort((-comfort, cost))
+    sorted_comfort = comfort[order]
+    running_best = np.maximum.accumulate(sorted_comfort)
+    keep = np.empty(len(order), dtype=bool)
+    keep[0] = True
+    keep[1:] = sorted_comfort[1:] > running_best[:-1]
+    return order[keep]
+
+
+def plan_grid(num_students, num_days, distance_km, location_types, tariff=None):
+    # Cost and comfort of every stay x food x vehicle x activity combination,
+    # as 4-D arrays indexed like the "stays", "foods", "vehicles" and
+    # "activities" lists; "valid" is False where the group doesn't fit.
+    tariff = tariff or get_tariff()
+    catalogue = tariff.optimizer
+    if catalogue is None:
+        raise ValueError(f"{tariff.source} has no 'optimizer' block")
+    weights = catalogue.weights
+    nights = max(num_days - 1, 1)
+
+    activity_sets = _activity_sets(location_types, tariff)
+    activity_cost = np.array([
+        tariff.misc_cost_per_student(chosen) for chosen in activity_sets
+    ], dtype=np.int64)
+    activity_comfort = np.array([
+        sum(catalogue.activity_comfort.get(loc, 1) for loc in chosen)
+        for chosen in activity_sets
+    ], dtype=np.float64)
+
+    # Per-dimension cost (whole group) and weighted comfort, shaped so the
+    # sum broadcasts to (stay, food, vehicle, activity).
+    stay_allowed = num_students <= catalogue.stay_max_students
+    stay_cost = np.where(
+        stay_allowed, catalogue.stay_rates * num_students * nights, np.iinfo(np.int64).max // 4
+    )[:, None, None, None]
+    food_cost = (catalogue.food_rates * num_students * num_days)[None, :, None, None]
+    vehicle_allowed = num_students <= catalogue.vehicle_max_students
+    vehicle_cost = np.rint(
+        catalogue.vehicle_cost_per_km * distance_km
+    ).astype(np.int64)[None, None, :, None]
+    misc_cost = (activity_cost * num_students)[None, None, None, :]
+
+    comfort = (
+        weights["stay"] * _normalized(catalogue.stay_comfort)[:, None, None, None]
+        + weights["food"] * _normalized(catalogue.food_comfort)[None, :, None, None]
+        + weights["vehicle"] * _normalized(catalogue.vehicle_comfort)[None, None, :, None]
+        + weights["activities"] * _normalized(activity_comfort)[None, None, None, :]
+    )
+    valid = stay_allowed[:, None, None, None] & vehicle_allowed[None, None, :, None]
+    return {
+        "stays": catalogue.stay_types,
+        "foods": catalogue.food_types,
+        "vehicles": catalogue.vehicle_types,
+        "activities": activity_sets,
+        "cost": stay_cost + food_cost + vehicle_cost + misc_cost,
+        "comfort": comfort,
+        "valid": np.broadcast_to(valid, comfort.shape),
+    }
+
+
+@timed("optimizer")
+def optimize_budget(num_students, num_days, max_budget, distance_km, location_types,
+                    tariff=None):
+    grid = plan_grid(num_students, num_days, distance_km, location_types, tariff)
+    shape = grid["cost"].shape
+    total = grid["cost"].ravel()
+    comfort = grid["comfort"].ravel()
+    candidates = np.flatnonzero(grid["valid"].ravel())
+
+    def describe(flat_index):
+        s, f, v, a = np.unravel_index(flat_index, shape)
+        cost = int(total[flat_index])
+        return {
+            "Stay": grid["stays"][s],
+            "Food": grid["foods"][f],
+            "Vehicle": grid["vehicles"][v],
+            "Activities": ", ".join(grid["activities"][a]) or "General sightseeing",
+            "Total Cost (₹)": cost,
+            "Per Student (₹)": cost // num_students,
+            "Comfort": round(float(comfort[flat_index]) * 100, 1),
+            "Within Budget": cost <= max_budget,
+        }
+
+    front = candidates[pareto_front(total[candidates], comfort[candidates])]
+
+    affordable = candidates[total[candidates] <= max_budget]
+    best = None
+    if len(affordable):
+        # Most comfortable plan within budget; cheaper one on ties
+        best = affordable[np.lexsort((total[affordable], -comfort[affordable]))[0]]
+
+    return {
+        "evaluated": int(len(candidates)),
+        "front": [describe(index) for index in front],
+        "best": describe(best) if best is not None else None,
+    }
@@ -1,14 +1,313 @@
-from reportlab.lib.pagesizes import A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+import hashlib
+import pickle
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from itertools import chain
+from xml.sax.saxutils import escape
+
+from utils.metrics_helper import span
+
+# Rendered PDFs are cached by content hash (or report), so repeated
+# downloads of the same plan are served straight from memory. (Flowables
+# themselves are not reusable: doc.build() marks and splits them in place.)
+MAX_CACHED_PDFS = 64
+
+_pdf_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+# Booklets: flowables are pulled from the trips as the page frames need
+# them, never more than BOOKLET_LOOKAHEAD ahead of the page being laid out
+BOOKLET_TITLE = "TripMate for Campus – Trip Booklet"
+BOOKLET_LOOKAHEAD = 64
+
+_styles = None
+_styles_lock = threading.Lock()
+
+
+def get_styles():
+    # One stylesheet for every PDF, built on first use; getSampleStyleSheet()
+    # creates a fresh set of styles per call. Styles are only read.
+    global _styles
+    if _styles is None:
+        with _styles_lock:
+            if _styles is None:
+                from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+
+                styles = getSampleStyleSheet()
+                styles.add(ParagraphStyle("TripHeading", parent=styles["Heading1"], fontSize=16))
+                styles.add(ParagraphStyle("TocEntry", parent=styles["Normal"], leading=16))
+                _styles = styles
+    return _styles
+
+
+def _content_hash(*sections):
+    digest = hashlib.sha256()
+    for section in sections:
+        digest.update(section.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
 
 def generate_budget_pdf(filename, content_text):
-    doc = SimpleDocTemplate(filename, pagesize=A4)
-    styles = getSampleStyleSheet()
-    elements = []
+    # filename may be a path or a binary file-like object (e.g. BytesIO).
+    # content_text may be a single string or a sequence of sections; the
+    # sections are laid out as if joined with a blank line ("\n\n").
+    if isinstance(content_text, str):
+        content_text = [content_text]
+
+    def lines():
+        for index, section in enumerate(content_text):
+            if index:
+                yield ""
+            yield from section.split("\n")
+
+    generate_lines_pdf(filename, lines())
+
+
+def generate_lines_pdf(filename, lines):
+    # One paragraph per line of text, e.g. report_helper.iter_text_lines().
+    # reportlab is only imported once a PDF is actually requested.
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+
+    with span("pdf_build") as pdf_span:
+        doc = SimpleDocTemplate(filename, pagesize=A4)
+        elements = list(_line_flowables(lines))
+
+        pdf_span.set(lines=len(elements) // 2)
+        doc.build(elements)
+
+
+def _line_flowables(lines):
+    from reportlab.platypus import Paragraph, Spacer
+
+    normal = get_styles()["Normal"]
+    for line in lines:
+        yield Paragraph(escape(line), normal)
+        yield Spacer(1, 8)
+
+
+# =========================
+# Booklets
+# =========================
+
+class FlowableStream:
+    # The story for doc.build() as a lazy list: build() only looks at the
+    # first few flowables, deletes each one once it is placed and pushes
+    # split remainders back to the front, so the rest can stay unread in
+    # the iterator. len() is the buffered count (at least `lookahead` until
+    # the iterator runs out), which is all build()'s loop needs.
+    def __init__(self, flowables, lookahead=BOOKLET_LOOKAHEAD):
+        self._source = iter(flowables)
+        self._buffer = []
+        self._lookahead = lookahead
+
+    def _fill(self, count):
+        while self._source is not None and len(self._buffer) < count:
+            try:
+                self._buffer.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill(self._lookahead)
+        return len(self._buffer)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            self._fill(self._lookahead if index.stop is None else index.stop)
+        else:
+            self._fill(index + 1)
+        return self._buffer[index]
+
+    def __setitem__(self, index, value):
+        self._buffer[index] = value
+
+    def __delitem__(self, index):
+        del self._buffer[index]
+
+    def insert(self, index, flowable):
+        self._buffer.insert(index, flowable)
+
+
+class _Discard:
+    # Output for the layout pass, which only needs the page numbers
+    def write(self, data):
+        return len(data)
+
+
+def _booklet_template(filename, title=BOOKLET_TITLE):
+    from reportlab.lib.pagesizes import A4
+    from reportlab.platypus import SimpleDocTemplate
+
+    class BookletTemplate(SimpleDocTemplate):
+        # Records the page of every trip heading and makes it a bookmark
+        # (a link target for the contents, and an entry in the PDF outline)
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.headings = []
+
+        def afterFlowable(self, flowable):
+            key = getattr(flowable, "booklet_key", None)
+            if key is None:
+                return
+            title = flowable.getPlainText()
+            self.headings.append((title, self.page))
+            self.canv.bookmarkPage(key)
+            self.canv.addOutlineEntry(title, key, level=0)
+
+    return BookletTemplate(filename, pagesize=A4, pageCompression=1, title=title)
+
+
+def _page_compressing_canvas():
+    import zlib
+
+    from reportlab.pdfbase.pdfdoc import PDFArray, PDFDictionary, PDFName, PDFStream
+    from reportlab.pdfgen.canvas import Canvas
+
+    class PageCompressingCanvas(Canvas):
+        # The stock canvas keeps every page's drawing operators as text until
+        # save() and only compresses them then; this compresses each page
+        # as soon as it ends. (A stream whose dictionary already names its
+        # Filter is written out as is.)
+        def showPage(self):
+            super().showPage()
+            page = self._doc.Pages.pages[-1]
+            if page.stream:
+                dictionary = PDFDictionary()
+                dictionary["Filter"] = PDFArray([PDFName("FlateDecode")])
+                page.Contents = PDFStream(dictionary, zlib.compress(page.stream.encode("utf-8")))
+                page.stream = None
+
+    return PageCompressingCanvas
+
+
+def _number_page(canvas, doc):
+    canvas.saveState()
+    canvas.setFont("Helvetica", 8)
+    canvas.drawRightString(doc.pagesize[0] - doc.rightMargin, doc.bottomMargin / 2, f"Page {doc.page}")
+    canvas.restoreState()
+
+
+def _trip_flowables(entries, new_page=False):
+    # entries: (heading, lines) per trip; each trip after the first starts
+    # on a new page (the first too, with new_page)
+    from reportlab.platypus import PageBreak, Paragraph
+
+    heading_style = get_styles()["TripHeading"]
+    for number, (heading, lines) in enumerate(entries, 1):
+        if number > 1 or new_page:
+            yield PageBreak()
+        title = Paragraph(escape(f"{number}. {heading}"), heading_style)
+        title.booklet_key = f"trip-{number}"
+        yield title
+        yield from _line_flowables(lines)
+
+
+def _front_matter(title, headings, page_offset, links=True):
+    # Title and contents; headings: (title, page) from a layout pass, whose
+    # page numbers are shifted by the front matter's own length. Contents
+    # entries link to the trips (not when measuring without them).
+    from reportlab.platypus import Paragraph, Table
+
+    styles = get_styles()
+    yield Paragraph(escape(title), styles["Title"])
+    if not headings:
+        return
+    yield Paragraph("Contents", styles["Heading2"])
+    rows = []
+    for number, (heading, page) in enumerate(headings, 1):
+        text = escape(heading)
+        if links:
+            text = f'<a href="#trip-{number}">{text}</a>'
+        rows.append((Paragraph(text, styles["TocEntry"]),
+                     Paragraph(str(page + page_offset), styles["TocEntry"])))
+    yield Table(rows, colWidths=("88%", "12%"), hAlign="LEFT")
+
+
+def _spool(entries, spool):
+    for entry in entries:
+        pickle.dump(entry, spool, pickle.HIGHEST_PROTOCOL)
+        yield entry
+
+
+def _unspool(spool):
+    spool.seek(0)
+    while True:
+        try:
+            yield pickle.load(spool)
+        except EOFError:
+            return
+
+
+def _build_stream(doc, flowables):
+    doc.build(
+        FlowableStream(flowables), onFirstPage=_number_page, onLaterPages=_number_page,
+        canvasmaker=_page_compressing_canvas(),
+    )
+
+
+def _layout(flowables):
+    # A layout pass -> (headings, page count); its pages are dropped
+    doc = _booklet_template(_Discard())
+    _build_stream(doc, flowables)
+    return doc.headings, doc.page
+
+
+def generate_booklet_pdf(filename, entries, title=BOOKLET_TITLE, contents=True):
+    # Many trips in one PDF. entries: an iterable of (heading, lines) per
+    # trip, e.g. report_helper.booklet_entries(); it is read once and never
+    # held in memory as a whole. Flowables are laid out as they are pulled.
+    # With contents, the trips are first laid out to find each one's page
+    # (and spooled to a temporary file), then the title, the contents and
+    # the trips are laid out for real. Returns trips, pages, seconds and
+    # pages_per_second.
+    started = time.perf_counter()
+    with span("booklet_build") as booklet_span:
+        if contents:
+            with tempfile.TemporaryFile() as spool:
+                headings = _layout(_trip_flowables(_spool(entries, spool)))[0]
+                front_pages = _layout(_front_matter(title, headings, 0, links=False))[1]
+                doc = _booklet_template(filename, title)
+                _build_stream(doc, chain(
+                    _front_matter(title, headings, front_pages),
+                    _trip_flowables(_unspool(spool), new_page=True),
+                ))
+        else:
+            doc = _booklet_template(filename, title)
+            _build_stream(doc, chain(_front_matter(title, (), 0), _trip_flowables(entries)))
+        seconds = time.perf_counter() - started
+        stats = {
+            "trips": len(doc.headings),
+            "pages": doc.page,
+            "seconds": round(seconds, 3),
+            "pages_per_second": round(doc.page / seconds, 1) if seconds else 0.0,
+        }
+        booklet_span.set(trips=stats["trips"], pages=stats["pages"])
+    return stats
+
+
+def cached_pdf_bytes(key, render) -> bytes:
+    # render(buffer) writes the PDF; key is any hashable that identifies it
+    with _cache_lock:
+        pdf = _pdf_cache.get(key)
+        if pdf is not None:
+            _pdf_cache.move_to_end(key)
+            return pdf
+
+    buffer = BytesIO()
+    render(buffer)
+    pdf = buffer.getvalue()
+
+    with _cache_lock:
+        _pdf_cache[key] = pdf
+        while len(_pdf_cache) > MAX_CACHED_PDFS:
+            _pdf_cache.popitem(last=False)
+    return pdf
 
-    for line in content_text.split("\n"):
-        elements.append(Paragraph(line.replace("&", "&amp;"), styles["Normal"]))
-        elements.append(Spacer(1, 8))
 
-    doc.build(elements)
\ No newline at end of file
+def budget_pdf_bytes(*sections) -> bytes:
+    return cached_pdf_bytes(_content_hash(*sections), lambda buffer: generate_budget_pdf(buffer, sections))
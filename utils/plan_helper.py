@@ -0,0 +1,133 @@
+import hashlib
+import json
+import re
+
+# Trip requests and plans outside the Streamlit UI (HTTP API, batch CLI).
+# A plan is plain JSON-serializable data built by the same cost model,
+# optimizer and report texts as app.py. The cost and AI modules are
+# imported inside the functions so importing this module stays cheap.
+
+MONTHS = [
+    "January", "February", "March", "April", "May", "June",
+    "July", "August", "September", "October", "November", "December"
+]
+LOCATION_TYPES = ["Nature", "Heritage", "Industry Visit", "Theme Park", "Adventure", "Religious"]
+
+# Trip form defaults and limits
+DEFAULTS = {"travel_month": "January", "num_students": 20, "num_days": 3, "max_budget": 150000}
+MAX_STUDENTS = 500
+MAX_DAYS = 15
+MIN_BUDGET = 1000
+
+
+def parse_trip_request(row):
+    # Raw request (JSON object or CSV row) -> the app's inputs dict.
+    # Raises ValueError for anything the trip form would not accept.
+    def number(field):
+        value = row.get(field)
+        if value in (None, ""):
+            return DEFAULTS[field]
+        return int(float(value))
+
+    location_types = row.get("location_types") or []
+    if isinstance(location_types, str):
+        location_types = [part.strip() for part in re.split(r"[|;,]", location_types)]
+    location_types = [loc for loc in location_types if loc]
+
+    inputs = {
+        "from_location": str(row.get("from_location") or "").strip(),
+        "to_location": str(row.get("to_location") or "").strip(),
+        "travel_month": (str(row.get("travel_month") or "").strip().title()
+                         or DEFAULTS["travel_month"]),
+        "num_students": number("num_students"),
+        "num_days": number("num_days"),
+        "max_budget": number("max_budget"),
+        "location_types": location_types,
+    }
+
+    if not inputs["from_location"] or not inputs["to_location"]:
+        raise ValueError("from_location and to_location are required")
+    if inputs["travel_month"] not in MONTHS:
+        raise ValueError(f"unknown travel_month {inputs['travel_month']!r}")
+    if not 1 <= inputs["num_students"] <= MAX_STUDENTS:
+        raise ValueError(f"num_students must be between 1 and {MAX_STUDENTS}")
+    if not 1 <= inputs["num_days"] <= MAX_DAYS:
+        raise ValueError(f"num_days must be between 1 and {MAX_DAYS}")
+    if inputs["max_budget"] < MIN_BUDGET:
+        raise ValueError(f"max_budget must be at least {MIN_BUDGET}")
+    unknown = sorted(set(location_types) - set(LOCATION_TYPES))
+    if unknown:
+        raise ValueError(f"unknown location_types {unknown}")
+    return inputs
+
+
+def plan_key(inputs):
+    # Identical trips (after normalization) share a key
+    normalized = {
+        "from": inputs["from_location"].strip().casefold(),
+        "to": inputs["to_location"].strip().casefold(),
+        "month": inputs["travel_month"],
+        "students": int(inputs["num_students"]),
+        "days": int(inputs["num_days"]),
+        "budget": int(inputs["max_budget"]),
+        "types": sorted(inputs["location_types"]),
+    }
+    payload = json.dumps(normalized, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def plan_costs(inputs):
+    # Cost breakdown, Budget / Mid-Range / Premium options, optimizer
+    # results, the trip report (report_helper.TripReport, no itinerary yet)
+    # and its budget text for one trip
+    from utils.cost_helper import budget_options, estimate_distance_km, estimate_trip_cost
+    from utils.optimizer_helper import optimize_budget
+    from utils.report_helper import build_report, report_text
+
+    distance_km = estimate_distance_km(inputs["from_location"], inputs["to_location"])
+    costs = estimate_trip_cost(
+        inputs["num_students"], inputs["num_days"], inputs["max_budget"],
+        distance_km, inputs["location_types"]
+    )
+    options = budget_options(costs)
+    optimized = optimize_budget(
+        inputs["num_students"], inputs["num_days"], inputs["max_budget"],
+        distance_km, inputs["location_types"]
+    )
+    report = build_report(inputs, costs, options)
+    return {
+        "costs": costs,
+        "options": options,
+        "optimized": optimized,
+        "report": report,
+        "budget_text": report_text(report, ("budget",)),
+    }
+
+
+def build_trip_plan(inputs, itinerary=True, store=None, reuse=True):
+    # Full plan: plan_costs() plus the generated itinerary, with the report
+    # and its itinerary text updated to match. With a plan store the plan is saved, and (reuse=True) the
+    # itinerary of a saved near-identical trip is reused instead of
+    # generating a new one; costs are always recomputed.
+    from utils.ai_helper import generate_trip_itinerary
+    from utils.itinerary_helper import Itinerary
+    from utils.report_helper import report_text
+
+    plan = {"key": plan_key(inputs), "inputs": inputs, **plan_costs(inputs)}
+    plan["itinerary"] = plan["itinerary_text"] = plan["reused_plan"] = None
+    if itinerary:
+        match = store.find_close_match(inputs) if store is not None and reuse else None
+        if match is not None:
+            days = Itinerary.from_dict(match["itinerary"])
+            plan["reused_plan"] = match["id"]
+        else:
+            days = generate_trip_itinerary(
+                inputs["from_location"], inputs["to_location"], inputs["travel_month"],
+                inputs["num_students"], inputs["num_days"], inputs["location_types"]
+            )
+        plan["report"] = plan["report"].with_itinerary(days)
+        plan["itinerary"] = days.to_dict()
+        plan["itinerary_text"] = report_text(plan["report"], ("itinerary",))
+    if store is not None:
+        plan["id"] = store.save(plan)
+    return plan
@@ -0,0 +1,366 @@
+import csv
+import json
+from dataclasses import dataclass, replace
+
+# One report per plan: the trip, its cost breakdown, budget utilization,
+# the Budget / Mid-Range / Premium options and (once generated) the
+# itinerary, built once from the cost model's results with
+# build_report(). Every download format is an exporter over it:
+#
+#   iter_text_lines() / write_text()   plain text (also what the PDF lays out)
+#   write_pdf() / report_pdf_bytes()   PDF
+#   write_booklet()                    one PDF for many trips, with contents
+#   write_json()                       JSON
+#   write_csv()                        CSV (section, item, total, per student, detail)
+#
+# Exporters write to a stream line by line (or chunk by chunk) instead of
+# building the document as one string first. A report covers the
+# "itinerary" and/or "budget" sections.
+
+SECTIONS = ("itinerary", "budget")
+RULE = "-" * 34
+CSV_HEADER = ("section", "item", "total", "per_student", "detail")
+
+
+@dataclass(frozen=True, slots=True)
+class CostLine:
+    category: str
+    total: int
+    per_student: int
+
+
+@dataclass(frozen=True, slots=True)
+class OptionLine:
+    name: str
+    accommodation: str
+    food: str
+    total: int
+    within_budget: bool
+
+    @property
+    def recommended(self):
+        return "Recommended" in self.name
+
+
+@dataclass(frozen=True, slots=True)
+class Utilization:
+    max_budget: int
+    used: int
+    percent: int
+    remaining_percent: int
+
+    @property
+    def remaining(self):
+        return self.max_budget - self.used  # negative when over budget
+
+    @property
+    def within_budget(self):
+        return self.used <= self.max_budget
+
+    @property
+    def status(self):
+        return "WITHIN BUDGET" if self.within_budget else "EXCEEDS BUDGET"
+
+
+@dataclass(frozen=True, slots=True)
+class TripReport:
+    from_location: str
+    to_location: str
+    travel_month: str
+    num_students: int
+    num_days: int
+    location_types: tuple
+    costs: tuple  # CostLine per category
+    total: CostLine
+    utilization: Utilization
+    food_type: str
+    food_cost_per_day: int
+    stay_type: str
+    stay_rate: int
+    nights: int
+    vehicle: str
+    distance_km: int
+    tariff_version: str
+    options: tuple  # OptionLine
+    days: tuple = ()  # itinerary_helper.DayPlan, empty until generated
+
+    @property
+    def preferences(self):
+        return ", ".join(self.location_types) if self.location_types else "Not specified"
+
+    def with_itinerary(self, itinerary):
+        return replace(self, days=tuple(itinerary.days))
+
+    def to_dict(self):
+        return {
+            "trip": {
+                "from_location": self.from_location, "to_location": self.to_location,
+                "travel_month": self.travel_month, "num_students": self.num_students,
+                "num_days": self.num_days, "location_types": list(self.location_types),
+            },
+            "costs": [
+                {"category": line.category, "total": line.total, "per_student": line.per_student}
+                for line in (*self.costs, self.total)
+            ],
+            "budget_utilization": {
+                "max_budget": self.utilization.max_budget, "used": self.utilization.used,
+                "percent": self.utilization.percent,
+                "remaining": self.utilization.remaining,
+                "remaining_percent": self.utilization.remaining_percent,
+                "within_budget": self.utilization.within_budget,
+            },
+            "food_and_stay": {
+                "food_type": self.food_type, "food_cost_per_day": self.food_cost_per_day,
+                "stay_type": self.stay_type, "stay_rate": self.stay_rate, "nights": self.nights,
+                "vehicle": self.vehicle, "distance_km": self.distance_km,
+            },
+            "options": [
+                {"option": option.name, "accommodation": option.accommodation,
+                 "food": option.food, "total": option.total,
+                 "within_budget": option.within_budget}
+                for option in self.options
+            ],
+            "itinerary": [day.to_dict() for day in self.days],
+            "tariff_version": self.tariff_version,
+        }
+
+
+def build_report(inputs, costs, options, itinerary=None):
+    # costs: estimate_trip_cost() result; options: budget_options() rows;
+    # itinerary: an itinerary_helper.Itinerary, or None until it's generated
+    num_students = int(inputs["num_students"])
+    max_budget = int(inputs["max_budget"])
+    return TripReport(
+        from_location=inputs["from_location"],
+        to_location=inputs["to_location"],
+        travel_month=inputs["travel_month"],
+        num_students=num_students,
+        num_days=int(inputs["num_days"]),
+        location_types=tuple(inputs["location_types"]),
+        costs=(
+            CostLine("Transportation", costs["transport_cost"], int(costs["transport_per_student"])),
+            CostLine("Stay", costs["recommended_stay_cost"], int(costs["stay_per_student"])),
+            CostLine("Food", costs["food_cost"], int(costs["food_per_student"])),
+            CostLine("Entry & Misc", costs["misc_cost"], int(costs["misc_per_student"])),
+        ),
+        total=CostLine("Total", costs["used_budget"], int(costs["total_per_student"])),
+        utilization=Utilization(
+            max_budget, costs["used_budget"], costs["usage_percent"], costs["remaining_percent"]
+        ),
+        food_type=costs["type_of_food"],
+        food_cost_per_day=costs["food_cost_per_day"],
+        stay_type=costs["stay_type"],
+        stay_rate=costs["stay_rate"],
+        nights=costs["nights"],
+        vehicle=costs["vehicle"],
+        distance_km=costs["estimated_distance_km"],
+        tariff_version=costs["tariff_version"],
+        options=tuple(
+            OptionLine(row["Option"], row["Accommodation"], row["Food"], row["Total Cost (₹)"],
+                       row["Total Cost (₹)"] <= max_budget)
+            for row in options
+        ),
+        days=tuple(itinerary.days) if itinerary is not None else (),
+    )
+
+
+# =========================
+# Plain text
+# =========================
+
+def _itinerary_lines(report):
+    yield "TRIPMATE FOR CAMPUS – ITINERARY"
+    yield "=" * 30
+    yield ""
+    yield f"From         : {report.from_location}"
+    yield f"To           : {report.to_location}"
+    yield f"Travel Month : {report.travel_month}"
+    yield f"Students     : {report.num_students}"
+    yield f"Days         : {report.num_days}"
+    yield ""
+    yield "-" * 32
+    yield "DAY-WISE ITINERARY"
+    yield "-" * 32
+    for day in report.days:
+        yield ""
+        yield day.heading()
+        for slot, text in day.slots():
+            yield f"- {slot}: {text}"
+    yield ""
+    yield "=" * 32
+    yield "Generated by TripMate for Campus"
+
+
+def _budget_lines(report):
+    utilization = report.utilization
+    yield "TRIPMATE FOR CAMPUS – BUDGET SUMMARY"
+    yield "=" * 34
+    yield ""
+    yield "Trip Overview"
+    yield "-------------"
+    yield f"From            : {report.from_location}"
+    yield f"To              : {report.to_location}"
+    yield f"Travel Month    : {report.travel_month}"
+    yield f"Students        : {report.num_students}"
+    yield f"Days            : {report.num_days}"
+    yield f"Preferences     : {report.preferences}"
+    yield ""
+    yield RULE
+    yield "COST BREAKDOWN (TOTAL)"
+    yield RULE
+    for line in report.costs:
+        yield f"{line.category:<16}: Rs. {line.total:,}"
+    yield ""
+    yield f"TOTAL COST      : Rs. {report.total.total:,}"
+    yield ""
+    yield RULE
+    yield "PER STUDENT COST"
+    yield RULE
+    for line in report.costs:
+        yield f"{line.category:<16}: Rs. {line.per_student:,}"
+    yield ""
+    yield f"TOTAL / STUDENT : Rs. {report.total.per_student:,}"
+    yield ""
+    yield RULE
+    yield "BUDGET UTILIZATION"
+    yield RULE
+    yield f"Maximum Budget  : Rs. {utilization.max_budget:,}"
+    yield f"Total Cost      : Rs. {utilization.used:,}"
+    yield f"Used            : {utilization.percent}%"
+    if utilization.within_budget:
+        yield f"Remaining       : Rs. {utilization.remaining:,} ({utilization.remaining_percent}%)"
+    else:
+        yield f"Over Budget     : Rs. {-utilization.remaining:,}"
+    yield f"Status          : {utilization.status}"
+    yield ""
+    yield RULE
+    yield "FOOD & STAY"
+    yield RULE
+    yield f"Food Type       : {report.food_type}"
+    yield f"Food Cost       : Rs. {report.food_cost_per_day} per student per day"
+    yield ""
+    yield f"Stay Type       : {report.stay_type}"
+    yield f"Stay Cost       : Rs. {report.stay_rate} per student per night"
+    yield f"Nights          : {report.nights}"
+    yield ""
+    yield RULE
+    yield "ALTERNATIVE OPTIONS"
+    yield RULE
+    for option in report.options:
+        yield ""
+        yield option.name
+        yield "-" * 16
+        yield f"Accommodation   : {option.accommodation}"
+        yield f"Food            : {option.food}"
+        yield f"Total Cost      : Rs. {option.total:,}"
+        yield f"Status          : {'WITHIN BUDGET' if option.within_budget else 'EXCEEDS BUDGET'}"
+
+
+_SECTION_LINES = {"itinerary": _itinerary_lines, "budget": _budget_lines}
+
+
+def iter_text_lines(report, sections=SECTIONS):
+    # Lines without newlines; sections are separated by a blank line
+    for index, section in enumerate(sections):
+        if index:
+            yield ""
+        yield from _SECTION_LINES[section](report)
+
+
+def write_text(report, out, sections=SECTIONS):
+    # out: a text stream
+    for line in iter_text_lines(report, sections):
+        out.write(line)
+        out.write("\n")
+
+
+def report_text(report, sections=SECTIONS):
+    # The whole text at once, for plans returned as JSON and saved plans
+    return "\n".join(iter_text_lines(report, sections))
+
+
+# =========================
+# PDF
+# =========================
+
+def write_pdf(report, out, sections=SECTIONS):
+    # out: a path or a binary file-like object
+    from utils.pdf_helper import generate_lines_pdf
+
+    generate_lines_pdf(out, iter_text_lines(report, sections))
+
+
+def report_pdf_bytes(report, sections=SECTIONS) -> bytes:
+    # Cached alongside budget_pdf_bytes(): the report itself is the key
+    from utils.pdf_helper import cached_pdf_bytes
+
+    return cached_pdf_bytes((report, tuple(sections)), lambda out: write_pdf(report, out, sections))
+
+
+def booklet_heading(report):
+    return (f"{report.from_location} to {report.to_location} · {report.travel_month} · "
+            f"{report.num_students} students, {report.num_days} days")
+
+
+def booklet_entries(reports, sections=SECTIONS):
+    # (heading, lines) per report, one report at a time
+    for report in reports:
+        yield booklet_heading(report), list(iter_text_lines(report, sections))
+
+
+def write_booklet(reports, out, sections=SECTIONS, **options):
+    # reports: any iterable, e.g. a generator over saved plans; it is read
+    # once. out: a path or a binary file-like object. Options go to
+    # pdf_helper.generate_booklet_pdf(); returns its stats.
+    from utils.pdf_helper import generate_booklet_pdf
+
+    return generate_booklet_pdf(out, booklet_entries(reports, sections), **options)
+
+
+def saved_plan_report(plan):
+    # A plan reopened from the plan store -> its report
+    from utils.itinerary_helper import Itinerary
+
+    itinerary = Itinerary.from_dict(plan["itinerary"]) if plan.get("itinerary") else None
+    return build_report(plan["inputs"], plan["costs"], plan["options"], itinerary)
+
+
+# =========================
+# JSON and CSV
+# =========================
+
+def write_json(report, out, indent=2):
+    # out: a text stream; the encoder's chunks are written as they come
+    for chunk in json.JSONEncoder(ensure_ascii=False, indent=indent).iterencode(report.to_dict()):
+        out.write(chunk)
+
+
+def iter_csv_rows(report):
+    yield CSV_HEADER
+    for name, value in (
+        ("from", report.from_location), ("to", report.to_location),
+        ("travel_month", report.travel_month), ("students", report.num_students),
+        ("days", report.num_days), ("preferences", report.preferences),
+    ):
+        yield ("trip", name, "", "", value)
+    for line in report.costs:
+        yield ("cost", line.category, line.total, line.per_student, "")
+    yield ("cost", report.total.category, report.total.total, report.total.per_student, "")
+    utilization = report.utilization
+    yield ("utilization", "Maximum Budget", utilization.max_budget, "", "")
+    yield ("utilization", "Used", utilization.used, "", f"{utilization.percent}%")
+    yield ("utilization", "Remaining", utilization.remaining, "", utilization.status)
+    yield ("food_and_stay", "Food", report.food_cost_per_day, "", report.food_type)
+    yield ("food_and_stay", "Stay", report.stay_rate, "", f"{report.stay_type}, {report.nights} night(s)")
+    for option in report.options:
+        yield ("option", option.name, option.total, "",
+               f"{option.accommodation}; {option.food}; "
+               + ("within budget" if option.within_budget else "exceeds budget"))
+    for day in report.days:
+        for slot, text in day.slots():
+            yield ("itinerary", f"Day {day.day} {slot}", "", "", text)
+
+
+def write_csv(report, out):
+    # out: a text stream opened with newline=""
+    csv.writer(out).writerows(iter_csv_rows(report))
@@ -0,0 +1,156 @@
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Deadlines, retries and hedging for upstream model calls.
+#
+# Every call gets an absolute deadline (time.monotonic() based). Transient
+# failures (connection errors, timeouts, HTTP 408/425/429/5xx) are retried
+# with full-jitter exponential backoff while time remains. A call that has
+# not answered within HEDGE_AFTER seconds gets one duplicate ("hedge")
+# request, and whichever finishes first wins. Abandoned calls run to their
+# own client timeout in the background; their results are dropped.
+
+ITINERARY_DEADLINE = float(os.getenv("TRIPMATE_ITINERARY_DEADLINE", 7.0))
+FIRST_TOKEN_DEADLINE = float(os.getenv("TRIPMATE_FIRST_TOKEN_DEADLINE", 4.0))
+RETRY_ATTEMPTS = int(os.getenv("TRIPMATE_RETRY_ATTEMPTS", 2))
+RETRY_BASE_DELAY = float(os.getenv("TRIPMATE_RETRY_BASE_DELAY", 0.25))
+RETRY_MAX_DELAY = 2.0
+HEDGE_AFTER = float(os.getenv("TRIPMATE_HEDGE_AFTER", 2.5))  # 0 disables hedging
+
+TRANSIENT_STATUS = {408, 425, 429, 500, 502, 503, 504}
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+def is_transient(error):
+    # requests / huggingface_hub errors carry the HTTP response
+    status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status in TRANSIENT_STATUS
+    return isinstance(error, (ConnectionError, TimeoutError, OSError))
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    # Full jitter: uniform over [0, min(cap, base * 2^attempt)]
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+def deadline_after(seconds):
+    return time.monotonic() + seconds
+
+
+def remaining(deadline):
+    return deadline - time.monotonic()
+
+
+_call_pool = None
+_call_pool_lock = threading.Lock()
+
+
+def _get_call_pool():
+    global _call_pool
+    if _call_pool is None:
+        with _call_pool_lock:
+            if _call_pool is None:
+                _call_pool = ThreadPoolExecutor(max_workers=32, thread_name_prefix="model-call")
+    return _call_pool
+
+
+def call_with_deadline(call, deadline, admit=None, retries=RETRY_ATTEMPTS,
+                       hedge_after=HEDGE_AFTER):
+    # call() -> result, run on a shared pool. admit(timeout) is called before
+    # every request (retries and hedges included), e.g. to take a rate
+    # limiter token; the hedge is only sent if admit(0) succeeds at once.
+    pool = _get_call_pool()
+    attempt = 0
+    while True:
+        if admit is not None:
+            admit(max(remaining(deadline), 0))
+        pending = {pool.submit(call)}
+        hedged = hedge_after <= 0
+        error = None
+        while pending:
+            wait_for = remaining(deadline)
+            if not hedged:
+                wait_for = min(wait_for, hedge_after)
+            if wait_for <= 0 and hedged:
+                raise DeadlineExceeded("model call missed its deadline")
+            done, pending = wait(pending, timeout=max(wait_for, 0), return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+            if not done and not hedged:
+                hedged = True
+                try:
+                    if admit is not None:
+                        admit(0)
+                    pending.add(pool.submit(call))
+                except Exception:
+                    pass  # no capacity for a hedge right now; keep waiting
+
+        # Every request of this attempt failed
+        if not is_transient(error) or attempt >= retries:
+            raise error
+        delay = backoff_delay(attempt)
+        if delay >= remaining(deadline):
+            raise DeadlineExceeded("no time left to retry the model call") from error
+        time.sleep(delay)
+        attempt += 1
+
+
+_DONE = object()
+
+
+def stream_with_deadline(open_stream, deadline, first_token_deadline=None, admit=None,
+                         retries=RETRY_ATTEMPTS):
+    # open_stream() -> iterator of text pieces. Pieces are pulled on a
+    # background thread so a stalled stream can't block the caller past
+    # the deadline. Until the first piece arrives, transient failures are
+    # retried; after that, any failure or a missed deadline raises.
+    first_token_deadline = min(first_token_deadline or deadline, deadline)
+    attempt = 0
+    while True:
+        if admit is not None:
+            admit(max(remaining(first_token_deadline), 0))
+        pieces = queue.Queue()
+
+        def pump(pieces=pieces):
+            try:
+                for piece in open_stream():
+                    pieces.put(piece)
+                pieces.put(_DONE)
+            except BaseException as error:
+                pieces.put(error)
+
+        threading.Thread(target=pump, daemon=True, name="model-stream").start()
+
+        started = False
+        while True:
+            limit = deadline if started else first_token_deadline
+            try:
+                piece = pieces.get(timeout=max(remaining(limit), 0))
+            except queue.Empty:
+                raise DeadlineExceeded(
+                    "model stream missed its deadline" if started
+                    else "model did not start answering in time"
+                ) from None
+            if piece is _DONE:
+                return
+            if isinstance(piece, BaseException):
+                if started or not is_transient(piece) or attempt >= retries:
+                    raise piece
+                delay = backoff_delay(attempt)
+                if delay >= remaining(first_token_deadline):
+                    raise DeadlineExceeded("no time left to retry the model call") from piece
+                time.sleep(delay)
+                attempt += 1
+                break
+            started = True
+            yield piece
@@ -0,0 +1,348 @@
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+
+from utils.geo_helper import normalize_name
+from utils.plan_helper import MONTHS
+
+# Persistent plan store: every finished plan (inputs, cost breakdown,
+# options table, optimizer results, itinerary and report texts) in one
+# SQLite file, so past plans can be listed, searched, reopened and have
+# their itinerary reused by a near-identical trip.
+#
+# `plans` holds only the narrow, indexed search columns; the JSON body
+# sits in `plan_bodies` and is read only when a plan is reopened, so
+# listing and searching stay index-only page reads at millions of rows.
+# Searches return newest first and page by (created_at, id) keyset
+# instead of OFFSET.
+
+DEFAULT_STORE_PATH = os.getenv(
+    "TRIPMATE_PLAN_STORE_PATH", os.path.join(".tripmate_cache", "plans.sqlite3")
+)
+# A saved itinerary is reused for a group up to this share larger or smaller
+REUSE_STUDENT_TOLERANCE = float(os.getenv("TRIPMATE_REUSE_STUDENT_TOLERANCE", 0.25))
+MAX_SEARCH_LIMIT = 200
+# Reading a plan through idx_plans_group (a table lookup and a sort step)
+# costs about as much as stepping over this many on the way down
+# idx_plans_created: 2 on a 100k-plan store in memory, 7 on a 1M-plan
+# file, so the high end, where a wrong guess costs least. See search().
+RANGE_SORT_COST = 8.0
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS plans ("
+    " id INTEGER PRIMARY KEY,"
+    " key TEXT NOT NULL UNIQUE,"
+    " from_key TEXT NOT NULL,"
+    " to_key TEXT NOT NULL,"
+    " from_location TEXT NOT NULL,"
+    " to_location TEXT NOT NULL,"
+    " travel_month INTEGER NOT NULL,"
+    " num_students INTEGER NOT NULL,"
+    " num_days INTEGER NOT NULL,"
+    " max_budget INTEGER NOT NULL,"
+    " location_types TEXT NOT NULL,"
+    " total_cost INTEGER,"
+    " cost_per_student INTEGER,"
+    " reusable INTEGER NOT NULL,"  # full model itinerary (no offline days)
+    " created_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS plan_bodies ("
+    " plan_id INTEGER PRIMARY KEY REFERENCES plans (id) ON DELETE CASCADE,"
+    " body TEXT NOT NULL)",
+    # Route: close-match lookups and destination searches
+    "CREATE INDEX IF NOT EXISTS idx_plans_route"
+    " ON plans (to_key, from_key, num_days, travel_month, num_students)",
+    "CREATE INDEX IF NOT EXISTS idx_plans_destination ON plans (to_key, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_plans_month ON plans (travel_month, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_plans_group ON plans (num_students, created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_plans_created ON plans (created_at)",
+)
+
+# Fixed statement texts: sqlite3 keeps each one prepared in its statement
+# cache, so repeated calls skip parsing and planning
+_UPSERT_PLAN = (
+    "INSERT INTO plans (key, from_key, to_key, from_location, to_location, travel_month,"
+    " num_students, num_days, max_budget, location_types, total_cost, cost_per_student,"
+    " reusable, created_at)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    " ON CONFLICT (key) DO UPDATE SET"
+    " total_cost = excluded.total_cost, cost_per_student = excluded.cost_per_student,"
+    " reusable = excluded.reusable"
+    " RETURNING id"
+)
+_UPSERT_BODY = (
+    "INSERT INTO plan_bodies (plan_id, body) VALUES (?, ?)"
+    " ON CONFLICT (plan_id) DO UPDATE SET body = excluded.body"
+)
+_SUMMARY_COLUMNS = (
+    "id, key, from_location, to_location, travel_month, num_students, num_days,"
+    " max_budget, location_types, total_cost, cost_per_student, reusable, created_at"
+)
+_GET_PLAN = (
+    f"SELECT {_SUMMARY_COLUMNS}, body FROM plans JOIN plan_bodies ON plan_id = id WHERE id = ?"
+)
+_GET_PLAN_BY_KEY = (
+    f"SELECT {_SUMMARY_COLUMNS}, body FROM plans JOIN plan_bodies ON plan_id = id WHERE key = ?"
+)
+_CLOSE_MATCH = (
+    f"SELECT {_SUMMARY_COLUMNS}, body FROM plans JOIN plan_bodies ON plan_id = id"
+    " WHERE to_key = ? AND from_key = ? AND num_days = ? AND travel_month = ?"
+    " AND num_students BETWEEN ? AND ? AND location_types = ? AND reusable = 1"
+    " ORDER BY abs(num_students - ?), created_at DESC LIMIT 1"
+)
+_DELETE_PLAN = "DELETE FROM plans WHERE id = ?"
+_COUNT_PLANS = "SELECT count(*) FROM plans"
+# At least the plan count (ids only grow), read from the end of the rowid tree
+_MAX_PLAN_ID = "SELECT coalesce(max(id), 0) FROM plans"
+# Reads at most `limit` entries of idx_plans_group, however wide the range
+_COUNT_GROUP_RANGE = (
+    "SELECT count(*) FROM (SELECT 1 FROM plans WHERE num_students BETWEEN ? AND ? LIMIT ?)"
+)
+
+# Search filters: column test per keyword. Each combination of filters is
+# its own statement text, so it is prepared once and then reused. An exact
+# group size uses idx_plans_group. A range is read either from
+# idx_plans_group, sorting every plan in it, or by walking created_at newest
+# first until a page matches, which steps over about page x plans / matches
+# rows; search() counts the matches (only as far as that crossover) and
+# for a wide range drops the index with the unary +.
+_FILTERS = (
+    ("to_location", "to_key = ?"),
+    ("from_location", "from_key = ?"),
+    ("month", "travel_month = ?"),
+    ("students", "num_students = ?"),
+    ("min_students", "+num_students >= ?"),
+    ("max_students", "+num_students <= ?"),
+    ("before", "(created_at, id) < (?, ?)"),
+)
+
+
+def month_number(month):
+    # "May" / "may" / 5 -> 5
+    text = str(month).strip().title()
+    if text in MONTHS:
+        return MONTHS.index(text) + 1
+    number = int(text) if text.isdigit() else 0
+    if not 1 <= number <= 12:
+        raise ValueError(f"unknown month {month!r}")
+    return number
+
+
+def _types_key(location_types):
+    return "|".join(sorted(location_types or []))
+
+
+def _summary(row):
+    return {
+        "id": row[0],
+        "key": row[1],
+        "from_location": row[2],
+        "to_location": row[3],
+        "travel_month": MONTHS[row[4] - 1],
+        "num_students": row[5],
+        "num_days": row[6],
+        "max_budget": row[7],
+        "location_types": row[8].split("|") if row[8] else [],
+        "total_cost": row[9],
+        "cost_per_student": row[10],
+        "reusable": bool(row[11]),
+        "created_at": row[12],
+    }
+
+
+def _full_plan(row):
+    # Summary row + body -> the plan_helper plan shape plus id and created_at
+    summary = _summary(row)
+    plan = {
+        "id": summary["id"],
+        "key": summary["key"],
+        "created_at": summary["created_at"],
+        "inputs": {
+            field: summary[field] for field in (
+                "from_location", "to_location", "travel_month", "num_students",
+                "num_days", "max_budget", "location_types",
+            )
+        },
+    }
+    plan.update(json.loads(row[13]))
+    return plan
+
+
+class PlanStore:
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path or ":memory:"
+        if self.path != ":memory:":
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False, cached_statements=256)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")  # WAL keeps this crash-safe
+        self._db.execute("PRAGMA foreign_keys=ON")
+        for statement in _SCHEMA:
+            self._db.execute(statement)
+        # Fresh index statistics let the planner pick the most selective
+        # index when filters are combined; sampling bounds the cost at any size
+        self._db.execute("PRAGMA analysis_limit=1000")
+        self._db.execute("ANALYZE")
+        self._db.commit()
+
+    def save(self, plan):
+        # plan: plan_helper plan shape (key, inputs, costs, options,
+        # optimized, budget_text, itinerary as day dicts, itinerary_text).
+        # Saving the same trip again updates it in place. Returns the id.
+        inputs = plan["inputs"]
+        costs = plan.get("costs") or {}
+        body = {
+            "costs": costs,
+            "options": plan.get("options"),
+            "optimized": plan.get("optimized"),
+            "budget_text": plan.get("budget_text"),
+            "itinerary": plan.get("itinerary"),
+            "itinerary_text": plan.get("itinerary_text"),
+        }
+        total_cost = costs.get("used_budget")
+        per_student = costs.get("total_per_student")
+        with self._lock, self._db:
+            if not body["itinerary"]:
+                # A budget-only save (e.g. batch --no-itinerary) keeps the
+                # itinerary already saved for this trip
+                row = self._db.execute(_GET_PLAN_BY_KEY, (plan["key"],)).fetchone()
+                if row is not None:
+                    saved = json.loads(row[13])
+                    body["itinerary"], body["itinerary_text"] = saved["itinerary"], saved["itinerary_text"]
+            itinerary = body["itinerary"]
+            reusable = bool(itinerary) and all(day.get("source") != "offline" for day in itinerary)
+            plan_id = self._db.execute(_UPSERT_PLAN, (
+                plan["key"],
+                normalize_name(inputs["from_location"]),
+                normalize_name(inputs["to_location"]),
+                inputs["from_location"].strip(),
+                inputs["to_location"].strip(),
+                month_number(inputs["travel_month"]),
+                int(inputs["num_students"]),
+                int(inputs["num_days"]),
+                int(inputs["max_budget"]),
+                _types_key(inputs["location_types"]),
+                None if total_cost is None else int(total_cost),
+                None if per_student is None else int(per_student),
+                int(reusable),
+                time.time(),
+            )).fetchone()[0]
+            self._db.execute(_UPSERT_BODY, (
+                plan_id, json.dumps(body, ensure_ascii=False, separators=(",", ":"), default=str)
+            ))
+        return plan_id
+
+    def get(self, plan_id):
+        with self._lock:
+            row = self._db.execute(_GET_PLAN, (plan_id,)).fetchone()
+        return _full_plan(row) if row else None
+
+    def get_by_key(self, key):
+        with self._lock:
+            row = self._db.execute(_GET_PLAN_BY_KEY, (key,)).fetchone()
+        return _full_plan(row) if row else None
+
+    def search(self, to_location=None, from_location=None, month=None,
+               min_students=None, max_students=None, before=None, limit=20):
+        # Newest first. Pass the last row's (created_at, id) as `before`
+        # for the next page. Returns summaries (no body).
+        values = {
+            "to_location": normalize_name(to_location) if to_location else None,
+            "from_location": normalize_name(from_location) if from_location else None,
+            "month": month_number(month) if month else None,
+            "students": None,
+            "min_students": min_students,
+            "max_students": max_students,
+            "before": before,
+        }
+        if min_students is not None and min_students == max_students:
+            values["students"], values["min_students"], values["max_students"] = min_students, None, None
+        limit = max(1, min(int(limit), MAX_SEARCH_LIMIT))
+        with self._lock:
+            narrow = False
+            if values["min_students"] is not None or values["max_students"] is not None:
+                plans = self._db.execute(_MAX_PLAN_ID).fetchone()[0]
+                crossover = math.isqrt(int(limit * plans / RANGE_SORT_COST)) + 1
+                low = -1 if values["min_students"] is None else values["min_students"]
+                high = 2 ** 63 - 1 if values["max_students"] is None else values["max_students"]
+                matched = self._db.execute(
+                    _COUNT_GROUP_RANGE, (low, high, crossover)
+                ).fetchone()[0]
+                narrow = matched < crossover
+
+            clauses, params = [], []
+            for name, clause in _FILTERS:
+                value = values[name]
+                if value is None:
+                    continue
+                clauses.append(clause[1:] if narrow and clause.startswith("+") else clause)
+                params.extend(value if name == "before" else (value,))
+            sql = f"SELECT {_SUMMARY_COLUMNS} FROM plans"
+            if clauses:
+                sql += " WHERE " + " AND ".join(clauses)
+            sql += " ORDER BY created_at DESC, id DESC LIMIT ?"
+            params.append(limit)
+            rows = self._db.execute(sql, params).fetchall()
+        return [_summary(row) for row in rows]
+
+    def iter_search(self, page_size=MAX_SEARCH_LIMIT, **filters):
+        # Every match of search(filters), newest first, one page at a time
+        before = None
+        while True:
+            plans = self.search(before=before, limit=page_size, **filters)
+            yield from plans
+            if len(plans) < page_size:
+                return
+            before = (plans[-1]["created_at"], plans[-1]["id"])
+
+    def recent(self, limit=20):
+        return self.search(limit=limit)
+
+    def find_close_match(self, inputs, tolerance=REUSE_STUDENT_TOLERANCE):
+        # Newest saved plan for the same route, month, length and
+        # preferences with a full model itinerary and a group size within
+        # `tolerance`; the exact group size wins. None when there is none.
+        students = int(inputs["num_students"])
+        spread = int(students * tolerance)
+        with self._lock:
+            row = self._db.execute(_CLOSE_MATCH, (
+                normalize_name(inputs["to_location"]),
+                normalize_name(inputs["from_location"]),
+                int(inputs["num_days"]),
+                month_number(inputs["travel_month"]),
+                students - spread,
+                students + spread,
+                _types_key(inputs["location_types"]),
+                students,
+            )).fetchone()
+        return _full_plan(row) if row else None
+
+    def delete(self, plan_id):
+        with self._lock, self._db:
+            return self._db.execute(_DELETE_PLAN, (plan_id,)).rowcount > 0
+
+    def count(self):
+        with self._lock:
+            return self._db.execute(_COUNT_PLANS).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_plan_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PlanStore()
+    return _store
@@ -0,0 +1,186 @@
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+
+import numpy as np
+
+# Stay, transport, food and misc tariffs live in a versioned JSON file
+# (data/tariffs.json by default, TRIPMATE_TARIFF_PATH to override) so
+# prices can change per season or region without a redeploy.
+#
+# The file is compiled once into sorted threshold arrays. Lookups are a
+# bisect (scalar) or np.searchsorted (vectorized), so they stay O(log n)
+# in the number of tiers. get_tariff() re-reads the file only when its
+# mtime changes, and checks the mtime at most once per
+# TARIFF_CHECK_INTERVAL seconds.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TARIFF_PATH = os.getenv(
+    "TRIPMATE_TARIFF_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "tariffs.json")
+)
+TARIFF_CHECK_INTERVAL = float(os.getenv("TRIPMATE_TARIFF_CHECK_INTERVAL", 1.0))
+
+
+class TieredRate:
+    # Tiers are "value <= max" ladders; the last tier has no upper bound.
+    def __init__(self, tiers, bound_key, source):
+        bounds = [tier[bound_key] for tier in tiers]
+        if not tiers or bounds[-1] is not None or None in bounds[:-1]:
+            raise ValueError(
+                f"{source}: every tier except the last needs a {bound_key!r}; "
+                "the last tier must have none"
+            )
+        if bounds[:-1] != sorted(bounds[:-1]):
+            raise ValueError(f"{source}: {bound_key!r} values must be ascending")
+
+        self.tiers = tiers
+        self.thresholds = bounds[:-1]
+        self.threshold_array = np.array(self.thresholds, dtype=np.float64)
+
+    def index(self, value):
+        return bisect_left(self.thresholds, value)
+
+    def indices(self, values):
+        return np.searchsorted(self.threshold_array, values, side="left")
+
+    def lookup(self, value):
+        return self.tiers[self.index(value)]
+
+    def column(self, key, dtype=np.int64):
+        return np.array([tier[key] for tier in self.tiers], dtype=dtype)
+
+
+class Tariff:
+    def __init__(self, data, source="<tariff>", mtime=None):
+        self.source = source
+        self.mtime = mtime
+        self.version = str(data["version"])
+
+        self.stay = TieredRate(data["stay_tiers"], "max_students", f"{source} stay_tiers")
+        self.transport = TieredRate(data["transport_tiers"], "max_students", f"{source} transport_tiers")
+        self.food = TieredRate(
+            data["food_tiers"], "max_budget_per_student_per_day", f"{source} food_tiers"
+        )
+        self.stay_rates = self.stay.column("rate")
+        self.cost_per_km = self.transport.column("cost_per_km")
+        self.food_rates = self.food.column("rate")
+
+        self.misc_cost_map = dict(data["misc_cost_per_student"])
+        self.default_misc_cost = data["default_misc_cost_per_student"]
+
+        options = data["options"]
+        self.budget_stay_discount = options["budget_stay_discount"]
+        self.min_stay_rate = options["min_stay_rate"]
+        self.premium_stay_markup = options["premium_stay_markup"]
+
+        # Preference bitmasks for the vectorized cost model: misc cost per
+        # student for every combination of location types, precomputed.
+        # The top bit stands for "any type not in the tariff", which counts
+        # at the default rate, as in misc_cost_per_student().
+        self.preference_types = list(self.misc_cost_map)
+        self.preference_bits = {
+            name: 1 << index for index, name in enumerate(self.preference_types)
+        }
+        self.unknown_preference_bit = 1 << len(self.preference_types)
+        self.misc_by_mask = np.full(
+            self.unknown_preference_bit << 1, self.default_misc_cost, dtype=np.int64
+        )
+        for mask in range(1, len(self.misc_by_mask)):
+            rates = [
+                self.misc_cost_map[name]
+                for name, bit in self.preference_bits.items() if mask & bit
+            ]
+            if mask & self.unknown_preference_bit:
+                rates.append(self.default_misc_cost)
+            self.misc_by_mask[mask] = max(rates)
+
+        self.optimizer = OptimizerCatalogue(self, data["optimizer"]) if "optimizer" in data else None
+
+    def misc_cost_per_student(self, location_types):
+        if location_types:
+            return max(
+                self.misc_cost_map.get(loc, self.default_misc_cost) for loc in location_types
+            )
+        return self.default_misc_cost
+
+    def preferences_mask(self, location_types):
+        mask = 0
+        for loc in location_types:
+            mask |= self.preference_bits.get(loc, self.unknown_preference_bit)
+        return mask
+
+
+class OptimizerCatalogue:
+    # Stay / food / vehicle / activity choices for the budget optimizer,
+    # compiled to arrays once per tariff load.
+    def __init__(self, tariff, data):
+        self.weights = data["comfort_weights"]
+
+        stays = data["stays"]
+        self.stay_types = [stay["type"] for stay in stays]
+        self.stay_rates = np.array([stay["rate"] for stay in stays], dtype=np.int64)
+        self.stay_comfort = np.array([stay["comfort"] for stay in stays], dtype=np.float64)
+        self.stay_max_students = np.array(
+            [stay.get("max_students") or np.iinfo(np.int64).max for stay in stays], dtype=np.int64
+        )
+
+        # Food choices are the tariff's food tiers, comfort rising per tier
+        self.food_types = [tier["type"] for tier in tariff.food.tiers]
+        self.food_rates = tariff.food_rates
+        self.food_comfort = np.arange(1, len(self.food_types) + 1, dtype=np.float64)
+
+        # Vehicle choices are the tariff's transport tiers at their own rates,
+        # each carrying up to its tier's max_students
+        vehicle_comfort = data["vehicle_comfort"]
+        self.vehicle_types = [tier["vehicle"] for tier in tariff.transport.tiers]
+        self.vehicle_cost_per_km = tariff.cost_per_km
+        self.vehicle_max_students = np.array(
+            [tier["max_students"] or np.iinfo(np.int64).max for tier in tariff.transport.tiers],
+            dtype=np.int64,
+        )
+        self.vehicle_comfort = np.array(
+            [vehicle_comfort.get(vehicle, 1) for vehicle in self.vehicle_types], dtype=np.float64
+        )
+
+        self.activity_comfort = dict(data["activity_comfort"])
+
+
+def load_tariff(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return Tariff(data, source=path, mtime=os.stat(path).st_mtime_ns)
+
+
+_tariffs = {}
+_tariffs_lock = threading.Lock()
+
+
+def get_tariff(path=None):
+    path = path or DEFAULT_TARIFF_PATH
+    now = time.monotonic()
+    entry = _tariffs.get(path)
+    if entry is not None and now - entry[1] < TARIFF_CHECK_INTERVAL:
+        return entry[0]
+
+    with _tariffs_lock:
+        entry = _tariffs.get(path)
+        if entry is not None and now - entry[1] < TARIFF_CHECK_INTERVAL:
+            return entry[0]
+
+        tariff = entry[0] if entry else None
+        try:
+            # The file can vanish mid-check (deleted, or atomically replaced)
+            if tariff is None or tariff.mtime != os.stat(path).st_mtime_ns:
+                tariff = load_tariff(path)
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            if tariff is None:
+                raise
+            # Keep serving the last good tariff if an edit is broken.
+            logger.warning("Ignoring invalid tariff file %s: %s", path, error)
+        _tariffs[path] = (tariff, now)
+        return tariff
@@ -0,0 +1,88 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.cost_helper import estimate_distance_km
+from utils.tariff_helper import get_tariff
+
+# What-if cost surfaces: the cost model evaluated over every group size
+# (1..MAX_STUDENTS) x trip length (1..MAX_DAYS) for one route in a single
+# vectorized pass. Everything except the food tier is independent of the
+# budget, so the surface keeps the budget-free part of the cost and
+# cost_at() only picks a food tier per cell for the chosen budget - a
+# searchsorted over the cached arrays, no model or tariff work.
+#
+# Surfaces are cached per (route distance, preferences, tariff version); a tariff
+# edit changes the version and so builds fresh surfaces.
+
+MAX_STUDENTS = 500
+MAX_DAYS = 15
+SURFACE_CACHE_SIZE = 32
+
+
+class CostSurface:
+    def __init__(self, distance_km, preference_mask, tariff):
+        self.distance_km = distance_km
+        self.tariff_version = tariff.version
+        self.students = np.arange(1, MAX_STUDENTS + 1, dtype=np.int64)
+        self.days = np.arange(1, MAX_DAYS + 1, dtype=np.int64)
+
+        students = self.students[:, None]
+        days = self.days[None, :]
+        nights = np.maximum(days - 1, 1)
+
+        stay_rate = tariff.stay_rates[tariff.stay.indices(self.students)][:, None]
+        cost_per_km = tariff.cost_per_km[tariff.transport.indices(self.students)][:, None]
+        misc_rate = tariff.misc_by_mask[preference_mask]
+
+        self.student_days = students * days
+        self.fixed_cost = (
+            distance_km * cost_per_km
+            + stay_rate * students * nights
+            + misc_rate * students
+        )
+        self.food_thresholds = tariff.food.threshold_array
+        self.food_rates = tariff.food_rates
+
+    def cost_at(self, max_budget):
+        # Total trip cost for every (students, days) cell at this budget
+        food_index = np.searchsorted(
+            self.food_thresholds, max_budget / self.student_days, side="left"
+        )
+        return self.fixed_cost + self.food_rates[food_index] * self.student_days
+
+    def cell(self, max_budget, num_students, num_days):
+        # Scalar version of cost_at() for one group size and trip length
+        student_days = num_students * num_days
+        food_index = np.searchsorted(
+            self.food_thresholds, max_budget / student_days, side="left"
+        )
+        return int(
+            self.fixed_cost[num_students - 1, num_days - 1]
+            + self.food_rates[food_index] * student_days
+        )
+
+
+_surfaces = OrderedDict()
+_surfaces_lock = threading.Lock()
+
+
+def get_cost_surface(from_location, to_location, location_types, tariff=None):
+    tariff = tariff or get_tariff()
+    distance_km = estimate_distance_km(from_location, to_location)
+    preference_mask = tariff.preferences_mask(location_types)
+    key = (distance_km, preference_mask, tariff.version)
+
+    with _surfaces_lock:
+        surface = _surfaces.get(key)
+        if surface is not None:
+            _surfaces.move_to_end(key)
+            return surface
+
+    surface = CostSurface(distance_km, preference_mask, tariff)
+    with _surfaces_lock:
+        _surfaces[key] = surface
+        while len(_surfaces) > SURFACE_CACHE_SIZE:
+            _surfaces.popitem(last=False)
+    return surface